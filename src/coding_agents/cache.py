@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+
+def get_cache_root() -> Path:
+    p = os.environ.get("AGENT_CACHE_DIR")
+    if p:
+        return Path(p).resolve()
+    return Path.cwd() / ".agent_cache"
+
+
+def cache_dir(name: str, root: Path | None = None) -> Path:
+    path = (root or get_cache_root()) / name
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -1,42 +1,143 @@
 import argparse
 from pathlib import Path
 
-from coding_agents.cli_code_agent import run_code_agent
-from coding_agents.cli_readme import run_readme
-from coding_agents.cli_reviewer import run_reviewer
-
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         prog="gaj",
-        description="Coding Agents: code (issue -> PR), reviewer (PR review)",
+        description=(
+            "Coding Agents: code (issue -> PR), reviewer (PR review), readme, serve"
+        ),
     )
     subparsers = parser.add_subparsers(dest="cmd", required=True)
 
-    code_parser = subparsers.add_parser("code", help="Code Agent: take Issue, create/update PR")
+    code_parser = subparsers.add_parser(
+        "code", help="Code Agent: take Issue, create/update PR"
+    )
     code_parser.add_argument("--issue", type=int, required=True, help="Issue number")
-    code_parser.add_argument("--pr", type=int, default=None, help="Existing PR (re-run)")
+    code_parser.add_argument(
+        "--pr", type=int, default=None, help="Existing PR (re-run)"
+    )
     code_parser.add_argument("--repo-path", type=Path, default=None, help="Repo path")
-    code_parser.add_argument("--verbose", "-v", action="store_true", help="Print issue title/body")
-    code_parser.add_argument("--no-cache", action="store_true", help="Clone to temp dir instead of cache")
+    code_parser.add_argument(
+        "--verbose", "-v", action="store_true", help="Print issue title/body"
+    )
+    code_parser.add_argument(
+        "--no-cache", action="store_true", help="Clone to temp dir instead of cache"
+    )
+    code_parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Lint and run affected tests locally before push",
+    )
+    code_parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="Do not add similar past fixes to the prompt",
+    )
+    code_parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore saved checkpoints for this issue/PR",
+    )
+    code_parser.add_argument(
+        "--candidates",
+        type=int,
+        default=None,
+        help="Generate N plans in parallel and apply the best",
+    )
+    code_parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU/memory profiles to DIR",
+    )
 
-    reviewer_parser = subparsers.add_parser("reviewer", help="Reviewer Agent: review PR and post comment")
-    reviewer_parser.add_argument("--pr", type=int, required=True, help="Pull request number")
-    reviewer_parser.add_argument("--issue", type=int, required=True, help="Issue number (for requirements)")
-    reviewer_parser.add_argument("--ci-summary", type=str, default="", help="CI jobs summary")
+    reviewer_parser = subparsers.add_parser(
+        "reviewer", help="Reviewer Agent: review PR and post comment"
+    )
+    reviewer_parser.add_argument(
+        "--pr", type=int, required=True, help="Pull request number"
+    )
+    reviewer_parser.add_argument(
+        "--issue", type=int, required=True, help="Issue number (for requirements)"
+    )
+    reviewer_parser.add_argument(
+        "--ci-summary", type=str, default="", help="CI jobs summary"
+    )
+    reviewer_parser.add_argument(
+        "--repo-path",
+        type=Path,
+        default=None,
+        help="Local clone to compute the PR diff in",
+    )
+    reviewer_parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU/memory profiles to DIR",
+    )
+
+    readme_parser = subparsers.add_parser(
+        "readme", help="Generate README.md from project structure"
+    )
+    readme_parser.add_argument(
+        "--repo-path",
+        default=None,
+        help="Project root: path or URL (e.g. https://github.com/owner/repo.git)",
+    )
+    readme_parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Output file (default: <repo>/README.md)",
+    )
+    readme_parser.add_argument(
+        "--dry-run", action="store_true", help="Print README to stdout"
+    )
+    readme_parser.add_argument(
+        "--force", action="store_true", help="Regenerate even if project is unchanged"
+    )
+    readme_parser.add_argument(
+        "--batch",
+        nargs="+",
+        default=None,
+        metavar="REPO",
+        help="Several repos (paths or URLs) in one batch LLM request",
+    )
+    readme_parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU/memory profiles to DIR",
+    )
 
-    readme_parser = subparsers.add_parser("readme", help="Generate README.md from project structure")
-    readme_parser.add_argument("--repo-path", default=None, help="Project root: path or URL (e.g. https://github.com/owner/repo.git)")
-    readme_parser.add_argument("--output", type=Path, default=None, help="Output file (default: <repo>/README.md)")
-    readme_parser.add_argument("--dry-run", action="store_true", help="Print README to stdout")
+    serve_parser = subparsers.add_parser(
+        "serve", help="Resident worker: run Code Agent jobs from /run-code webhooks"
+    )
+    serve_parser.add_argument("--host", default="0.0.0.0", help="Bind address")
+    serve_parser.add_argument("--port", type=int, default=8080, help="Port")
 
     args = parser.parse_args()
     if args.cmd == "code":
+        from coding_agents.cli_code_agent import run_code_agent
+
         run_code_agent(args)
     elif args.cmd == "reviewer":
+        from coding_agents.cli_reviewer import run_reviewer
+
         run_reviewer(args)
     elif args.cmd == "readme":
+        from coding_agents.cli_readme import run_readme
+
         run_readme(args)
+    elif args.cmd == "serve":
+        from coding_agents.cli_serve import run_serve
+
+        run_serve(args)
 
 
 if __name__ == "__main__":
@@ -1,126 +1,529 @@
 import argparse
 import os
 import sys
+import threading
+from collections.abc import Callable
+from dataclasses import replace
 from pathlib import Path
+from typing import Any
 
-from git import Repo
-from git.exc import InvalidGitRepositoryError
+from git.exc import GitCommandError, InvalidGitRepositoryError
 
 from coding_agents.code_agent import CodeAgent
 from coding_agents.config import Config
+from coding_agents.depgraph import DepGraph
+from coding_agents.git_ops import (
+    GitSession,
+    cached_clone_dir,
+    commit_and_push,
+    ensure_branch,
+    ensure_cached_clone,
+    pr_changes,
+    quarantine,
+    settle,
+    working_diff,
+)
+from coding_agents.github_app import github_token, has_github_auth
 from coding_agents.github_client import GitHubClient
-from coding_agents.git_ops import commit_and_push, ensure_branch, ensure_cached_clone
+from coding_agents.history_index import HistoryIndex, format_examples
+from coding_agents.job_store import JobStore, fingerprint, job_id
+from coding_agents.llm.base import LLMClientProtocol
 from coding_agents.llm.factory import create_llm_client
+from coding_agents.pipeline import Stage, StageTimeoutError, run_stages
+from coding_agents.profiling import Profiler
+from coding_agents.validation import run_validation
 
+STAGE_TIMEOUTS = {
+    "workspace": 600.0,
+    "issue": 60.0,
+    "pr": 180.0,
+    "existing_pr": 60.0,
+    "context": 120.0,
+    "history": 120.0,
+    "plan": 900.0,
+    "branch": 180.0,
+}
+HISTORY_SYNC_TIMEOUT = 30.0
 
-def run_code_agent(args: argparse.Namespace) -> None:
-    cfg = Config.from_env()
-    if not cfg.github_token:
-        print("Set GITHUB_TOKEN", file=sys.stderr)
-        sys.exit(1)
+
+def run_code_agent(
+    args: argparse.Namespace,
+    cfg: Config | None = None,
+    llm: LLMClientProtocol | None = None,
+    gh: GitHubClient | None = None,
+    store: JobStore | None = None,
+    still_owner: Callable[[], bool] | None = None,
+) -> None:
+    cfg = cfg or Config.from_env()
+    profiler = Profiler(
+        getattr(args, "profile", None) or cfg.profile_dir, f"code-{args.issue}"
+    )
     try:
-        llm = create_llm_client(cfg)
-    except ValueError as e:
-        print(str(e), file=sys.stderr)
-        sys.exit(1)
+        _run_code_agent(args, cfg, llm, gh, store, profiler, still_owner)
+    finally:
+        profiler.finish()
 
-    base_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
-    workspace = getattr(args, "repo_path", None)
-    temp_workspace = None
-    if workspace is not None:
+
+def _run_code_agent(
+    args: argparse.Namespace,
+    cfg: Config,
+    llm: LLMClientProtocol | None,
+    gh: GitHubClient | None,
+    store: JobStore | None,
+    profiler: Profiler,
+    still_owner: Callable[[], bool] | None = None,
+) -> None:
+    if not has_github_auth(cfg):
+        print(
+            "Set GITHUB_TOKEN or GITHUB_APP_ID with GITHUB_APP_PRIVATE_KEY",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if llm is None:
         try:
-            Repo(workspace)
-        except InvalidGitRepositoryError:
-            print(f"Not a Git repository: {workspace}", file=sys.stderr)
+            llm = create_llm_client(cfg)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
             sys.exit(1)
-    elif cfg.repo_owner and cfg.repo_name:
-        if getattr(args, "no_cache", False):
-            from coding_agents.git_ops import clone_to_temp
-            workspace = clone_to_temp(
-                cfg.repo_owner,
-                cfg.repo_name,
-                cfg.github_token,
-                base_url=base_url,
+
+    gh = gh or GitHubClient.from_config(cfg)
+    session = GitSession()
+    store = store or JobStore.default()
+    job = job_id(f"{cfg.repo_owner}/{cfg.repo_name}", args.issue, args.pr)
+    default_branch = f"agent-issue-{args.issue}"
+
+    def stage_workspace(_: dict) -> tuple[Path, bool, Path | None]:
+        return _resolve_workspace(args, cfg, session, default_branch)
+
+    def stage_issue(_: dict) -> tuple[str, str]:
+        issue_body = gh.get_issue_body(args.issue)
+        issue_title = gh.get_issue_title(args.issue)
+        if not issue_body and not issue_title:
+            print("Issue not found or empty", file=sys.stderr)
+            sys.exit(1)
+        if getattr(args, "verbose", False):
+            print(f"Repo: {cfg.repo_owner}/{cfg.repo_name}", file=sys.stderr)
+            print(f"Issue #{args.issue} title: {issue_title!r}", file=sys.stderr)
+            print(f"Issue #{args.issue} body:\n{issue_body}", file=sys.stderr)
+        return issue_title, issue_body
+
+    def stage_pr(_: dict) -> dict:
+        if not args.pr:
+            return {"branch": default_branch}
+        return {
+            "branch": gh.get_pr_by_number(args.pr).head.ref,
+            "comments": gh.get_pr_review_comments(args.pr)
+            + gh.get_pr_comments(args.pr),
+        }
+
+    def stage_pr_diff(r: dict) -> str:
+        if not args.pr or "plan" in r["job"]:
+            return ""
+        workspace = r["workspace"][0] if cfg.local_diff else None
+        return pr_changes(gh, args.pr, workspace, cfg.diff_context_lines, session)[0]
+
+    def stage_job(r: dict) -> dict:
+        issue_title, issue_body = r["issue"]
+        comments = r["pr"].get("comments", [])
+        inputs = fingerprint(
+            issue_title, issue_body, [c.get("body", "") for c in comments]
+        )
+        checkpoints = store.begin(job, inputs, fresh=getattr(args, "fresh", False))
+        head_sha = getattr(args, "head_sha", "")
+        trigger = getattr(args, "trigger", "")
+        done = checkpoints.get("done")
+        if (
+            done
+            and head_sha
+            and head_sha not in (done.get("sha"), checkpoints.get("pushed"))
+        ):
+            print(
+                f"Job {job}: new head {head_sha[:12]} since completion; starting over",
+                file=sys.stderr,
             )
-            temp_workspace = workspace
-            print(f"Cloned repo to {workspace}", file=sys.stderr)
-        else:
-            workspace = ensure_cached_clone(
-                cfg.repo_owner,
-                cfg.repo_name,
-                cfg.github_token,
-                base_url=base_url,
+            checkpoints = store.begin(job, inputs, fresh=True)
+        elif done and trigger and trigger != done.get("trigger"):
+            print(
+                f"Job {job}: re-triggered by {trigger} since completion; starting over",
+                file=sys.stderr,
+            )
+            checkpoints = store.begin(job, inputs, fresh=True)
+        if checkpoints:
+            print(
+                f"Job {job}: resuming after {', '.join(sorted(checkpoints))}",
+                file=sys.stderr,
             )
-            print(f"Using cached clone at {workspace} (updated from origin)", file=sys.stderr)
-    else:
-        workspace = cfg.workspace_path
+        else:
+            store.save(job, "issue", {"title": issue_title, "body": issue_body})
+        return checkpoints
+
+    def stage_existing_pr(_: dict):
+        return gh.get_pr_for_issue(args.issue)
+
+    def stage_context(r: dict) -> tuple[CodeAgent, str | None]:
+        workspace = r["workspace"][0]
+        agent = CodeAgent(llm, gh, workspace, config=cfg)
+        if args.pr:
+            return agent, None
+        issue_title, issue_body = r["issue"]
+        return agent, agent.repo_context(f"{issue_title}\n{issue_body}")
+
+    def stage_history(r: dict) -> str:
+        if (
+            "plan" in r["job"]
+            or args.pr
+            or cfg.history_examples <= 0
+            or not cfg.repo_name
+        ):
+            return ""
+        if getattr(args, "no_history", False):
+            return ""
+        issue_title, issue_body = r["issue"]
+        added = _sync_history(cfg, gh)
         try:
-            Repo(workspace)
-        except InvalidGitRepositoryError:
+            index = HistoryIndex.for_repo(cfg.repo_owner, cfg.repo_name)
+            try:
+                examples = index.search(
+                    f"{issue_title}\n{issue_body}",
+                    cfg.history_examples,
+                    exclude_issue=args.issue,
+                )
+            finally:
+                index.close()
+        except Exception as e:
+            print(f"History index unavailable: {e}", file=sys.stderr)
+            return ""
+        if getattr(args, "verbose", False):
             print(
-                "Not a Git repository and GITHUB_REPOSITORY not set. "
-                "Set GITHUB_REPOSITORY=owner/repo or run from a repo clone.",
+                f"History: {added} new entries, {len(examples)} similar past fixes: "
+                f"{[ex['issue'] for ex in examples]}",
                 file=sys.stderr,
             )
-            sys.exit(1)
-    gh = GitHubClient(cfg.github_token, cfg.repo_owner, cfg.repo_name)
-    agent = CodeAgent(llm, gh, workspace, config=cfg)
+        return format_examples(examples)
+
+    def stage_plan(r: dict) -> list[dict]:
+        if "plan" in r["job"]:
+            return r["job"]["plan"]
+        agent, repo_context = r["context"]
+        issue_title, issue_body = r["issue"]
+        candidates = getattr(args, "candidates", None) or cfg.plan_candidates
+        if args.pr:
+            pr_info = r["pr"]
+            plan = agent.plan_fixes(
+                issue_body,
+                issue_title,
+                r["pr_diff"],
+                pr_info["comments"],
+                candidates=candidates,
+            )
+        else:
+            plan = agent.plan_changes(
+                issue_body,
+                issue_title,
+                repo_context=repo_context,
+                candidates=candidates,
+                examples=r["history"],
+            )
+        if plan:
+            store.save(job, "plan", plan)
+        return plan
 
-    issue_body = gh.get_issue_body(args.issue)
-    issue_title = gh.get_issue_title(args.issue)
-    if not issue_body and not issue_title:
-        print("Issue not found or empty", file=sys.stderr)
+    def stage_branch(r: dict) -> str:
+        workspace, user_checkout, _ = r["workspace"]
+        branch_name = r["pr"]["branch"]
+        ensure_branch(
+            workspace,
+            branch_name,
+            from_current_head=bool(args.pr) and user_checkout,
+            session=session,
+        )
+        return branch_name
+
+    def unless_done(run: Callable[[dict], Any]) -> Callable[[dict], Any]:
+        def wrapped(r: dict) -> Any:
+            return None if "done" in r.get("job", {}) else run(r)
+
+        return wrapped
+
+    maybe_done = store.status(job) == "done"
+    stages = [
+        Stage(
+            "workspace",
+            unless_done(stage_workspace),
+            deps=("job",) if maybe_done else (),
+            timeout=STAGE_TIMEOUTS["workspace"],
+        ),
+        Stage("issue", stage_issue, timeout=STAGE_TIMEOUTS["issue"]),
+        Stage("pr", stage_pr, timeout=STAGE_TIMEOUTS["pr"]),
+        Stage("existing_pr", stage_existing_pr, timeout=STAGE_TIMEOUTS["existing_pr"]),
+        Stage("job", stage_job, deps=("issue", "pr")),
+        Stage(
+            "pr_diff",
+            unless_done(stage_pr_diff),
+            deps=("workspace", "job"),
+            timeout=STAGE_TIMEOUTS["pr"],
+        ),
+        Stage(
+            "branch",
+            unless_done(stage_branch),
+            deps=("workspace", "pr", "pr_diff"),
+            timeout=STAGE_TIMEOUTS["branch"],
+        ),
+        Stage(
+            "context",
+            unless_done(stage_context),
+            deps=("branch", "issue"),
+            timeout=STAGE_TIMEOUTS["context"],
+        ),
+        Stage(
+            "history",
+            unless_done(stage_history),
+            deps=("issue", "job"),
+            timeout=STAGE_TIMEOUTS["history"],
+        ),
+        Stage(
+            "plan",
+            unless_done(stage_plan),
+            deps=("branch", "context", "issue", "pr", "pr_diff", "job", "history"),
+            timeout=STAGE_TIMEOUTS["plan"],
+        ),
+    ]
+    stages = [replace(s, run=profiler.wrap(s.name, s.run)) for s in stages]
+    try:
+        results = run_stages(stages)
+    except StageTimeoutError as e:
+        quarantine(session.paths, e.pending)
+        print(str(e), file=sys.stderr)
         sys.exit(1)
-    if getattr(args, "verbose", False):
-        print(f"Repo: {cfg.repo_owner}/{cfg.repo_name}", file=sys.stderr)
-        print(f"Issue #{args.issue} title: {issue_title!r}", file=sys.stderr)
-        print(f"Issue #{args.issue} body:\n{issue_body}", file=sys.stderr)
-
-    if args.pr:
-        pr = gh.get_pr_by_number(args.pr)
-        branch_name = pr.head.ref
-    else:
-        branch_name = f"agent-issue-{args.issue}"
-
-    if args.pr:
-        pr = gh.get_pr_by_number(args.pr)
-        diff = gh.get_pr_diff(args.pr)
-        comments = gh.get_pr_review_comments(args.pr) + gh.get_pr_comments(args.pr)
-        plan = agent.plan_fixes(issue_body, issue_title, diff, comments)
-    else:
-        plan = agent.plan_changes(issue_body, issue_title)
 
+    checkpoints = results["job"]
+    if "done" in checkpoints:
+        print(
+            f"Job {job}: already completed for these inputs; nothing to do",
+            file=sys.stderr,
+        )
+        return
+    plan = checkpoints.get("applied") or results["plan"]
+    workspace, _, temp_workspace = results["workspace"]
+    agent = results["context"][0]
+    branch_name = results["branch"]
+    issue_title = results["issue"][0]
     if not plan:
         print(
-            "No changes planned (LLM returned empty or invalid plan). "
-            "Check that the issue has a clear task and that the model supports JSON output.",
+            "No changes planned (LLM returned empty or invalid plan). Check that the "
+            "issue has a clear task and that the model supports JSON output.",
             file=sys.stderr,
         )
         sys.exit(0)
 
-    ensure_branch(workspace, branch_name, from_current_head=bool(args.pr))
-    agent.apply_plan(plan)
-    commit_msg = f"Agent: address issue #{args.issue}"
-    remote_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
-    repo_slug = f"{cfg.repo_owner}/{cfg.repo_name}"
-    push_url = f"{remote_url}/{repo_slug}.git"
-    if cfg.github_token:
-        from urllib.parse import urlparse
-        parsed = urlparse(push_url)
-        push_url = f"{parsed.scheme}://x-access-token:{cfg.github_token}@{parsed.netloc}{parsed.path}"
-    commit_and_push(workspace, branch_name, commit_msg, push_url)
-
-    existing = gh.get_pr_for_issue(args.issue)
-    if not existing:
+    if "pushed" not in checkpoints:
+        with profiler.stage("apply"):
+            changed = agent.apply_plan(plan)
+        if "applied" in checkpoints:
+            changed = changed or [item["path"] for item in plan]
+        else:
+            if changed and (
+                getattr(args, "validate", False) or cfg.validate_before_push
+            ):
+                issue_title, issue_body = results["issue"]
+                with profiler.stage("validate"):
+                    changed = _validate_and_fix(
+                        agent, workspace, changed, issue_title, issue_body, cfg, session
+                    )
+            if not changed:
+                print("Plan matches current files; nothing to commit", file=sys.stderr)
+                return
+            applied = [
+                {"path": p, "content": (workspace / p).read_text(encoding="utf-8")}
+                for p in changed
+                if (workspace / p).is_file()
+            ]
+            store.save(job, "applied", applied)
+        commit_msg = f"Agent: address issue #{args.issue}"
+        remote_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+        repo_slug = f"{cfg.repo_owner}/{cfg.repo_name}"
+        push_url = f"{remote_url}/{repo_slug}.git"
+        push_token = github_token(cfg)
+        if push_token:
+            from urllib.parse import urlparse
+
+            parsed = urlparse(push_url)
+            push_url = f"{parsed.scheme}://x-access-token:{push_token}@{parsed.netloc}{parsed.path}"
+        if still_owner is not None and not still_owner():
+            print(
+                f"Job {job}: lease lost to another worker; not pushing", file=sys.stderr
+            )
+            sys.exit(3)
+        with profiler.stage("push"):
+            try:
+                commit_and_push(
+                    workspace,
+                    branch_name,
+                    commit_msg,
+                    push_url,
+                    paths=changed,
+                    session=session,
+                )
+            except GitCommandError as e:
+                print(f"Job {job}: push to {branch_name} failed: {e}", file=sys.stderr)
+                sys.exit(1)
+        store.save(job, "pushed", session.repo(workspace).head.commit.hexsha)
+
+    pr_number = getattr(results["existing_pr"], "number", None) or args.pr
+    if pr_number is None:
         body = f"Closes #{args.issue}\n\nAutomated PR by Code Agent."
-        gh.create_pr(
+        pr_number = gh.create_pr(
             title=f"[Agent] {issue_title[:72]}",
             body=body,
             head=branch_name,
-        )
+        ).number
+    done = {
+        "pr": pr_number,
+        "sha": getattr(args, "head_sha", ""),
+        "trigger": getattr(args, "trigger", ""),
+    }
+    store.save(job, "done", done)
+    store.set_status(job, "done")
     print("Done")
     if temp_workspace:
-        print(f"Temp clone at {temp_workspace} (remove manually if not needed)", file=sys.stderr)
+        print(
+            f"Temp clone at {temp_workspace} (remove manually if not needed)",
+            file=sys.stderr,
+        )
+
+
+def _sync_history(cfg: Config, gh: GitHubClient) -> int:
+    added: list[int] = []
+
+    def sync() -> None:
+        try:
+            index = HistoryIndex.for_repo(cfg.repo_owner, cfg.repo_name)
+            try:
+                added.append(index.sync(gh))
+            finally:
+                index.close()
+        except Exception as e:
+            print(f"History sync failed: {e}", file=sys.stderr)
+
+    thread = threading.Thread(target=sync, name="history-sync", daemon=True)
+    thread.start()
+    thread.join(HISTORY_SYNC_TIMEOUT)
+    if thread.is_alive():
+        print(
+            f"History sync still running after {HISTORY_SYNC_TIMEOUT:.0f}s; "
+            "searching the entries indexed so far",
+            file=sys.stderr,
+        )
+    return added[0] if added else 0
+
+
+def _validate_and_fix(
+    agent: CodeAgent,
+    workspace: Path,
+    changed: list[str],
+    issue_title: str,
+    issue_body: str,
+    cfg: Config,
+    session: GitSession,
+) -> list[str]:
+    graph = DepGraph.default() if cfg.context_graph else None
+    try:
+        for attempt in range(cfg.validate_attempts + 1):
+            report = run_validation(workspace, changed, graph=graph)
+            if report.ok:
+                print(
+                    f"Local validation passed ({len(report.checks)} checks)",
+                    file=sys.stderr,
+                )
+                return changed
+            names = ", ".join(c.name for c in report.failures())
+            if attempt == cfg.validate_attempts:
+                print(
+                    f"Local validation still failing ({names}); "
+                    "pushing for CI and review",
+                    file=sys.stderr,
+                )
+                return changed
+            print(
+                f"Local validation failed ({names}); local fix attempt {attempt + 1}",
+                file=sys.stderr,
+            )
+            fixes = agent.plan_fixes(
+                issue_body,
+                issue_title,
+                working_diff(workspace, changed, session),
+                [{"body": report.feedback()}],
+            )
+            fixed = agent.apply_plan(fixes)
+            if not fixed:
+                print("Fix attempt produced no changes", file=sys.stderr)
+                return changed
+            changed = list(dict.fromkeys(changed + fixed))
+        return changed
+    finally:
+        if graph is not None:
+            graph.close()
+
+
+def _resolve_workspace(
+    args: argparse.Namespace,
+    cfg: Config,
+    session: GitSession,
+    branch_name: str,
+) -> tuple[Path, bool, Path | None]:
+    base_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+    workspace = getattr(args, "repo_path", None)
+    if workspace is not None:
+        try:
+            session.repo(workspace)
+        except InvalidGitRepositoryError:
+            print(f"Not a Git repository: {workspace}", file=sys.stderr)
+            sys.exit(1)
+        return workspace, True, None
+    if cfg.repo_owner and cfg.repo_name:
+        no_cache = getattr(args, "no_cache", False)
+        if not no_cache and not settle(cached_clone_dir(cfg.repo_owner, cfg.repo_name)):
+            print(
+                "Cached clone is still used by a timed-out job; "
+                "using a temporary clone",
+                file=sys.stderr,
+            )
+            no_cache = True
+        if no_cache:
+            from coding_agents.git_ops import clone_to_temp
+
+            workspace = clone_to_temp(
+                cfg.repo_owner,
+                cfg.repo_name,
+                github_token(cfg),
+                base_url=base_url,
+                session=session,
+            )
+            print(f"Cloned repo to {workspace}", file=sys.stderr)
+            return workspace, False, workspace
+        workspace = ensure_cached_clone(
+            cfg.repo_owner,
+            cfg.repo_name,
+            github_token(cfg),
+            base_url=base_url,
+            session=session,
+            branches=(branch_name,),
+        )
+        print(
+            f"Using cached clone at {workspace} (updated from origin)", file=sys.stderr
+        )
+        return workspace, False, None
+    workspace = cfg.workspace_path
+    try:
+        session.repo(workspace)
+    except InvalidGitRepositoryError:
+        print(
+            "Not a Git repository and GITHUB_REPOSITORY not set. "
+            "Set GITHUB_REPOSITORY=owner/repo or run from a repo clone.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    return workspace, True, None
 
 
 def main() -> None:
@@ -128,8 +531,43 @@ def main() -> None:
     parser.add_argument("--issue", type=int, required=True, help="Issue number")
     parser.add_argument("--pr", type=int, default=None, help="Existing PR (re-run)")
     parser.add_argument("--repo-path", type=Path, default=None, help="Repo path")
-    parser.add_argument("--verbose", "-v", action="store_true", help="Print issue title/body sent to agent")
-    parser.add_argument("--no-cache", action="store_true", help="Clone to temp dir instead of cache")
+    parser.add_argument(
+        "--verbose",
+        "-v",
+        action="store_true",
+        help="Print issue title/body sent to agent",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Clone to temp dir instead of cache"
+    )
+    parser.add_argument(
+        "--validate",
+        action="store_true",
+        help="Lint and run affected tests locally before push",
+    )
+    parser.add_argument(
+        "--no-history",
+        action="store_true",
+        help="Do not add similar past fixes to the prompt",
+    )
+    parser.add_argument(
+        "--fresh",
+        action="store_true",
+        help="Ignore saved checkpoints for this issue/PR",
+    )
+    parser.add_argument(
+        "--candidates",
+        type=int,
+        default=None,
+        help="Generate N plans in parallel and apply the best",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU and memory profiles to DIR",
+    )
     args = parser.parse_args()
     run_code_agent(args)
 
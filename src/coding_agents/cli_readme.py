@@ -3,44 +3,193 @@ import os
 import sys
 from pathlib import Path
 
-from git import Repo
 from git.exc import InvalidGitRepositoryError
 
 from coding_agents.config import Config
+from coding_agents.git_ops import GitSession, ensure_cached_clone, parse_github_url
+from coding_agents.github_app import github_token
+from coding_agents.llm.batch import (
+    BatchHandleStore,
+    BatchRequest,
+    create_batch_backend,
+    run_batch,
+)
 from coding_agents.llm.factory import create_llm_client
+from coding_agents.profiling import Profiler
 from coding_agents.readme_generator import ReadmeGenerator
-from coding_agents.git_ops import ensure_cached_clone
 
 
 def run_readme(args: argparse.Namespace) -> None:
     cfg = Config.from_env()
+    profiler = Profiler(getattr(args, "profile", None) or cfg.profile_dir, "readme")
+    try:
+        if getattr(args, "batch", None):
+            run_readme_batch(
+                cfg, args.batch, force=getattr(args, "force", False), profiler=profiler
+            )
+        else:
+            _run_readme(args, cfg, profiler)
+    finally:
+        profiler.finish()
+
+
+def _run_readme(args: argparse.Namespace, cfg: Config, profiler: Profiler) -> None:
     try:
         llm = create_llm_client(cfg)
     except ValueError as e:
         print(str(e), file=sys.stderr)
         sys.exit(1)
 
-    from coding_agents.git_ops import parse_github_url
+    session = GitSession()
+    workspace = resolve_workspace(cfg, getattr(args, "repo_path", None), session)
+
+    out = getattr(args, "output", None)
+    if out is None:
+        output_path = default_output_path(workspace, session)
+    else:
+        output_path = Path(out)
+        if not output_path.is_absolute():
+            output_path = (Path.cwd() / output_path).resolve()
+        else:
+            output_path = output_path.resolve()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    fingerprint_path = fingerprint_path_for(output_path)
+    generator = ReadmeGenerator(llm, workspace, exclude=(output_path, fingerprint_path))
+    with profiler.stage("context"):
+        fingerprint = generator.fingerprint()
+    if generator.compression is not None and generator.compression.saved > 0:
+        print(generator.compression.summary(), file=sys.stderr)
+    dry_run = getattr(args, "dry_run", False)
+    if not dry_run and not getattr(args, "force", False):
+        if output_path.exists() and read_fingerprint(fingerprint_path) == fingerprint:
+            print(f"Up to date (project unchanged): {output_path}")
+            return
+
+    with profiler.stage("generate"):
+        content = clean_readme(generator.generate())
+
+    if dry_run:
+        print(content)
+        return
+
+    output_path.write_text(content, encoding="utf-8")
+    fingerprint_path.write_text(fingerprint + "\n", encoding="utf-8")
+    print(f"Written to {output_path}")
+
+
+def run_readme_batch(
+    cfg: Config,
+    repos: list[str],
+    force: bool = False,
+    profiler: Profiler | None = None,
+) -> None:
+    profiler = profiler or Profiler(None)
+    try:
+        backend = create_batch_backend(cfg)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+    session = GitSession()
+    jobs: dict[str, tuple[Path, str]] = {}
+    sources: dict[str, Path] = {}
+    requests: list[BatchRequest] = []
+    for repo in repos:
+        workspace = resolve_workspace(cfg, repo, session)
+        output_path = default_output_path(workspace, session)
+        fingerprint_path = fingerprint_path_for(output_path)
+        generator = ReadmeGenerator(
+            None, workspace, exclude=(output_path, fingerprint_path)
+        )
+        with profiler.stage("context"):
+            fingerprint = generator.fingerprint()
+        if (
+            not force
+            and output_path.exists()
+            and read_fingerprint(fingerprint_path) == fingerprint
+        ):
+            print(f"Up to date (project unchanged): {output_path}")
+            continue
+        custom_id = str(output_path)
+        if custom_id in jobs:
+            if sources[custom_id] != workspace:
+                print(
+                    f"Skipped {repo}: {output_path} is already generated for "
+                    f"{sources[custom_id]} in this batch; "
+                    "run it separately with --output",
+                    file=sys.stderr,
+                )
+            continue
+        jobs[custom_id] = (output_path, fingerprint)
+        sources[custom_id] = workspace
+        requests.append(BatchRequest(custom_id, generator.messages()))
+
+    if not requests:
+        return
+    print(f"Submitting {len(requests)} README request(s) as one batch", file=sys.stderr)
+    store = BatchHandleStore.default()
+    try:
+        with profiler.stage("batch"):
+            results = run_batch(
+                backend,
+                requests,
+                poll_interval=cfg.batch_poll_interval,
+                timeout=cfg.batch_timeout,
+                store=store,
+            )
+    finally:
+        store.close()
+        backend.close()
+    failed = 0
+    for custom_id, (output_path, fingerprint) in jobs.items():
+        result = results[custom_id]
+        if not result.ok:
+            failed += 1
+            print(f"Failed {output_path}: {result.error}", file=sys.stderr)
+            continue
+        output_path.write_text(clean_readme(result.text), encoding="utf-8")
+        fingerprint_path_for(output_path).write_text(
+            fingerprint + "\n", encoding="utf-8"
+        )
+        print(f"Written to {output_path}")
+    if failed:
+        sys.exit(1)
+
 
-    repo_path_arg = getattr(args, "repo_path", None)
+def resolve_workspace(
+    cfg: Config, repo_path_arg: str | Path | None, session: GitSession
+) -> Path:
     workspace = None
 
     if repo_path_arg is not None:
         repo_path_str = str(repo_path_arg)
-        if repo_path_str.startswith("http://") or repo_path_str.startswith("https://") or repo_path_str.startswith("git@"):
+        if (
+            repo_path_str.startswith("http://")
+            or repo_path_str.startswith("https://")
+            or repo_path_str.startswith("git@")
+        ):
             parsed = parse_github_url(repo_path_str)
             if parsed:
                 owner, repo_name = parsed
-                base_url = "https://github.com" if "github.com" in repo_path_str else os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+                base_url = (
+                    "https://github.com"
+                    if "github.com" in repo_path_str
+                    else os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+                )
                 workspace = ensure_cached_clone(
                     owner,
                     repo_name,
-                    cfg.github_token,
+                    github_token(cfg, owner, repo_name),
                     base_url=base_url,
+                    session=session,
                 )
                 print(f"Cloned from URL to {workspace}", file=sys.stderr)
             else:
-                print("Could not parse GitHub URL. Use https://github.com/owner/repo or https://github.com/owner/repo.git", file=sys.stderr)
+                print(
+                    "Could not parse GitHub URL. Use https://github.com/owner/repo or https://github.com/owner/repo.git",
+                    file=sys.stderr,
+                )
                 sys.exit(1)
         else:
             workspace = Path(repo_path_arg).resolve()
@@ -56,62 +205,100 @@ def run_readme(args: argparse.Namespace) -> None:
         workspace = Path.cwd().resolve()
 
     try:
-        Repo(workspace)
+        session.repo(workspace)
     except InvalidGitRepositoryError:
         if cfg.repo_owner and cfg.repo_name:
             base_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
             workspace = ensure_cached_clone(
                 cfg.repo_owner,
                 cfg.repo_name,
-                cfg.github_token,
+                github_token(cfg),
                 base_url=base_url,
+                session=session,
             )
             print(f"Using cached clone at {workspace}", file=sys.stderr)
         else:
             print(
-                "Not a Git repository. Set GITHUB_REPOSITORY, pass --repo-path as path or URL (e.g. https://github.com/owner/repo.git).",
+                "Not a Git repository. Set GITHUB_REPOSITORY, pass --repo-path as "
+                "path or URL (e.g. https://github.com/owner/repo.git).",
                 file=sys.stderr,
             )
             sys.exit(1)
+    return workspace
 
-    generator = ReadmeGenerator(llm, workspace)
-    content = generator.generate()
+
+def default_output_path(workspace: Path, session: GitSession) -> Path:
+    try:
+        origin_url = session.repo(workspace).remotes.origin.url
+        parsed = parse_github_url(origin_url)
+        repo_name = parsed[1] if parsed else workspace.name
+    except Exception:
+        repo_name = workspace.name
+    output_dir = Path.cwd() / "generate-readme" / repo_name
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return output_dir / "README.md"
+
+
+def clean_readme(content: str) -> str:
     content = content.strip()
     if content.startswith("```"):
         content = content.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
+    return content
 
-    out = getattr(args, "output", None)
-    if out is None:
-        try:
-            origin_url = Repo(workspace).remotes.origin.url
-            parsed = parse_github_url(origin_url)
-            repo_name = parsed[1] if parsed else workspace.name
-        except Exception:
-            repo_name = workspace.name
-        output_dir = Path.cwd() / "generate-readme" / repo_name
-        output_dir.mkdir(parents=True, exist_ok=True)
-        output_path = output_dir / "README.md"
-    else:
-        output_path = Path(out)
-        if not output_path.is_absolute():
-            output_path = (Path.cwd() / output_path).resolve()
-        else:
-            output_path = output_path.resolve()
-        output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    if getattr(args, "dry_run", False):
-        print(content)
-        return
+def fingerprint_path_for(output_path: Path) -> Path:
+    return output_path.with_name(output_path.name + ".fingerprint")
 
-    output_path.write_text(content, encoding="utf-8")
-    print(f"Written to {output_path}")
+
+def read_fingerprint(path: Path) -> str:
+    try:
+        return path.read_text(encoding="utf-8").strip()
+    except OSError:
+        return ""
 
 
 def main() -> None:
-    parser = argparse.ArgumentParser(description="Generate README.md from project structure and config")
-    parser.add_argument("--repo-path", default=None, help="Project root: local path or GitHub URL (e.g. https://github.com/owner/repo.git)")
-    parser.add_argument("--output", type=Path, default=None, help="Output path (default: <repo>/README.md)")
-    parser.add_argument("--dry-run", action="store_true", help="Print README to stdout, do not write file")
+    parser = argparse.ArgumentParser(
+        description="Generate README.md from project structure and config"
+    )
+    parser.add_argument(
+        "--repo-path",
+        default=None,
+        help="Project root: local path or GitHub URL (e.g. https://github.com/owner/repo.git)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Output path (default: <repo>/README.md)",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print README to stdout, do not write file",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate even if project fingerprint is unchanged",
+    )
+    parser.add_argument(
+        "--batch",
+        nargs="+",
+        default=None,
+        metavar="REPO",
+        help=(
+            "Generate READMEs for several repos (paths or URLs) "
+            "in one batch LLM request"
+        ),
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU and memory profiles to DIR",
+    )
     args = parser.parse_args()
     run_readme(args)
 
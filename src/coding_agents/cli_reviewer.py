@@ -1,17 +1,26 @@
 import argparse
 import os
 import sys
+from pathlib import Path
+
+from git.exc import GitCommandError, InvalidGitRepositoryError
 
 from coding_agents.config import Config
+from coding_agents.git_ops import GitSession, ensure_cached_clone, pr_changes
+from coding_agents.github_app import github_token, has_github_auth
 from coding_agents.github_client import GitHubClient
 from coding_agents.llm.factory import create_llm_client
+from coding_agents.profiling import Profiler
 from coding_agents.reviewer_agent import ReviewerAgent
 
 
 def run_reviewer(args: argparse.Namespace) -> None:
     cfg = Config.from_env()
-    if not cfg.github_token:
-        print("Set GITHUB_TOKEN", file=sys.stderr)
+    if not has_github_auth(cfg):
+        print(
+            "Set GITHUB_TOKEN or GITHUB_APP_ID with GITHUB_APP_PRIVATE_KEY",
+            file=sys.stderr,
+        )
         sys.exit(1)
     try:
         llm = create_llm_client(cfg)
@@ -21,26 +30,84 @@ def run_reviewer(args: argparse.Namespace) -> None:
 
     ci_summary = args.ci_summary or os.environ.get("CI_SUMMARY", "No CI data provided.")
 
-    gh = GitHubClient(cfg.github_token, cfg.repo_owner, cfg.repo_name)
-    reviewer = ReviewerAgent(llm, gh)
-
-    issue_body = gh.get_issue_body(args.issue)
-    issue_title = gh.get_issue_title(args.issue)
-    pr_diff = gh.get_pr_diff(args.pr)
-    pr_files = gh.get_pr_files(args.pr)
-
-    review_text = reviewer.review(
-        issue_body, issue_title, pr_diff, pr_files, ci_summary
+    gh = GitHubClient.from_config(cfg)
+    reviewer = ReviewerAgent(llm, gh, config=cfg)
+    profiler = Profiler(
+        getattr(args, "profile", None) or cfg.profile_dir, f"reviewer-{args.pr}"
     )
-    reviewer.post_review_to_pr(args.pr, review_text)
+    try:
+        with profiler.stage("issue"):
+            issue_body = gh.get_issue_body(args.issue)
+            issue_title = gh.get_issue_title(args.issue)
+        session = GitSession()
+        with profiler.stage("pr_diff"):
+            workspace = _diff_workspace(args, cfg, session) if cfg.local_diff else None
+            pr_diff, pr_files = pr_changes(
+                gh, args.pr, workspace, cfg.diff_context_lines, session
+            )
+        with profiler.stage("review"):
+            review_text = reviewer.review(
+                issue_body, issue_title, pr_diff, pr_files, ci_summary
+            )
+        with profiler.stage("post"):
+            reviewer.post_review_to_pr(args.pr, review_text)
+    finally:
+        profiler.finish()
+    prepass = reviewer.prepass
+    if prepass is not None:
+        print(
+            f"Pre-pass: {prepass.kind} PR, {len(prepass.findings)} findings"
+            + (" (LLM skipped)" if reviewer.skipped_llm else ""),
+            file=sys.stderr,
+        )
     print("Review posted")
 
 
+def _diff_workspace(
+    args: argparse.Namespace, cfg: Config, session: GitSession
+) -> Path | None:
+    repo_path = getattr(args, "repo_path", None)
+    if repo_path is not None:
+        return repo_path
+    if not (cfg.repo_owner and cfg.repo_name):
+        return None
+    try:
+        return ensure_cached_clone(
+            cfg.repo_owner,
+            cfg.repo_name,
+            github_token(cfg),
+            base_url=os.environ.get("GITHUB_SERVER_URL", "https://github.com"),
+            session=session,
+        )
+    except (GitCommandError, InvalidGitRepositoryError) as e:
+        print(f"Cached clone unavailable, using GitHub files API: {e}", file=sys.stderr)
+        return None
+
+
 def main() -> None:
-    parser = argparse.ArgumentParser(description="AI Reviewer Agent: review PR and post comment")
+    parser = argparse.ArgumentParser(
+        description="AI Reviewer Agent: review PR and post comment"
+    )
     parser.add_argument("--pr", type=int, required=True, help="Pull request number")
-    parser.add_argument("--issue", type=int, required=True, help="Issue number (for requirements)")
-    parser.add_argument("--ci-summary", type=str, default="", help="CI jobs summary (e.g. from GHA)")
+    parser.add_argument(
+        "--issue", type=int, required=True, help="Issue number (for requirements)"
+    )
+    parser.add_argument(
+        "--ci-summary", type=str, default="", help="CI jobs summary (e.g. from GHA)"
+    )
+    parser.add_argument(
+        "--repo-path",
+        type=Path,
+        default=None,
+        help="Local clone to compute the PR diff in",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Write per-stage CPU and memory profiles to DIR",
+    )
     args = parser.parse_args()
     run_reviewer(args)
 
@@ -0,0 +1,40 @@
+import argparse
+import sys
+
+from coding_agents.config import Config
+from coding_agents.github_app import has_github_auth
+from coding_agents.worker import serve
+
+
+def run_serve(args: argparse.Namespace) -> None:
+    cfg = Config.from_env()
+    if not has_github_auth(cfg):
+        print(
+            "Set GITHUB_TOKEN or GITHUB_APP_ID with GITHUB_APP_PRIVATE_KEY",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    if not cfg.webhook_secret:
+        print(
+            "WEBHOOK_SECRET is not set: /run-code accepts unauthenticated requests",
+            file=sys.stderr,
+        )
+    try:
+        serve(cfg, args.host, args.port)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        sys.exit(1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Resident Code Agent worker: accepts /run-code webhooks"
+    )
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address")
+    parser.add_argument("--port", type=int, default=8080, help="Port")
+    args = parser.parse_args()
+    run_serve(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,39 @@
 import base64
 import json
 import re
+import sqlite3
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from pydantic import BaseModel
 
-from coding_agents.github_client import GitHubClient
+from coding_agents.compression import ContextCompressor
+from coding_agents.context_builder import (
+    DEFAULT_MAX_BYTES,
+    DEFAULT_MAX_TOKENS,
+    ContextBuilder,
+    estimate_tokens,
+)
+from coding_agents.depgraph import DepGraph
+from coding_agents.framing import (
+    FRAME_RULES,
+    FrameParser,
+    boundary_hint,
+    has_frames,
+    new_boundary,
+)
+from coding_agents.git_ops import list_repo_files, split_diff
 from coding_agents.llm.base import LLMClientProtocol
+from coding_agents.llm.continuation import chat_continued
+from coding_agents.llm.structured import get_structured_client
+from coding_agents.prompts import assemble_messages, supports_cache_control
+from coding_agents.validation import score_plan
 
 if TYPE_CHECKING:
     from coding_agents.config import Config
+    from coding_agents.github_client import GitHubClient
 
 
 class FileEdit(BaseModel):
@@ -23,33 +45,39 @@ class Plan(BaseModel):
     files: list[FileEdit]
 
 
-PLAN_SYSTEM = """You are a coding agent. You receive:
+PLAN_SYSTEM = f"""You are a coding agent. You receive:
 1) The exact text of a GitHub Issue (title and body) — this is the task to implement.
 2) Optionally "Current repo files" — existing file paths and their content. You MUST use this to modify existing files correctly; output the full updated content for any file you change.
 
 Your task: implement what the issue asks for. If the issue describes changes to existing files, include those files in your output with the full new content. Do not leave out files that need to be updated.
 
-Output a single JSON object only, no markdown. Encode file content in base64 so the JSON stays valid:
-{"files": [{"path": "relative/path/to/file", "content_base64": "<base64 only>"}]}
-- "content_base64": MUST contain ONLY base64 characters (A-Z, a-z, 0-9, +, /, =). No spaces, no newlines, no quotes, no other text. One continuous string. Encode the ENTIRE file (UTF-8) as base64.
-- "path": relative to repo root. Output ONLY this JSON, no markdown."""
+{FRAME_RULES}
+Paths are relative to repo root."""  # noqa: E501
 
-FIX_SYSTEM = """You are a coding agent. Given an issue description, current PR diff, and reviewer feedback,
-you produce a JSON plan of code changes to address the feedback.
-Output ONLY valid JSON. Encode file content in base64 to avoid escaping issues:
-{"files": [{"path": "relative/path", "content_base64": "<base64-encoded UTF-8 content>"}]}
-Paths relative to repo root. No "content" field — use content_base64 only. No comments, PEP 8."""
+FIX_SYSTEM = f"""You are a coding agent. Given an issue description, current PR diff, and reviewer feedback,
+you produce the full new content of every file that must change to address the feedback.
+{FRAME_RULES}
+Paths relative to repo root. No comments, PEP 8."""  # noqa: E501
 
-PLAN_SYSTEM_INSTRUCTOR = """You are a coding agent. You receive a GitHub Issue (title and body) and optionally current repo files. Implement what the issue asks. For each file you change, output its path (relative to repo root) and the full new file content. Provide complete file content, not a patch."""
+PLAN_SYSTEM_INSTRUCTOR = """You are a coding agent. You receive a GitHub Issue (title and body) and optionally current repo files. Implement what the issue asks. For each file you change, output its path (relative to repo root) and the full new file content. Provide complete file content, not a patch."""  # noqa: E501
 
-FIX_SYSTEM_INSTRUCTOR = """You are a coding agent. Given an issue, PR diff, and reviewer feedback, produce file changes to address the feedback. For each changed file output path (relative to repo root) and full new file content. Complete content only, PEP 8 for Python."""
+CANDIDATE_TEMPERATURES = (0.2, 0.6, 0.9, 0.4, 0.75, 1.0)
+OUTPUT_TOKENS_BASE = 1000
+OUTPUT_TOKENS_PER_FILE = 300
+OUTPUT_TOKENS_MIN = 4000
+DEFAULT_MAX_OUTPUT_TOKENS = 8000
+DEFAULT_CONTINUATIONS = 3
+FOCUS_CONTEXT_SHARE = 0.25
+FOCUS_HEADER = b"Files related to this issue that did not fit above (path -> content):"
+
+FIX_SYSTEM_INSTRUCTOR = """You are a coding agent. Given an issue, PR diff, and reviewer feedback, produce file changes to address the feedback. For each changed file output path (relative to repo root) and full new file content. Complete content only, PEP 8 for Python."""  # noqa: E501
 
 
 class CodeAgent:
     def __init__(
         self,
         llm: LLMClientProtocol,
-        github: GitHubClient,
+        github: "GitHubClient",
         workspace: Path,
         config: Optional["Config"] = None,
     ):
@@ -57,72 +85,279 @@ class CodeAgent:
         self._github = github
         self._workspace = workspace
         self._config = config
+        self.plan_source = ""
+        self.structured_error: str | None = None
+        self.output_budget = DEFAULT_MAX_OUTPUT_TOKENS
+        self._focus: list[str] = []
+        self.focus_context = ""
+        self._compressor: ContextCompressor | None = None
 
-    def _repo_context(self, max_file_bytes: int = 50000) -> str:
-        lines = ["Current repo files (path -> content):"]
-        for fp in sorted(self._workspace.rglob("*")):
-            if not fp.is_file() or ".git" in fp.parts:
-                continue
-            try:
-                rel = fp.relative_to(self._workspace)
-            except ValueError:
-                continue
-            try:
-                content = fp.read_text(encoding="utf-8", errors="replace")
-            except Exception:
-                continue
-            if len(content.encode("utf-8")) > max_file_bytes:
-                content = content[:2000] + "\n... (truncated)"
-            lines.append(f"\n--- {rel} ---\n{content}")
-        return "\n".join(lines) if len(lines) > 1 else ""
-
-    def _plan_via_instructor(
-        self, system: str, user: str
-    ) -> Optional[list[dict]]:
-        if not self._config or self._config.llm_provider != "openrouter":
+    def _depgraph(self) -> DepGraph | None:
+        if not self._config or not self._config.context_graph:
             return None
         try:
-            import instructor
-        except ImportError:
+            return DepGraph.default()
+        except sqlite3.Error as e:
+            print(f"Dependency graph unavailable: {e}", file=sys.stderr)
+            return None
+
+    def _focus_files(
+        self, focus: str
+    ) -> tuple[list[str], list[tuple[str, str | None]]] | None:
+        graph = self._depgraph()
+        if graph is None:
+            return None
+        try:
+            files = list_repo_files(self._workspace)
+            snapshot = graph.scan(self._workspace, files)
+        finally:
+            graph.close()
+        seeds = snapshot.relevant(focus, self._config.context_seed_files)
+        if not seeds:
+            return None
+        self._focus = seeds
+        selected = seeds + sorted(snapshot.neighbors(seeds))
+        print(
+            f"Dependency graph: {len(seeds)} seed files, {len(selected) - len(seeds)} "
+            f"neighbours, {snapshot.parsed} blobs parsed",
+            file=sys.stderr,
+        )
+        return selected, files
+
+    def _repo_context(
+        self, max_file_bytes: int = 50000, focus: str | None = None
+    ) -> str:
+        max_bytes = (
+            self._config.context_max_bytes if self._config else DEFAULT_MAX_BYTES
+        )
+        max_tokens = (
+            self._config.context_max_tokens if self._config else DEFAULT_MAX_TOKENS
+        )
+        stable_bytes, stable_tokens = max_bytes, max_tokens
+        if self._config and self._config.context_graph:
+            stable_bytes = int(max_bytes * (1 - FOCUS_CONTEXT_SHARE))
+            stable_tokens = int(max_tokens * (1 - FOCUS_CONTEXT_SHARE))
+        focused = self._focus_files(focus) if focus else None
+        files = focused[1] if focused else list_repo_files(self._workspace)
+        compressor = (
+            ContextCompressor()
+            if self._config and self._config.context_compression
+            else None
+        )
+        self._compressor = compressor
+        self.focus_context = ""
+        included = set()
+        with ContextBuilder(stable_bytes, stable_tokens, compressor=compressor) as ctx:
+            skipped = []
+            for rel, sha in files:
+                if ctx.add_file(self._workspace, rel, sha, max_file_bytes):
+                    included.add(rel)
+                elif (self._workspace / rel).is_file():
+                    skipped.append(rel)
+            ctx.add_listing(skipped)
+            if ctx.omitted:
+                print(
+                    f"Repo context capped at {ctx.bytes} bytes (~{ctx.tokens} tokens); "
+                    f"{ctx.omitted} files omitted",
+                    file=sys.stderr,
+                )
+            context = ctx.getvalue()
+        if focused is not None:
+            shas = dict(files)
+            missing = [rel for rel in focused[0] if rel not in included]
+            with ContextBuilder(
+                max_bytes - stable_bytes,
+                max_tokens - stable_tokens,
+                compressor=compressor,
+                header=FOCUS_HEADER,
+            ) as tail:
+                for rel in missing:
+                    tail.add_file(self._workspace, rel, shas.get(rel), max_file_bytes)
+                self.focus_context = tail.getvalue()
+        if compressor is not None and compressor.original:
+            print(compressor.summary(), file=sys.stderr)
+        return context
+
+    def repo_context(self, focus: str | None = None) -> str:
+        return self._repo_context(focus=focus)
+
+    def _output_budget(self, paths: list[str]) -> int:
+        cap = (
+            self._config.llm_max_output_tokens
+            if self._config
+            else DEFAULT_MAX_OUTPUT_TOKENS
+        )
+        if not paths:
+            return cap
+        tokens = OUTPUT_TOKENS_BASE
+        for rel in dict.fromkeys(paths):
+            fp = self._workspace / rel
+            size = fp.stat().st_size if fp.is_file() else 0
+            tokens += OUTPUT_TOKENS_PER_FILE + estimate_tokens(size)
+        return min(cap, max(OUTPUT_TOKENS_MIN, tokens))
+
+    def _chat(self, messages: list[dict], **kwargs: Any) -> str:
+        continuations = (
+            self._config.llm_continuations if self._config else DEFAULT_CONTINUATIONS
+        )
+        return chat_continued(
+            self._llm, messages, continuations, max_tokens=self.output_budget, **kwargs
+        )
+
+    def _messages(self, system: str, stable: list[str], variable: str) -> list[dict]:
+        cache_control = bool(
+            self._config
+            and self._config.llm_provider in ("openrouter", "router")
+            and supports_cache_control(self._config.llm_model)
+        )
+        return assemble_messages(system, stable, variable, cache_control=cache_control)
+
+    def _plan_via_instructor(self, messages: list[dict]) -> list[dict] | None:
+        if not self._config or self._config.llm_provider != "openrouter":
             return None
         if not self._config.llm_api_key:
             return None
         try:
-            client = instructor.from_provider(
-                self._config.llm_model,
-                base_url="https://openrouter.ai/api/v1",
-                api_key=self._config.llm_api_key,
-                async_client=False,
-            )
+            client = get_structured_client(self._config.llm_api_key)
+        except ImportError:
+            return None
+        try:
             plan = client.create(
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user},
-                ],
+                model=self._config.llm_model,
+                messages=messages,
                 response_model=Plan,
+                max_retries=1,
+                max_tokens=self.output_budget,
             )
-            if not plan or not plan.files:
-                return None
-            return [
-                {"path": f.path, "content": f.content}
-                for f in plan.files
-                if f.path and f.content is not None
-            ]
-        except Exception:
+        except Exception as e:
+            self.structured_error = f"{type(e).__name__}: {str(e)[:300]}"
+            return None
+        files = [
+            {"path": f.path, "content": f.content}
+            for f in (plan.files if plan else [])
+            if f.path and f.content is not None
+        ]
+        if not files:
+            self.structured_error = "empty plan"
             return None
+        return files
 
-    def plan_changes(self, issue_body: str, issue_title: str) -> list[dict]:
-        user = f"Issue title: {issue_title}\n\nIssue body:\n{issue_body}"
-        repo_ctx = self._repo_context()
-        if repo_ctx:
-            user += f"\n\n{repo_ctx}"
-        plan = self._plan_via_instructor(PLAN_SYSTEM_INSTRUCTOR, user)
+    def _candidate_plan(
+        self, messages: list[dict], temperature: float, boundary: str
+    ) -> list[dict]:
+        try:
+            out = self._chat(messages, temperature=temperature)
+        except Exception as e:
+            print(
+                f"Candidate at temperature {temperature} failed: {e}", file=sys.stderr
+            )
+            return []
+        return self._parse_plan(out, boundary)
+
+    def _plan_best_of(self, messages: list[dict], n: int, boundary: str) -> list[dict]:
+        temperatures = [
+            CANDIDATE_TEMPERATURES[i % len(CANDIDATE_TEMPERATURES)] for i in range(n)
+        ]
+        graph = self._depgraph()
+        try:
+            with ThreadPoolExecutor(max_workers=n) as pool:
+                candidates = list(
+                    pool.map(
+                        lambda t: self._candidate_plan(messages, t, boundary),
+                        temperatures,
+                    )
+                )
+                scored = list(
+                    pool.map(
+                        lambda plan: score_plan(
+                            self._workspace,
+                            self.restore_plan(plan, quiet=True),
+                            graph=graph,
+                        ),
+                        candidates,
+                    )
+                )
+        finally:
+            if graph is not None:
+                graph.close()
+        best = max(range(n), key=lambda i: scored[i][0])
+        for i, (score, report) in enumerate(scored):
+            failed = ", ".join(c.name for c in report.failures()) or "none"
+            marker = " <- selected" if i == best else ""
+            print(
+                f"Candidate {i + 1} (t={temperatures[i]}): score {score}, failed "
+                f"checks: {failed}{marker}",
+                file=sys.stderr,
+            )
+        self.plan_source = f"best-of-{n}"
+        return candidates[best]
+
+    def _plan(
+        self,
+        structured_system: str,
+        raw_system: str,
+        stable: list[str],
+        variable: str,
+        candidates: int = 1,
+        paths: list[str] | None = None,
+    ) -> list[dict]:
+        self.plan_source = ""
+        self.structured_error = None
+        self.output_budget = self._output_budget(paths or [])
+        boundary = new_boundary()
+        raw_variable = f"{variable}\n\n{boundary_hint(boundary)}"
+        if candidates > 1:
+            return self._plan_best_of(
+                self._messages(raw_system, stable, raw_variable), candidates, boundary
+            )
+        plan = self._plan_via_instructor(
+            self._messages(structured_system, stable, variable)
+        )
         if plan:
+            self.plan_source = "structured"
             return plan
-        out = self._llm.chat(
-            [{"role": "system", "content": PLAN_SYSTEM}, {"role": "user", "content": user}]
+        if self.structured_error is not None:
+            if self._config and not self._config.structured_fallback:
+                print(
+                    f"Structured output failed ({self.structured_error}); "
+                    "fallback disabled (STRUCTURED_FALLBACK=0)",
+                    file=sys.stderr,
+                )
+                self.plan_source = "failed"
+                return []
+            print(
+                f"Structured output failed ({self.structured_error}); "
+                "falling back to framed text plan",
+                file=sys.stderr,
+            )
+            self.plan_source = "fallback"
+        else:
+            self.plan_source = "chat"
+        out = self._chat(self._messages(raw_system, stable, raw_variable))
+        return self._parse_plan(out, boundary)
+
+    def plan_changes(
+        self,
+        issue_body: str,
+        issue_title: str,
+        repo_context: str | None = None,
+        candidates: int = 1,
+        examples: str = "",
+    ) -> list[dict]:
+        repo_ctx = self._repo_context() if repo_context is None else repo_context
+        task = f"Issue title: {issue_title}\n\nIssue body:\n{issue_body}"
+        if examples:
+            task = f"{examples}\n\n---\n\n{task}"
+        if self.focus_context:
+            task = f"{self.focus_context}\n\n---\n\n{task}"
+        return self._plan(
+            PLAN_SYSTEM_INSTRUCTOR,
+            PLAN_SYSTEM,
+            [repo_ctx],
+            task,
+            candidates,
+            self._focus,
         )
-        return self._parse_plan(out)
 
     def plan_fixes(
         self,
@@ -130,21 +365,24 @@ class CodeAgent:
         issue_title: str,
         diff: str,
         review_comments: list[dict],
+        candidates: int = 1,
     ) -> list[dict]:
         feedback = "\n".join(
             f"- {c.get('body', c.get('path', ''))}" for c in review_comments
         )
-        user = f"""Issue: {issue_title}\n{issue_body}\n\nPR diff:\n{diff}\n\nReviewer feedback:\n{feedback}\n\nProduce file changes to fix the feedback."""
-        plan = self._plan_via_instructor(FIX_SYSTEM_INSTRUCTOR, user)
-        if plan:
-            return plan
-        out = self._llm.chat(
-            [
-                {"role": "system", "content": FIX_SYSTEM},
-                {"role": "user", "content": user},
-            ]
+        task = (
+            f"Issue: {issue_title}\n{issue_body}\n\nReviewer feedback:\n{feedback}\n\n"
+            "Produce file changes to fix the feedback."
+        )
+        paths = [f["filename"] for f in split_diff(diff)]
+        return self._plan(
+            FIX_SYSTEM_INSTRUCTOR,
+            FIX_SYSTEM,
+            [f"PR diff:\n{diff}"],
+            task,
+            candidates,
+            paths,
         )
-        return self._parse_plan(out)
 
     def _extract_json_object(self, raw: str) -> str:
         start = raw.find("{")
@@ -177,9 +415,7 @@ class CodeAgent:
         return ""
 
     def _repair_content_base64_fragments(self, raw: str) -> str:
-        while re.search(
-            r'"content_base64"\s*:\s*"[A-Za-z0-9+/=]+"\s*:\s*"', raw
-        ):
+        while re.search(r'"content_base64"\s*:\s*"[A-Za-z0-9+/=]+"\s*:\s*"', raw):
             raw = re.sub(
                 r'"content_base64"\s*:\s*"([A-Za-z0-9+/=]+)"\s*:\s*"([A-Za-z0-9+/=]+)"',
                 r'"content_base64":"\1\2"',
@@ -219,11 +455,24 @@ class CodeAgent:
             value_end = value_start + end_match.start()
         return raw[:value_start] + b64 + raw[value_end:]
 
-    def _parse_plan(self, raw: str) -> list[dict]:
+    def _parse_frames(self, raw: str, boundary: str | None = None) -> list[dict]:
+        parser = FrameParser(boundary)
+        files = [f for f in parser.feed(raw) + parser.close() if f["path"]]
+        if not files:
+            print(
+                "LLM raw response (no complete file frames):",
+                raw[:2500],
+                file=sys.stderr,
+            )
+        return files
+
+    def _parse_plan(self, raw: str, boundary: str | None = None) -> list[dict]:
         raw = raw.strip()
         if not raw:
             print("LLM raw response (empty):", repr(raw), file=sys.stderr)
             return []
+        if has_frames(raw):
+            return self._parse_frames(raw, boundary)
         if raw.startswith("```"):
             raw = re.sub(r"^```\w*\n?", "", raw)
             raw = re.sub(r"\n?```\s*$", "", raw)
@@ -264,7 +513,8 @@ class CodeAgent:
                         continue
                 if content is None:
                     print(
-                        "content_base64 decode failed (tried with 0,1,2 padding) | first 80 chars:",
+                        "content_base64 decode failed (tried with 0,1,2 padding) | "
+                        "first 80 chars:",
                         repr(b64[:80]),
                         file=sys.stderr,
                     )
@@ -274,16 +524,45 @@ class CodeAgent:
             if content is not None:
                 result.append({"path": f["path"], "content": content})
         if not result:
-            print("LLM raw response (no valid file entries):", raw[:2500], file=sys.stderr)
+            print(
+                "LLM raw response (no valid file entries):", raw[:2500], file=sys.stderr
+            )
             return []
         return result
 
-    def apply_plan(self, plan: list[dict]) -> None:
+    def restore_plan(self, plan: list[dict], quiet: bool = False) -> list[dict]:
+        restored = []
         for item in plan:
             path = item.get("path")
             content = item.get("content")
             if not path or content is None:
                 continue
+            if self._compressor is not None:
+                content = self._compressor.restore(path, content)
+                if content is None:
+                    if not quiet:
+                        print(
+                            f"Skipping {path}: "
+                            "plan kept the generated-file placeholder",
+                            file=sys.stderr,
+                        )
+                    continue
+            restored.append({"path": path, "content": content})
+        return restored
+
+    def apply_plan(self, plan: list[dict]) -> list[str]:
+        changed = []
+        for item in self.restore_plan(plan):
+            path, content = item["path"], item["content"]
             fp = self._workspace / path
+            data = content.encode("utf-8")
+            if (
+                fp.is_file()
+                and fp.stat().st_size == len(data)
+                and fp.read_bytes() == data
+            ):
+                continue
             fp.parent.mkdir(parents=True, exist_ok=True)
-            fp.write_text(content, encoding="utf-8")
+            fp.write_bytes(data)
+            changed.append(path)
+        return changed
@@ -0,0 +1,342 @@
+import difflib
+import hashlib
+import json
+import re
+import threading
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from pathlib import PurePosixPath
+
+LICENSE_MARKERS = (
+    "copyright",
+    "license",
+    "spdx-license-identifier",
+    "all rights reserved",
+)
+GENERATED_MARKERS = (
+    "@generated",
+    "do not edit",
+    "code generated by",
+    "auto-generated",
+    "autogenerated",
+)
+GENERATED_NAMES = {
+    "package-lock.json",
+    "npm-shrinkwrap.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "poetry.lock",
+    "uv.lock",
+    "Pipfile.lock",
+    "Cargo.lock",
+    "composer.lock",
+    "Gemfile.lock",
+    "go.sum",
+}
+GENERATED_SUFFIXES = (
+    ".min.js",
+    ".min.css",
+    ".map",
+    "_pb2.py",
+    "_pb2_grpc.py",
+    ".pb.go",
+    ".g.dart",
+)
+HASH_COMMENT = (
+    ".py",
+    ".pyi",
+    ".sh",
+    ".bash",
+    ".rb",
+    ".pl",
+    ".r",
+    ".yaml",
+    ".yml",
+    ".toml",
+    ".cfg",
+    ".ini",
+)
+SLASH_COMMENT = (
+    ".js",
+    ".jsx",
+    ".ts",
+    ".tsx",
+    ".mjs",
+    ".cjs",
+    ".go",
+    ".java",
+    ".kt",
+    ".scala",
+    ".swift",
+    ".c",
+    ".h",
+    ".cc",
+    ".cpp",
+    ".hpp",
+    ".cs",
+    ".rs",
+    ".php",
+    ".dart",
+    ".css",
+    ".scss",
+)
+KEEP_TRAILING = (".md", ".markdown", ".rst", ".diff", ".patch")
+LICENSE_TAG = "[license header elided: same as "
+GENERATED_TAG = "[generated file elided:"
+MIN_HEADER_CHARS = 80
+MARKER_LINES = 5
+MAX_BLANK_LINES = 2
+BLOB_CACHE_ENTRIES = 4096
+
+_blob_cache: "OrderedDict[tuple[str, str], _Blob]" = OrderedDict()
+_blob_cache_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class _Blob:
+    text: str
+    rule: str
+    header_at: int = 0
+    header: str = ""
+    json_format: tuple[str | int | None, bool, bool] | None = None
+    original: str = ""
+
+
+def _comment_prefix(rel: str) -> str | None:
+    suffix = PurePosixPath(rel).suffix.lower()
+    if suffix in HASH_COMMENT:
+        return "#"
+    if suffix in SLASH_COMMENT:
+        return "//"
+    return None
+
+
+def is_generated(rel: str, head: str) -> bool:
+    name = PurePosixPath(rel).name
+    if name in GENERATED_NAMES or name.endswith(GENERATED_SUFFIXES):
+        return True
+    first = "\n".join(head.splitlines()[:MARKER_LINES]).lower()
+    return any(marker in first for marker in GENERATED_MARKERS)
+
+
+def generated_placeholder(size: int, lines: int | None = None) -> str:
+    counted = f"{lines} lines, " if lines is not None else ""
+    return f"{GENERATED_TAG} {counted}{size} bytes; regenerate it instead of editing]\n"
+
+
+def _leading_header(rel: str, text: str) -> tuple[int, str]:
+    prefix = _comment_prefix(rel)
+    if prefix is None:
+        return 0, ""
+    lines = text.splitlines(keepends=True)
+    start = 0
+    while (
+        start < len(lines)
+        and start < 2
+        and (lines[start].startswith("#!") or re.match(r"^#.*coding[:=]", lines[start]))
+    ):
+        start += 1
+    at = sum(len(line) for line in lines[:start])
+    end = start
+    if prefix == "//" and end < len(lines) and lines[end].lstrip().startswith("/*"):
+        while end < len(lines):
+            end += 1
+            if "*/" in lines[end - 1]:
+                break
+    else:
+        while end < len(lines) and lines[end].lstrip().startswith(prefix):
+            end += 1
+    header = "".join(lines[start:end])
+    if len(header) < MIN_HEADER_CHARS or not any(
+        m in header.lower() for m in LICENSE_MARKERS
+    ):
+        return 0, ""
+    return at, header
+
+
+def _json_format(text: str) -> tuple[str | int | None, bool, bool] | None:
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    m = re.search(r"\n([ \t]+)\S", text)
+    indent: str | int | None = None
+    if m:
+        indent = m.group(1) if "\t" in m.group(1) else len(m.group(1))
+    ascii_only = "\\u" in text
+    newline = text.endswith("\n")
+    if (
+        json.dumps(data, indent=indent, ensure_ascii=ascii_only)
+        + ("\n" if newline else "")
+        != text
+    ):
+        return None
+    return indent, ascii_only, newline
+
+
+def _tidy_pairs(rel: str, text: str) -> list[tuple[str, str]]:
+    keep_trailing = PurePosixPath(rel).suffix.lower() in KEEP_TRAILING
+    pairs: list[tuple[str, str]] = []
+    blanks = 0
+    for line in text.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        tidy = line if keep_trailing else body.rstrip(" \t") + line[len(body) :]
+        blanks = blanks + 1 if not tidy.strip() else 0
+        if blanks > MAX_BLANK_LINES:
+            pairs[-1] = (pairs[-1][0], pairs[-1][1] + line)
+        else:
+            pairs.append((tidy, line))
+    return pairs
+
+
+def _tidy(rel: str, text: str) -> str:
+    return "".join(tidy for tidy, _ in _tidy_pairs(rel, text))
+
+
+def _untidy(rel: str, original: str, content: str) -> str:
+    pairs = _tidy_pairs(rel, original)
+    tidy_lines = [tidy for tidy, _ in pairs]
+    new_lines = content.splitlines(keepends=True)
+    out = []
+    matcher = difflib.SequenceMatcher(None, tidy_lines, new_lines, autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == "equal":
+            out.extend(orig for _, orig in pairs[i1:i2])
+        else:
+            out.extend(new_lines[j1:j2])
+    return "".join(out)
+
+
+def _compress_blob(rel: str, text: str, size: int) -> _Blob:
+    if is_generated(rel, text[:2000]):
+        return _Blob(generated_placeholder(size, text.count("\n") + 1), "generated")
+    if PurePosixPath(rel).suffix.lower() == ".json":
+        fmt = _json_format(text)
+        if fmt is not None:
+            compact = json.dumps(
+                json.loads(text), separators=(",", ":"), ensure_ascii=False
+            )
+            if len(compact) < len(text):
+                return _Blob(compact + "\n", "json", json_format=fmt)
+    tidy = _tidy(rel, text)
+    at, header = _leading_header(rel, tidy)
+    if tidy == text:
+        return _Blob(text, "raw", at, header)
+    return _Blob(tidy, "text", at, header, original=text)
+
+
+def _cached_blob(key: tuple[str, str] | None) -> "_Blob | None":
+    if key is None:
+        return None
+    with _blob_cache_lock:
+        blob = _blob_cache.get(key)
+        if blob is not None:
+            _blob_cache.move_to_end(key)
+        return blob
+
+
+def _remember_blob(key: tuple[str, str] | None, blob: _Blob) -> None:
+    if key is None:
+        return
+    with _blob_cache_lock:
+        _blob_cache[key] = blob
+        while len(_blob_cache) > BLOB_CACHE_ENTRIES:
+            _blob_cache.popitem(last=False)
+
+
+class ContextCompressor:
+    def __init__(self) -> None:
+        self.original = 0
+        self.compressed = 0
+        self.rules: Counter[str] = Counter()
+        self._headers: dict[str, str] = {}
+        self._elided_headers: dict[str, str] = {}
+        self._json: dict[str, tuple[str | int | None, bool, bool]] = {}
+        self._generated: set[str] = set()
+        self._tidied: dict[str, str] = {}
+
+    @property
+    def saved(self) -> int:
+        return self.original - self.compressed
+
+    def compress(self, rel: str, data: bytes, sha: str | None = None) -> bytes:
+        key = (sha, rel) if sha else None
+        blob = _cached_blob(key)
+        if blob is None:
+            blob = _compress_blob(
+                rel, data.decode("utf-8", errors="replace"), len(data)
+            )
+            _remember_blob(key, blob)
+        text = blob.text
+        if blob.header:
+            digest = hashlib.sha1(blob.header.encode("utf-8")).hexdigest()
+            first = self._headers.setdefault(digest, rel)
+            if first != rel:
+                prefix = _comment_prefix(rel) or "#"
+                head, rest = (
+                    text[: blob.header_at],
+                    text[blob.header_at + len(blob.header) :],
+                )
+                text = f"{head}{prefix} {LICENSE_TAG}{first}]\n{rest}"
+                self._elided_headers[rel] = blob.header
+                self.rules["license"] += 1
+        if blob.json_format is not None:
+            self._json[rel] = blob.json_format
+        if blob.rule == "generated":
+            self._generated.add(rel)
+        if blob.original:
+            self._tidied[rel] = blob.original
+        if blob.rule != "raw":
+            self.rules[blob.rule] += 1
+        out = text.encode("utf-8")
+        self.original += len(data)
+        self.compressed += len(out)
+        return out
+
+    def elide(self, rel: str, head: bytes, size: int) -> bytes | None:
+        text = head.decode("utf-8", errors="replace")
+        if not is_generated(rel, text):
+            return None
+        self._generated.add(rel)
+        self.rules["generated"] += 1
+        out = generated_placeholder(size).encode("utf-8")
+        self.original += size
+        self.compressed += len(out)
+        return out
+
+    def restore(self, rel: str, content: str) -> str | None:
+        if rel in self._generated and content.lstrip().startswith(GENERATED_TAG):
+            return None
+        header = self._elided_headers.get(rel)
+        if header is not None:
+            placeholder = re.compile(
+                rf"^[^\n]*{re.escape(LICENSE_TAG)}[^\n]*\]\n?", re.MULTILINE
+            )
+            if placeholder.search(content):
+                content = placeholder.sub(lambda _: header, content, count=1)
+            elif header not in content and not content.startswith("#!"):
+                content = header + content
+        original = self._tidied.get(rel)
+        if original is not None:
+            content = _untidy(rel, original, content)
+        fmt = self._json.get(rel)
+        if fmt is not None:
+            indent, ascii_only, newline = fmt
+            try:
+                content = json.dumps(
+                    json.loads(content), indent=indent, ensure_ascii=ascii_only
+                ) + ("\n" if newline else "")
+            except ValueError:
+                pass
+        return content
+
+    def summary(self) -> str:
+        rules = (
+            ", ".join(f"{count} {rule}" for rule, count in sorted(self.rules.items()))
+            or "nothing"
+        )
+        percent = 100 * self.saved / self.original if self.original else 0.0
+        return (
+            f"Context compression: {self.original} -> {self.compressed} bytes "
+            f"(-{self.saved}, {percent:.0f}%); {rules}"
+        )
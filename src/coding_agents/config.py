@@ -1,10 +1,18 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 
-from dotenv import load_dotenv
+_dotenv_loaded = False
 
-load_dotenv()
+
+def load_env() -> None:
+    global _dotenv_loaded
+    if _dotenv_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _dotenv_loaded = True
 
 
 @dataclass(frozen=True)
@@ -19,9 +27,45 @@ class Config:
     yc_iam_token: str
     max_iterations: int
     workspace_path: Path
+    yc_api_key: str = ""
+    llm_fallback_models: tuple[str, ...] = ()
+    llm_cheap_model: str = ""
+    llm_small_prompt_chars: int = 12000
+    llm_hedge: bool = True
+    llm_hedge_after: float = 20.0
+    llm_max_output_tokens: int = 8000
+    llm_continuations: int = 3
+    structured_fallback: bool = True
+    webhook_secret: str = ""
+    webhook_debounce: float = 5.0
+    validate_before_push: bool = False
+    validate_attempts: int = 2
+    plan_candidates: int = 1
+    history_examples: int = 3
+    local_diff: bool = True
+    diff_context_lines: int = 3
+    review_fast_path: bool = True
+    context_max_bytes: int = 2_000_000
+    context_max_tokens: int = 100_000
+    context_graph: bool = True
+    context_seed_files: int = 8
+    context_compression: bool = True
+    openai_api_key: str = ""
+    batch_model: str = ""
+    batch_base_url: str = ""
+    batch_poll_interval: float = 2.0
+    batch_timeout: float = 86400.0
+    github_app_id: str = ""
+    github_app_private_key: str = ""
+    github_api_url: str = "https://api.github.com"
+    worker_queue_db: Path | None = None
+    worker_id: str = ""
+    worker_lease_ttl: float = 60.0
+    profile_dir: Path | None = None
 
     @classmethod
     def from_env(cls) -> "Config":
+        load_env()
         token = os.environ.get("GITHUB_TOKEN", "")
         repo = os.environ.get("GITHUB_REPOSITORY", "")
         if "/" in repo:
@@ -30,7 +74,7 @@ class Config:
             owner = os.environ.get("GITHUB_REPOSITORY_OWNER", "")
             name = repo or os.environ.get("REPO_NAME", "")
         provider = os.environ.get("LLM_PROVIDER", "openrouter").lower()
-        if provider not in ("openrouter", "yandexgpt"):
+        if provider not in ("openrouter", "yandexgpt", "router"):
             provider = "openrouter"
         api_key = os.environ.get("OPENROUTER_API_KEY", "") or os.environ.get(
             "OPENAI_API_KEY", ""
@@ -48,4 +92,81 @@ class Config:
             yc_iam_token=os.environ.get("YC_IAM_TOKEN", ""),
             max_iterations=int(os.environ.get("MAX_ITERATIONS", "5")),
             workspace_path=Path(os.environ.get("GITHUB_WORKSPACE", ".")),
+            yc_api_key=os.environ.get("YC_API_KEY", ""),
+            llm_fallback_models=_split_list(os.environ.get("LLM_FALLBACK_MODELS", "")),
+            llm_cheap_model=os.environ.get("LLM_CHEAP_MODEL", ""),
+            llm_small_prompt_chars=int(
+                os.environ.get("LLM_SMALL_PROMPT_CHARS", "12000")
+            ),
+            llm_hedge=_env_flag("LLM_HEDGE", True),
+            llm_hedge_after=float(os.environ.get("LLM_HEDGE_AFTER", "20")),
+            llm_max_output_tokens=max(
+                256, int(os.environ.get("LLM_MAX_OUTPUT_TOKENS", "8000"))
+            ),
+            llm_continuations=max(0, int(os.environ.get("LLM_CONTINUATIONS", "3"))),
+            structured_fallback=_env_flag("STRUCTURED_FALLBACK", True),
+            webhook_secret=os.environ.get("WEBHOOK_SECRET", ""),
+            webhook_debounce=float(os.environ.get("WEBHOOK_DEBOUNCE", "5")),
+            validate_before_push=_env_flag("VALIDATE_BEFORE_PUSH", False),
+            validate_attempts=int(os.environ.get("VALIDATE_ATTEMPTS", "2")),
+            plan_candidates=max(1, int(os.environ.get("PLAN_CANDIDATES", "1"))),
+            history_examples=max(0, int(os.environ.get("HISTORY_EXAMPLES", "3"))),
+            local_diff=_env_flag("LOCAL_DIFF", True),
+            diff_context_lines=max(0, int(os.environ.get("DIFF_CONTEXT_LINES", "3"))),
+            review_fast_path=_env_flag("REVIEW_FAST_PATH", True),
+            context_max_bytes=int(os.environ.get("CONTEXT_MAX_BYTES", "2000000")),
+            context_max_tokens=int(os.environ.get("CONTEXT_MAX_TOKENS", "100000")),
+            context_graph=_env_flag("CONTEXT_GRAPH", True),
+            context_seed_files=max(1, int(os.environ.get("CONTEXT_SEED_FILES", "8"))),
+            context_compression=_env_flag("CONTEXT_COMPRESSION", True),
+            openai_api_key=os.environ.get("OPENAI_API_KEY", ""),
+            batch_model=os.environ.get("LLM_BATCH_MODEL", ""),
+            batch_base_url=os.environ.get("LLM_BATCH_BASE_URL", ""),
+            batch_poll_interval=float(os.environ.get("LLM_BATCH_POLL_INTERVAL", "2")),
+            batch_timeout=float(os.environ.get("LLM_BATCH_TIMEOUT", "86400")),
+            github_app_id=os.environ.get("GITHUB_APP_ID", ""),
+            github_app_private_key=_private_key(),
+            github_api_url=os.environ.get("GITHUB_API_URL", "https://api.github.com"),
+            worker_queue_db=(
+                Path(os.environ["WORKER_QUEUE_DB"])
+                if os.environ.get("WORKER_QUEUE_DB")
+                else None
+            ),
+            worker_id=os.environ.get("WORKER_ID", ""),
+            worker_lease_ttl=float(os.environ.get("WORKER_LEASE_TTL", "60")),
+            profile_dir=(
+                Path(os.environ["AGENT_PROFILE_DIR"])
+                if os.environ.get("AGENT_PROFILE_DIR")
+                else None
+            ),
         )
+
+    def for_repo(self, slug: str) -> "Config":
+        if "/" not in slug:
+            return self
+        owner, name = slug.split("/", 1)
+        return replace(self, repo_owner=owner, repo_name=name)
+
+
+def _private_key() -> str:
+    key = os.environ.get("GITHUB_APP_PRIVATE_KEY", "")
+    if key:
+        return key.replace("\\n", "\n")
+    path = os.environ.get("GITHUB_APP_PRIVATE_KEY_PATH", "")
+    if not path:
+        return ""
+    try:
+        return Path(path).expanduser().read_text(encoding="utf-8")
+    except OSError:
+        return ""
+
+
+def _split_list(value: str) -> tuple[str, ...]:
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
@@ -0,0 +1,191 @@
+import mmap
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from pathlib import Path
+
+from coding_agents.compression import ContextCompressor
+
+HEADER = b"Current repo files (path -> content):"
+LISTING_HEADER = b"\n--- omitted repo files (paths only) ---\n"
+SPOOL_BYTES = 1 << 20
+MMAP_THRESHOLD = 1 << 16
+TRUNCATED_HEAD_BYTES = 2000
+BYTES_PER_TOKEN = 4
+BLOCK_CACHE_BYTES = 64 << 20
+DEFAULT_MAX_BYTES = 2_000_000
+DEFAULT_MAX_TOKENS = 100_000
+
+_block_cache: "OrderedDict[tuple[str, str, int], bytes]" = OrderedDict()
+_block_cache_bytes = 0
+_block_cache_lock = threading.Lock()
+
+
+def estimate_tokens(size: int) -> int:
+    return -(-size // BYTES_PER_TOKEN)
+
+
+def _cached_block(key: tuple[str, str, int] | None) -> bytes | None:
+    if key is None:
+        return None
+    with _block_cache_lock:
+        block = _block_cache.get(key)
+        if block is not None:
+            _block_cache.move_to_end(key)
+        return block
+
+
+def _remember_block(key: tuple[str, str, int] | None, block: bytes) -> None:
+    global _block_cache_bytes
+    if key is None or len(block) > BLOCK_CACHE_BYTES // 16:
+        return
+    with _block_cache_lock:
+        if key in _block_cache:
+            return
+        _block_cache[key] = block
+        _block_cache_bytes += len(block)
+        while _block_cache_bytes > BLOCK_CACHE_BYTES:
+            _, evicted = _block_cache.popitem(last=False)
+            _block_cache_bytes -= len(evicted)
+
+
+def _header(rel: str) -> bytes:
+    return f"\n--- {rel} ---\n".encode()
+
+
+class ContextBuilder:
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_tokens: int = DEFAULT_MAX_TOKENS,
+        spool_bytes: int = SPOOL_BYTES,
+        compressor: ContextCompressor | None = None,
+        header: bytes = HEADER,
+    ):
+        self._buf = tempfile.SpooledTemporaryFile(max_size=spool_bytes, mode="w+b")
+        self._max_bytes = max_bytes
+        self._max_tokens = max_tokens
+        self._compressor = compressor
+        self.bytes = 0
+        self.files = 0
+        self.omitted = 0
+        self._finished = False
+        self._write(header)
+
+    def __enter__(self) -> "ContextBuilder":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._buf.close()
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.bytes)
+
+    def _fits(self, size: int) -> bool:
+        total = self.bytes + size
+        return total <= self._max_bytes and estimate_tokens(total) <= self._max_tokens
+
+    def _write(self, data: bytes | mmap.mmap) -> None:
+        self._buf.write(data)
+        self.bytes += len(data)
+
+    def add(self, block: bytes) -> bool:
+        if not self._fits(len(block)):
+            self.omitted += 1
+            return False
+        self._write(block)
+        self.files += 1
+        return True
+
+    def add_file(
+        self, workspace: Path, rel: str, sha: str | None, max_file_bytes: int
+    ) -> bool:
+        if self._compressor is not None:
+            return self._add_compressed(
+                self._compressor, workspace, rel, sha, max_file_bytes
+            )
+        key = (sha, rel, max_file_bytes) if sha else None
+        block = _cached_block(key)
+        if block is not None:
+            return self.add(block)
+        fp = workspace / rel
+        try:
+            if not fp.is_file():
+                return False
+            size = fp.stat().st_size
+            header = _header(rel)
+            if size > max_file_bytes:
+                with open(fp, "rb") as f:
+                    block = header + f.read(TRUNCATED_HEAD_BYTES) + b"\n... (truncated)"
+            elif size >= MMAP_THRESHOLD:
+                return self._add_mapped(fp, header, size)
+            else:
+                block = header + fp.read_bytes()
+        except OSError:
+            return False
+        _remember_block(key, block)
+        return self.add(block)
+
+    def _add_compressed(
+        self,
+        compressor: ContextCompressor,
+        workspace: Path,
+        rel: str,
+        sha: str | None,
+        max_file_bytes: int,
+    ) -> bool:
+        fp = workspace / rel
+        try:
+            if not fp.is_file():
+                return False
+            size = fp.stat().st_size
+            with open(fp, "rb") as f:
+                data = f.read(TRUNCATED_HEAD_BYTES if size > max_file_bytes else size)
+        except OSError:
+            return False
+        if size > max_file_bytes:
+            body = compressor.elide(rel, data, size) or data + b"\n... (truncated)"
+        else:
+            body = compressor.compress(rel, data, sha)
+        return self.add(_header(rel) + body)
+
+    def _add_mapped(self, fp: Path, header: bytes, size: int) -> bool:
+        if not self._fits(len(header) + size):
+            self.omitted += 1
+            return False
+        with (
+            open(fp, "rb") as f,
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m,
+        ):
+            self._write(header)
+            self._write(m)
+        self.files += 1
+        return True
+
+    def add_listing(self, paths: Iterable[str]) -> int:
+        listed = 0
+        block = bytearray(LISTING_HEADER)
+        for rel in paths:
+            line = f"{rel}\n".encode()
+            if not self._fits(len(block) + len(line)):
+                break
+            block += line
+            listed += 1
+        if listed:
+            self._write(bytes(block))
+        return listed
+
+    def getvalue(self) -> str:
+        if not self.files:
+            return ""
+        if self.omitted and not self._finished:
+            self._finished = True
+            note = f"\n\n... ({self.omitted} more files omitted: context limit reached)"
+            self._write(note.encode())
+        self._buf.seek(0)
+        return self._buf.read().decode("utf-8", errors="replace")
@@ -0,0 +1,275 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+LEASE_TTL = 60.0
+AFFINITY_WAIT = 30.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    job_key TEXT PRIMARY KEY,
+    repo TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    sha TEXT NOT NULL DEFAULT '',
+    next_payload TEXT,
+    state TEXT NOT NULL,
+    owner TEXT,
+    token INTEGER NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS leases_state ON leases (state, enqueued_at);
+CREATE TABLE IF NOT EXISTS workers (
+    owner TEXT PRIMARY KEY,
+    seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS affinity (
+    repo TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    claimed_at REAL NOT NULL
+);
+"""
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def lease_key(job: dict) -> str:
+    return f"{job.get('repo') or ''}#{job['issue']}"
+
+
+@dataclass(frozen=True)
+class Lease:
+    key: str
+    job: dict
+    token: int
+
+
+class LeaseQueue:
+    def __init__(
+        self,
+        path: Path,
+        owner: str | None = None,
+        ttl: float = LEASE_TTL,
+        affinity_wait: float = AFFINITY_WAIT,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.owner = owner or default_worker_id()
+        self._ttl = ttl
+        self._affinity_wait = affinity_wait
+        self._clock = clock
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _seen(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute(
+            "INSERT INTO workers (owner, seen_at) VALUES (?, ?) "
+            "ON CONFLICT (owner) DO UPDATE SET seen_at = excluded.seen_at",
+            (self.owner, now),
+        )
+
+    def enqueue(self, job: dict) -> str:
+        key, sha = lease_key(job), job.get("sha", "")
+        payload = json.dumps(job)
+        with self._write() as conn:
+            now = self._clock()
+            row = conn.execute(
+                "SELECT state, sha, lease_until FROM leases WHERE job_key = ?", (key,)
+            ).fetchone()
+            if row is None or row[0] in ("done", "failed"):
+                if row is not None and sha and row[0] == "done" and row[1] == sha:
+                    return "duplicate"
+                conn.execute(
+                    "INSERT INTO leases "
+                    "(job_key, repo, payload, sha, state, enqueued_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, 'pending', ?, ?) "
+                    "ON CONFLICT (job_key) DO UPDATE SET payload = excluded.payload, "
+                    "sha = excluded.sha, next_payload = NULL, state = 'pending', "
+                    "owner = NULL, enqueued_at = excluded.enqueued_at, "
+                    "updated_at = excluded.updated_at",
+                    (key, job.get("repo") or "", payload, sha, now, now),
+                )
+                return "queued"
+            state, running_sha, lease_until = row
+            if state == "pending" or lease_until <= now:
+                conn.execute(
+                    "UPDATE leases SET payload = ?, sha = ?, updated_at = ? "
+                    "WHERE job_key = ?",
+                    (payload, sha, now, key),
+                )
+                return "debounced"
+            if sha and sha == running_sha and lease_until > now:
+                return "duplicate"
+            conn.execute(
+                "UPDATE leases SET next_payload = ?, updated_at = ? WHERE job_key = ?",
+                (payload, now, key),
+            )
+            return "deferred"
+
+    def _rank(
+        self, conn: sqlite3.Connection, now: float
+    ) -> list[tuple[str, str, int, float]]:
+        rows = conn.execute(
+            "SELECT job_key, repo, token, enqueued_at FROM leases "
+            "WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?) "
+            "ORDER BY enqueued_at",
+            (now,),
+        ).fetchall()
+        owners = dict(conn.execute("SELECT repo, owner FROM affinity").fetchall())
+        alive = {
+            owner
+            for (owner,) in conn.execute(
+                "SELECT owner FROM workers WHERE seen_at >= ?", (now - self._ttl,)
+            )
+        }
+        mine, free, waited = [], [], []
+        for row in rows:
+            holder = owners.get(row[1])
+            if holder == self.owner:
+                mine.append(row)
+            elif holder is None or holder not in alive:
+                free.append(row)
+            elif now - row[3] >= self._affinity_wait:
+                waited.append(row)
+        return mine + free + waited
+
+    def claim(self) -> Lease | None:
+        with self._write() as conn:
+            now = self._clock()
+            self._seen(conn, now)
+            ranked = self._rank(conn, now)
+            if not ranked:
+                return None
+            key, repo, token, _ = ranked[0]
+            token += 1
+            conn.execute(
+                "UPDATE leases SET state = 'leased', owner = ?, token = ?, "
+                "lease_until = ?, updated_at = ? WHERE job_key = ?",
+                (self.owner, token, now + self._ttl, now, key),
+            )
+            conn.execute(
+                "INSERT INTO affinity (repo, owner, claimed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (repo) DO UPDATE SET owner = excluded.owner, "
+                "claimed_at = excluded.claimed_at",
+                (repo, self.owner, now),
+            )
+            payload = conn.execute(
+                "SELECT payload FROM leases WHERE job_key = ?", (key,)
+            ).fetchone()[0]
+        return Lease(key, json.loads(payload), token)
+
+    def heartbeat(self, lease: Lease) -> bool:
+        with self._write() as conn:
+            now = self._clock()
+            self._seen(conn, now)
+            cur = conn.execute(
+                "UPDATE leases SET lease_until = ?, updated_at = ? "
+                "WHERE job_key = ? AND owner = ? AND token = ? AND state = 'leased'",
+                (now + self._ttl, now, lease.key, self.owner, lease.token),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, lease: Lease, ok: bool = True) -> bool:
+        with self._write() as conn:
+            now = self._clock()
+            row = conn.execute(
+                "SELECT next_payload FROM leases "
+                "WHERE job_key = ? AND owner = ? AND token = ? AND state = 'leased'",
+                (lease.key, self.owner, lease.token),
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] is not None:
+                job = json.loads(row[0])
+                conn.execute(
+                    "UPDATE leases SET payload = ?, sha = ?, next_payload = NULL, "
+                    "state = 'pending', owner = NULL, lease_until = 0, "
+                    "enqueued_at = ?, updated_at = ? WHERE job_key = ?",
+                    (row[0], job.get("sha", ""), now, now, lease.key),
+                )
+            else:
+                conn.execute(
+                    "UPDATE leases SET state = ?, lease_until = 0, updated_at = ? "
+                    "WHERE job_key = ?",
+                    ("done" if ok else "failed", now, lease.key),
+                )
+            return True
+
+    def pending(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM leases WHERE state = 'pending'"
+            ).fetchone()
+        return row[0]
+
+    def state(self, job: dict) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, owner, token, lease_until FROM leases WHERE job_key = ?",
+                (lease_key(job),),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "state": row[0],
+            "owner": row[1],
+            "token": row[2],
+            "lease_until": row[3],
+        }
+
+    @contextmanager
+    def holding(
+        self, lease: Lease, interval: float | None = None
+    ) -> Iterator[threading.Event]:
+        lost = threading.Event()
+        stop = threading.Event()
+        interval = interval or self._ttl / 3
+
+        def beat() -> None:
+            while not stop.wait(interval):
+                try:
+                    alive = self.heartbeat(lease)
+                except sqlite3.Error as e:
+                    print(f"Lease {lease.key}: heartbeat failed: {e}", file=sys.stderr)
+                    continue
+                if not alive:
+                    print(f"Lease {lease.key}: lost to another worker", file=sys.stderr)
+                    lost.set()
+                    return
+
+        thread = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
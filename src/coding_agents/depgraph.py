@@ -0,0 +1,261 @@
+import ast
+import json
+import posixpath
+import re
+import sqlite3
+import threading
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+
+from coding_agents.cache import cache_dir
+from coding_agents.git_ops import git_blob_sha, list_repo_files
+
+DEPGRAPH_CACHE = "depgraph"
+MAX_PARSE_BYTES = 1 << 20
+SEED_FILES = 8
+JS_SUFFIXES = (".js", ".jsx", ".ts", ".tsx", ".mjs", ".cjs", ".vue", ".svelte")
+JS_RESOLVE = ("", ".js", ".ts", ".jsx", ".tsx", ".mjs", "/index.js", "/index.ts")
+JS_IMPORT = re.compile(
+    r"""(?:\bimport\s[^'"]*?\bfrom\s*|\bimport\s*\(?\s*|\brequire\s*\(\s*|\bexport\s[^'"]*?\bfrom\s*)['"](\.{1,2}/[^'"]+)['"]"""
+)
+WORD = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+PATH_MENTION = re.compile(r"[\w./-]+\.[A-Za-z0-9]+")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key TEXT PRIMARY KEY,
+    imports TEXT NOT NULL,
+    symbols TEXT NOT NULL
+);
+"""
+
+
+def module_name(rel: Path) -> str | None:
+    if rel.suffix != ".py":
+        return None
+    parts = list(rel.with_suffix("").parts)
+    if parts and parts[0] == "src":
+        parts = parts[1:]
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts) or None
+
+
+def raw_imports(tree: ast.AST) -> list[tuple[int, str, list[str]]]:
+    found = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            found.extend((0, alias.name, []) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            found.append(
+                (node.level, node.module or "", [alias.name for alias in node.names])
+            )
+    return found
+
+
+def resolve_imports(
+    records: Iterable[tuple[int, str, list[str]]], module: str, is_package: bool
+) -> set[str]:
+    found: set[str] = set()
+    package = module if is_package else module.rpartition(".")[0]
+    for level, base, names in records:
+        if level:
+            anchor = package.split(".") if package else []
+            anchor = anchor[: len(anchor) - (level - 1)] if level > 1 else anchor
+            base = ".".join([*anchor, base] if base else anchor)
+        if base:
+            found.add(base)
+            found.update(f"{base}.{name}" for name in names)
+    return found
+
+
+def _top_level_symbols(tree: ast.Module) -> list[str]:
+    names = []
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.append(node.name)
+        elif isinstance(node, ast.Assign):
+            names.extend(
+                t.id for t in node.targets if isinstance(t, ast.Name) and t.id.isupper()
+            )
+    return names
+
+
+def blob_kind(rel: str) -> str:
+    suffix = PurePosixPath(rel).suffix
+    if suffix == ".py":
+        return "py"
+    if suffix in JS_SUFFIXES:
+        return "js"
+    return "none"
+
+
+def parse_blob(kind: str, data: bytes) -> tuple[list, list[str]]:
+    if kind == "none" or len(data) > MAX_PARSE_BYTES:
+        return [], []
+    text = data.decode("utf-8", errors="replace")
+    if kind == "py":
+        try:
+            tree = ast.parse(text)
+        except (SyntaxError, ValueError):
+            return [], []
+        return raw_imports(tree), _top_level_symbols(tree)
+    symbols = re.findall(
+        r"\bexport\s+(?:default\s+)?(?:async\s+)?(?:function|class|const|let)\s+(\w+)",
+        text,
+    )
+    return sorted(set(JS_IMPORT.findall(text))), symbols
+
+
+def _resolve_js(rel: str, spec: str, files: set[str]) -> str | None:
+    base = posixpath.normpath(posixpath.join(posixpath.dirname(rel), spec))
+    for suffix in JS_RESOLVE:
+        if base + suffix in files:
+            return base + suffix
+    return None
+
+
+@dataclass
+class GraphSnapshot:
+    files: dict[str, str] = field(default_factory=dict)
+    kinds: dict[str, str] = field(default_factory=dict)
+    imports: dict[str, set[str]] = field(default_factory=dict)
+    symbols: dict[str, list[str]] = field(default_factory=dict)
+    edges: dict[str, set[str]] = field(default_factory=dict)
+    callers: dict[str, set[str]] = field(default_factory=dict)
+    parsed: int = 0
+
+    def import_map(self) -> dict[str, set[str]]:
+        return {
+            path: names
+            for path, names in self.imports.items()
+            if self.kinds.get(path) == "py"
+        }
+
+    def neighbors(self, paths: Iterable[str]) -> set[str]:
+        found: set[str] = set()
+        for path in paths:
+            found |= self.edges.get(path, set()) | self.callers.get(path, set())
+        return found - set(paths)
+
+    def relevant(self, text: str, limit: int = SEED_FILES) -> list[str]:
+        words = {w.lower() for w in WORD.findall(text)}
+        mentioned = {m.strip("./") for m in PATH_MENTION.findall(text)}
+        scores: dict[str, int] = {}
+        for path in self.files:
+            p = PurePosixPath(path)
+            score = 0
+            if any(m and (path == m or path.endswith("/" + m)) for m in mentioned):
+                score += 10
+            parts = {part.lower() for part in p.with_suffix("").parts}
+            score += 3 * len(words & parts)
+            score += 2 * len(words & {s.lower() for s in self.symbols.get(path, ())})
+            if score:
+                scores[path] = score
+        ranked = sorted(scores, key=lambda p: (-scores[p], p))
+        return ranked[:limit]
+
+    def link(self) -> None:
+        files = set(self.files)
+        modules = {}
+        for path in files:
+            module = module_name(Path(path))
+            if module:
+                modules[module] = path
+        for path, names in self.imports.items():
+            if self.kinds.get(path) == "py":
+                targets = {modules[n] for n in names if n in modules}
+            else:
+                targets = {
+                    t for t in (_resolve_js(path, spec, files) for spec in names) if t
+                }
+            targets.discard(path)
+            self.edges[path] = targets
+            for target in targets:
+                self.callers.setdefault(target, set()).add(path)
+
+
+class DepGraph:
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def default(cls, root: Path | None = None) -> "DepGraph":
+        return cls(cache_dir(DEPGRAPH_CACHE, root) / "blobs.sqlite3")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _known(self, keys: list[str]) -> dict[str, tuple[list, list[str]]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i : i + 500]
+                rows = self._conn.execute(
+                    "SELECT key, imports, symbols FROM blobs WHERE key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    chunk,
+                ).fetchall()
+                for key, imports, symbols in rows:
+                    found[key] = (json.loads(imports), json.loads(symbols))
+        return found
+
+    def scan(
+        self, workspace: Path, files: list[tuple[str, str | None]] | None = None
+    ) -> GraphSnapshot:
+        snapshot = GraphSnapshot()
+        keys: dict[str, str] = {}
+        pending: dict[str, bytes] = {}
+        for rel, sha in files if files is not None else list_repo_files(workspace):
+            kind = blob_kind(rel)
+            snapshot.files[rel] = sha or ""
+            snapshot.kinds[rel] = kind
+            if kind == "none":
+                continue
+            if sha is None:
+                try:
+                    data = (workspace / rel).read_bytes()
+                except OSError:
+                    continue
+                sha = git_blob_sha(data)
+                snapshot.files[rel] = sha
+                pending[rel] = data
+            keys[rel] = f"{kind}:{sha}"
+        known = self._known(sorted(set(keys.values())))
+        fresh = []
+        for rel, key in keys.items():
+            if key not in known:
+                data = pending.get(rel)
+                if data is None:
+                    try:
+                        data = (workspace / rel).read_bytes()
+                    except OSError:
+                        continue
+                known[key] = parse_blob(snapshot.kinds[rel], data)
+                fresh.append((key, *known[key]))
+            imports, symbols = known[key]
+            snapshot.symbols[rel] = symbols
+            if snapshot.kinds[rel] == "py":
+                module = module_name(Path(rel)) or ""
+                snapshot.imports[rel] = resolve_imports(
+                    imports, module, rel.endswith("__init__.py")
+                )
+            else:
+                snapshot.imports[rel] = set(imports)
+        if fresh:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO blobs (key, imports, symbols) "
+                    "VALUES (?, ?, ?)",
+                    [
+                        (key, json.dumps(imports), json.dumps(symbols))
+                        for key, imports, symbols in fresh
+                    ],
+                )
+        snapshot.parsed = len(fresh)
+        snapshot.link()
+        return snapshot
@@ -0,0 +1,116 @@
+import re
+import secrets
+import sys
+
+FILE_MARK = "<<<FILE"
+END_MARK = "<<<END"
+HEADER = re.compile(r"^<<<FILE ([A-Za-z0-9_-]+) (\S.*?)\s*$")
+TRAILER = re.compile(r"^<<<END ([A-Za-z0-9_-]+)(?: lines=(\d+))?\s*$")
+
+FRAME_RULES = """Output every changed file as a raw text frame
+(no JSON, no base64, no markdown fences):
+<<<FILE {boundary} relative/path/to/file
+<full new file content, exactly as it should be on disk>
+<<<END {boundary} lines=<number of content lines>
+- {boundary} is the boundary token given at the end of the user message;
+  copy it verbatim into every marker.
+- Content between the markers is taken literally: no escaping, no indentation changes.
+- Repeat the frame for each file. Write nothing outside the frames."""
+
+
+def new_boundary() -> str:
+    return secrets.token_hex(6)
+
+
+def boundary_hint(boundary: str) -> str:
+    return f"Boundary token for this response: {boundary}"
+
+
+def has_frames(text: str) -> bool:
+    return any(
+        HEADER.match(line) for line in text.splitlines() if line.startswith(FILE_MARK)
+    )
+
+
+def frame_files(files: list[dict], boundary: str) -> str:
+    out = []
+    for f in files:
+        content = f["content"]
+        if content and not content.endswith("\n"):
+            content += "\n"
+        out.append(
+            f"{FILE_MARK} {boundary} {f['path']}\n{content}{END_MARK} {boundary} "
+            f"lines={content.count(chr(10))}\n"
+        )
+    return "".join(out)
+
+
+class FrameParser:
+    def __init__(self, boundary: str | None = None):
+        self.boundary = boundary
+        self.truncated: list[str] = []
+        self.mismatched: list[str] = []
+        self._partial = ""
+        self._path: str | None = None
+        self._lines: list[str] = []
+
+    def feed(self, chunk: str) -> list[dict]:
+        data = self._partial + chunk
+        lines = data.splitlines(keepends=True)
+        self._partial = (
+            lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        )
+        done = []
+        for line in lines:
+            f = self._line(line)
+            if f is not None:
+                done.append(f)
+        return done
+
+    def close(self) -> list[dict]:
+        done = []
+        if self._partial:
+            line, self._partial = self._partial, ""
+            f = self._line(line)
+            if f is not None:
+                done.append(f)
+        if self._path is not None:
+            self.truncated.append(self._path)
+            print(
+                f"Frame for {self._path} has no end marker "
+                "(response truncated?); skipped",
+                file=sys.stderr,
+            )
+            self._path = None
+            self._lines = []
+        return done
+
+    def _line(self, line: str) -> dict | None:
+        if self._path is None:
+            m = HEADER.match(line) if line.startswith(FILE_MARK) else None
+            if m and (self.boundary is None or m.group(1) == self.boundary):
+                self.boundary = m.group(1)
+                self._path = m.group(2)
+                self._lines = []
+            return None
+        m = TRAILER.match(line) if line.startswith(END_MARK) else None
+        if not m or m.group(1) != self.boundary:
+            self._lines.append(line)
+            return None
+        path, content = self._path, "".join(self._lines)
+        self._path = None
+        self._lines = []
+        if m.group(2) is not None and int(m.group(2)) != content.count("\n"):
+            self.mismatched.append(path)
+            print(
+                f"Frame for {path}: trailer says {m.group(2)} lines, got "
+                f"{content.count(chr(10))}; skipped",
+                file=sys.stderr,
+            )
+            return None
+        return {"path": path, "content": content}
+
+
+def parse_frames(text: str, boundary: str | None = None) -> list[dict]:
+    parser = FrameParser(boundary)
+    return parser.feed(text) + parser.close()
@@ -1,18 +1,126 @@
+import hashlib
 import re
 import shutil
+import sys
 import tempfile
+import threading
+from collections.abc import Iterable
+from concurrent.futures import Future, wait
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
-from git import Repo
+from git import PushInfo, Repo
 from git.exc import GitCommandError, InvalidGitRepositoryError
 
+from coding_agents.cache import cache_dir
 
-def get_cache_root() -> Path:
-    import os
-    p = os.environ.get("AGENT_CACHE_DIR")
-    if p:
-        return Path(p).resolve()
-    return Path.cwd() / ".agent_cache"
+if TYPE_CHECKING:
+    from coding_agents.github_client import GitHubClient
+
+REPOS_CACHE = "repos"
+ABANDONED_CLONE_WAIT = 300.0
+PUSH_FAILED = (
+    PushInfo.ERROR
+    | PushInfo.REJECTED
+    | PushInfo.REMOTE_REJECTED
+    | PushInfo.REMOTE_FAILURE
+)
+
+_abandoned: dict[Path, list[Future[Any]]] = {}
+_abandoned_lock = threading.Lock()
+
+
+class GitSession:
+    def __init__(self) -> None:
+        self._repos: dict[Path, Repo] = {}
+        self._fetched: dict[Path, set[str]] = {}
+        self.paths: set[Path] = set()
+
+    def use(self, path: Path) -> None:
+        self.paths.add(Path(path).resolve())
+
+    def repo(self, path: Path) -> Repo:
+        key = Path(path).resolve()
+        self.paths.add(key)
+        if key not in self._repos:
+            self._repos[key] = Repo(key)
+        return self._repos[key]
+
+    def forget(self, path: Path) -> None:
+        key = Path(path).resolve()
+        self._repos.pop(key, None)
+        self._fetched.pop(key, None)
+
+    def mark_fetched(self, path: Path, *branches: str) -> None:
+        self._fetched.setdefault(Path(path).resolve(), set()).update(
+            b for b in branches if b
+        )
+
+    def fetch(self, path: Path, *branches: str) -> None:
+        key = Path(path).resolve()
+        done = self._fetched.setdefault(key, set())
+        pending = [b for b in dict.fromkeys(branches) if b and b not in done]
+        if not pending:
+            return
+        repo = self.repo(key)
+        existing = pending
+        if len(pending) > 1:
+            listing = repo.git.ls_remote("--heads", "origin", *pending)
+            refs = {line.split("\t", 1)[-1] for line in listing.splitlines()}
+            existing = [b for b in pending if f"refs/heads/{b}" in refs]
+        if existing:
+            try:
+                repo.remotes.origin.fetch([_refspec(b) for b in existing])
+            except GitCommandError as e:
+                if not _missing_ref(e):
+                    raise
+        done.update(pending)
+
+
+def _refspec(branch: str) -> str:
+    return f"+refs/heads/{branch}:refs/remotes/origin/{branch}"
+
+
+def _missing_ref(e: GitCommandError) -> bool:
+    return "couldn't find remote ref" in str(e)
+
+
+def _has_ref(repo: Repo, ref: str) -> bool:
+    try:
+        repo.git.rev_parse("--verify", "--quiet", ref)
+    except GitCommandError:
+        return False
+    return True
+
+
+def git_blob_sha(data: bytes) -> str:
+    h = hashlib.sha1(b"blob %d\0" % len(data))
+    h.update(data)
+    return h.hexdigest()
+
+
+def list_repo_files(workspace: Path) -> list[tuple[str, str | None]]:
+    try:
+        repo = Repo(workspace)
+        staged = repo.git.ls_files("-s", "-z")
+        modified = set(filter(None, repo.git.ls_files("-m", "-z").split("\0")))
+        others = repo.git.ls_files("-o", "--exclude-standard", "-z")
+    except (InvalidGitRepositoryError, GitCommandError):
+        files: list[tuple[str, str | None]] = []
+        for fp in workspace.rglob("*"):
+            if fp.is_file() and ".git" not in fp.relative_to(workspace).parts:
+                files.append((fp.relative_to(workspace).as_posix(), None))
+        return sorted(files)
+    entries: dict[str, str | None] = {}
+    for record in filter(None, staged.split("\0")):
+        meta, path = record.split("\t", 1)
+        mode, sha, _ = meta.split(" ", 2)
+        if mode == "160000":
+            continue
+        entries[path] = None if path in modified else sha
+    for path in filter(None, others.split("\0")):
+        entries[path] = None
+    return sorted(entries.items())
 
 
 def _cache_key(owner: str, repo_name: str) -> str:
@@ -31,10 +139,13 @@ def clone_to_temp(
     token: str,
     base_url: str = "https://github.com",
     base_branch: str = "main",
+    session: GitSession | None = None,
 ) -> Path:
     path = Path(tempfile.mkdtemp(prefix="coding_agent_"))
     url = _build_clone_url(owner, repo_name, token, base_url)
     _clone_into(url, path, base_branch)
+    if session is not None:
+        session.mark_fetched(path, base_branch)
     return path
 
 
@@ -61,11 +172,40 @@ def _build_clone_url(
     url = f"{base_url.rstrip('/')}/{owner}/{repo_name}.git"
     if token:
         from urllib.parse import urlparse
+
         parsed = urlparse(url)
         url = f"{parsed.scheme}://x-access-token:{token}@{parsed.netloc}{parsed.path}"
     return url
 
 
+def cached_clone_dir(
+    owner: str, repo_name: str, cache_root: Path | None = None
+) -> Path:
+    return cache_dir(REPOS_CACHE, cache_root) / _cache_key(owner, repo_name)
+
+
+def quarantine(paths: Iterable[Path], pending: list[Future[Any]]) -> None:
+    if not pending:
+        return
+    with _abandoned_lock:
+        for path in paths:
+            _abandoned.setdefault(Path(path).resolve(), []).extend(pending)
+
+
+def settle(path: Path, timeout: float = ABANDONED_CLONE_WAIT) -> bool:
+    key = Path(path).resolve()
+    with _abandoned_lock:
+        pending = list(_abandoned.get(key, ()))
+    if pending:
+        print(f"Waiting for timed-out stages still using {key}", file=sys.stderr)
+        wait(pending, timeout=timeout)
+    with _abandoned_lock:
+        left = [f for f in _abandoned.pop(key, ()) if not f.done()]
+        if left:
+            _abandoned[key] = left
+    return not left
+
+
 def ensure_cached_clone(
     owner: str,
     repo_name: str,
@@ -73,30 +213,35 @@ def ensure_cached_clone(
     base_url: str = "https://github.com",
     base_branch: str = "main",
     cache_root: Path | None = None,
+    session: GitSession | None = None,
+    branches: tuple[str, ...] = (),
 ) -> Path:
-    root = cache_root or get_cache_root()
-    root.mkdir(parents=True, exist_ok=True)
-    cache_dir = root / _cache_key(owner, repo_name)
+    session = session or GitSession()
+    clone_dir = cached_clone_dir(owner, repo_name, cache_root)
+    session.use(clone_dir)
     url = _build_clone_url(owner, repo_name, token, base_url)
 
-    if cache_dir.exists():
+    if clone_dir.exists():
         try:
-            repo = Repo(cache_dir)
-            repo.remotes.origin.fetch()
+            repo = session.repo(clone_dir)
+            repo.remotes.origin.set_url(url)
+            session.fetch(clone_dir, base_branch, *branches)
             for branch in (base_branch, "master"):
-                try:
+                session.fetch(clone_dir, branch)
+                if _has_ref(repo, f"refs/remotes/origin/{branch}"):
                     repo.git.checkout(branch)
                     repo.git.reset("--hard", f"origin/{branch}")
                     break
-                except GitCommandError:
-                    continue
         except (InvalidGitRepositoryError, GitCommandError):
-            shutil.rmtree(cache_dir, ignore_errors=True)
-            _clone_into(url, cache_dir, base_branch)
+            session.forget(clone_dir)
+            shutil.rmtree(clone_dir, ignore_errors=True)
+            _clone_into(url, clone_dir, base_branch)
+            session.mark_fetched(clone_dir, base_branch, *branches)
     else:
-        _clone_into(url, cache_dir, base_branch)
+        _clone_into(url, clone_dir, base_branch)
+        session.mark_fetched(clone_dir, base_branch, *branches)
 
-    return cache_dir
+    return clone_dir
 
 
 def ensure_branch(
@@ -104,21 +249,29 @@ def ensure_branch(
     branch_name: str,
     base: str = "main",
     from_current_head: bool = False,
+    session: GitSession | None = None,
 ) -> Repo:
-    repo = Repo(repo_path)
+    session = session or GitSession()
+    repo = session.repo(repo_path)
     if from_current_head:
         repo.git.checkout("-B", branch_name)
         return repo
     try:
-        repo.remotes.origin.fetch()
+        session.fetch(repo_path, branch_name, base)
     except GitCommandError:
         pass
     if branch_name in [b.name for b in repo.branches]:
         repo.git.checkout(branch_name)
-        try:
-            repo.git.pull("origin", branch_name)
-        except GitCommandError:
-            pass
+        if _has_ref(repo, f"refs/remotes/origin/{branch_name}"):
+            try:
+                repo.git.merge("--ff-only", f"origin/{branch_name}")
+            except GitCommandError:
+                print(
+                    f"Local {branch_name} diverged from origin/{branch_name}; "
+                    "resetting to the remote branch",
+                    file=sys.stderr,
+                )
+                repo.git.reset("--hard", f"origin/{branch_name}")
     else:
         try:
             repo.git.checkout("-b", branch_name, f"origin/{branch_name}")
@@ -130,17 +283,171 @@ def ensure_branch(
     return repo
 
 
+def working_diff(
+    repo_path: Path, paths: list[str], session: GitSession | None = None
+) -> str:
+    if not paths:
+        return ""
+    repo = session.repo(repo_path) if session else Repo(repo_path)
+    with tempfile.TemporaryDirectory(prefix="coding_agent_index_") as tmp:
+        env = {"GIT_INDEX_FILE": str(Path(tmp) / "index")}
+        repo.git.read_tree("HEAD", env=env)
+        repo.git.add("--intent-to-add", "--", *paths, env=env)
+        return repo.git.diff("HEAD", "--", *paths, env=env)
+
+
+MAX_BLOB_BYTES = 1_000_000
+
+
+def pr_head_ref(pr_number: int) -> str:
+    return f"refs/remotes/origin/pr/{pr_number}"
+
+
+def read_blobs(
+    repo_path: Path,
+    ref: str,
+    paths: list[str],
+    session: GitSession | None = None,
+) -> dict[str, str]:
+    repo = session.repo(repo_path) if session else Repo(repo_path)
+    tree = repo.commit(ref).tree
+    contents: dict[str, str] = {}
+    for path in paths:
+        try:
+            blob = tree / path
+        except KeyError:
+            continue
+        if blob.type != "blob" or blob.size > MAX_BLOB_BYTES:
+            continue
+        data = blob.data_stream.read()
+        if b"\0" not in data:
+            contents[path] = data.decode("utf-8", errors="replace")
+    return contents
+
+
+def fetch_pr(
+    repo_path: Path,
+    pr_number: int,
+    base: str = "main",
+    session: GitSession | None = None,
+) -> tuple[str, str]:
+    session = session or GitSession()
+    repo = session.repo(repo_path)
+    head_ref = pr_head_ref(pr_number)
+    repo.remotes.origin.fetch(
+        [
+            f"+refs/pull/{pr_number}/head:{head_ref}",
+            f"+refs/heads/{base}:refs/remotes/origin/{base}",
+        ]
+    )
+    session.mark_fetched(repo_path, base)
+    return f"refs/remotes/origin/{base}", head_ref
+
+
+def local_pr_diff(
+    repo_path: Path,
+    pr_number: int,
+    base: str = "main",
+    context_lines: int = 3,
+    session: GitSession | None = None,
+) -> str:
+    session = session or GitSession()
+    base_ref, head_ref = fetch_pr(repo_path, pr_number, base, session)
+    return session.repo(repo_path).git.diff(
+        "--find-renames",
+        "--no-color",
+        "--no-ext-diff",
+        f"-U{context_lines}",
+        f"{base_ref}...{head_ref}",
+    )
+
+
+def split_diff(diff: str) -> list[dict]:
+    files: list[dict] = []
+    for block in re.split(r"^(?=diff --git )", diff, flags=re.MULTILINE):
+        if not block.startswith("diff --git "):
+            continue
+        header, _, hunks = block.partition("\n@@")
+        m = re.search(r"^\+\+\+ b/(.+)$", header, re.MULTILINE) or re.search(
+            r"^(?:rename to|--- a/)\s?(.+)$", header, re.MULTILINE
+        )
+        filename = m.group(1) if m else header.split("\n", 1)[0].rsplit(" b/", 1)[-1]
+        patch = f"@@{hunks}".rstrip("\n") if hunks else ""
+        files.append({"filename": filename.strip(), "patch": patch})
+    return files
+
+
+def pr_changes(
+    gh: "GitHubClient",
+    pr_number: int,
+    workspace: Path | None,
+    context_lines: int = 3,
+    session: GitSession | None = None,
+) -> tuple[str, list[dict]]:
+    if workspace is not None:
+        try:
+            base = gh.get_pr_by_number(pr_number).base.ref
+            diff = local_pr_diff(workspace, pr_number, base, context_lines, session)
+            files = split_diff(diff)
+            contents = read_blobs(
+                workspace,
+                pr_head_ref(pr_number),
+                [f["filename"] for f in files],
+                session,
+            )
+            for f in files:
+                if f["filename"] in contents:
+                    f["content"] = contents[f["filename"]]
+            return diff, files
+        except (GitCommandError, InvalidGitRepositoryError) as e:
+            print(f"Local PR diff failed, using GitHub files API: {e}", file=sys.stderr)
+    diff = gh.get_pr_diff(pr_number)
+    return diff, gh.get_pr_files(pr_number)
+
+
 def commit_and_push(
     repo_path: Path,
     branch_name: str,
     message: str,
     remote_url: str | None = None,
-) -> None:
-    repo = Repo(repo_path)
-    repo.git.add(A=True)
-    if repo.is_dirty() or repo.untracked_files:
+    paths: list[str] | None = None,
+    session: GitSession | None = None,
+) -> bool:
+    repo = session.repo(repo_path) if session else Repo(repo_path)
+    if paths is None:
+        repo.git.add(A=True)
+        committed = bool(repo.is_dirty() or repo.untracked_files)
+    else:
+        if paths:
+            repo.git.add("--", *paths)
+        committed = bool(paths) and bool(
+            repo.git.diff("--cached", "--name-only", "--", *paths)
+        )
+    if committed:
         repo.index.commit(message)
+    elif paths is not None and not _ahead_of_remote(repo, branch_name):
+        print(
+            f"No changes for {branch_name}; skipping commit and push", file=sys.stderr
+        )
+        return False
     origin = repo.remotes.origin
     if remote_url:
         origin.set_url(remote_url)
-    origin.push(branch_name, force=True)
+    pushed = origin.push(branch_name, force_with_lease=True)
+    pushed.raise_if_error()
+    rejected = [info.summary.strip() for info in pushed if info.flags & PUSH_FAILED]
+    if rejected:
+        raise GitCommandError(
+            ["git", "push", "origin", branch_name], 1, "; ".join(rejected).encode()
+        )
+    return True
+
+
+def _ahead_of_remote(repo: Repo, branch_name: str) -> bool:
+    try:
+        remote_sha = repo.git.rev_parse(
+            "--verify", "--quiet", f"refs/remotes/origin/{branch_name}"
+        )
+    except GitCommandError:
+        return True
+    return repo.head.commit.hexsha != remote_sha
@@ -0,0 +1,165 @@
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+import requests
+from github.Auth import Auth
+
+if TYPE_CHECKING:
+    from coding_agents.config import Config
+
+GITHUB_API = "https://api.github.com"
+JWT_LIFETIME = 540
+JWT_CLOCK_SKEW = 60
+REFRESH_MARGIN = 300.0
+
+
+def app_jwt(app_id: str, private_key: str, now: float | None = None) -> str:
+    import jwt
+
+    issued = int(time.time() if now is None else now)
+    payload = {
+        "iat": issued - JWT_CLOCK_SKEW,
+        "exp": issued + JWT_LIFETIME,
+        "iss": str(app_id),
+    }
+    return jwt.encode(payload, private_key, algorithm="RS256")
+
+
+@dataclass
+class InstallationToken:
+    token: str
+    expires_at: float
+
+
+class InstallationTokenPool:
+    def __init__(
+        self,
+        app_id: str,
+        private_key: str,
+        api_url: str = GITHUB_API,
+        refresh_margin: float = REFRESH_MARGIN,
+        clock: Callable[[], float] = time.time,
+    ):
+        self._app_id = app_id
+        self._private_key = private_key
+        self._api_url = api_url.rstrip("/")
+        self._refresh_margin = refresh_margin
+        self._clock = clock
+        self._http = requests.Session()
+        self._lock = threading.Lock()
+        self._jwt: InstallationToken | None = None
+        self._installations: dict[str, int] = {}
+        self._tokens: dict[int, InstallationToken] = {}
+        self._refresh_locks: dict[int, threading.Lock] = {}
+        self.issued = 0
+
+    def _app_token(self) -> str:
+        with self._lock:
+            now = self._clock()
+            if self._jwt is None or self._jwt.expires_at - JWT_CLOCK_SKEW <= now:
+                self._jwt = InstallationToken(
+                    app_jwt(self._app_id, self._private_key, now), now + JWT_LIFETIME
+                )
+            return self._jwt.token
+
+    def _request(self, method: str, path: str) -> dict:
+        resp = self._http.request(
+            method,
+            f"{self._api_url}{path}",
+            headers={
+                "Authorization": f"Bearer {self._app_token()}",
+                "Accept": "application/vnd.github+json",
+            },
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def installation_id(self, owner: str, repo: str) -> int:
+        key = owner.lower()
+        with self._lock:
+            if key in self._installations:
+                return self._installations[key]
+        installation = self._request("GET", f"/repos/{owner}/{repo}/installation")["id"]
+        with self._lock:
+            self._installations[key] = installation
+        return installation
+
+    def token(self, owner: str, repo: str) -> str:
+        installation = self.installation_id(owner, repo)
+        with self._lock:
+            cached = self._tokens.get(installation)
+            if (
+                cached is not None
+                and cached.expires_at - self._refresh_margin > self._clock()
+            ):
+                return cached.token
+            refresh = self._refresh_locks.setdefault(installation, threading.Lock())
+        with refresh:
+            with self._lock:
+                cached = self._tokens.get(installation)
+                if (
+                    cached is not None
+                    and cached.expires_at - self._refresh_margin > self._clock()
+                ):
+                    return cached.token
+            data = self._request(
+                "POST", f"/app/installations/{installation}/access_tokens"
+            )
+            expires = datetime.fromisoformat(
+                data["expires_at"].replace("Z", "+00:00")
+            ).timestamp()
+            fresh = InstallationToken(data["token"], expires)
+            with self._lock:
+                self._tokens[installation] = fresh
+                self.issued += 1
+            return fresh.token
+
+    def auth(self, owner: str, repo: str) -> "InstallationAuth":
+        return InstallationAuth(self, owner, repo)
+
+
+class InstallationAuth(Auth):
+    def __init__(self, pool: InstallationTokenPool, owner: str, repo: str):
+        self._pool = pool
+        self._owner = owner
+        self._repo = repo
+
+    @property
+    def token_type(self) -> str:
+        return "token"
+
+    @property
+    def token(self) -> str:
+        return self._pool.token(self._owner, self._repo)
+
+    @property
+    def _masked_token(self) -> str:
+        return "token (installation token removed)"
+
+
+@lru_cache(maxsize=4)
+def _pool(app_id: str, private_key: str, api_url: str) -> InstallationTokenPool:
+    return InstallationTokenPool(app_id, private_key, api_url)
+
+
+def token_pool(cfg: "Config") -> InstallationTokenPool | None:
+    if not (cfg.github_app_id and cfg.github_app_private_key):
+        return None
+    return _pool(cfg.github_app_id, cfg.github_app_private_key, cfg.github_api_url)
+
+
+def github_token(cfg: "Config", owner: str = "", repo: str = "") -> str:
+    pool = token_pool(cfg)
+    if pool is None:
+        return cfg.github_token
+    return pool.token(owner or cfg.repo_owner, repo or cfg.repo_name)
+
+
+def has_github_auth(cfg: "Config") -> bool:
+    return bool(cfg.github_token or token_pool(cfg))
@@ -1,15 +1,36 @@
+from collections.abc import Iterator
+from datetime import datetime
+from itertools import islice
+from typing import TYPE_CHECKING
+
 from github import Github
+from github.Auth import Auth
 from github.PullRequest import PullRequest
 from github.Repository import Repository
 
+if TYPE_CHECKING:
+    from coding_agents.config import Config
+
+MERGED_PR_SCAN_LIMIT = 300
+
 
 class GitHubClient:
-    def __init__(self, token: str, owner: str, repo_name: str):
-        self._gh = Github(token)
+    def __init__(
+        self, token: str, owner: str, repo_name: str, auth: Auth | None = None
+    ):
+        self._gh = Github(auth=auth) if auth is not None else Github(token)
         self._owner = owner
         self._repo_name = repo_name
         self._repo: Repository | None = None
 
+    @classmethod
+    def from_config(cls, cfg: "Config") -> "GitHubClient":
+        from coding_agents.github_app import token_pool
+
+        pool = token_pool(cfg)
+        auth = pool.auth(cfg.repo_owner, cfg.repo_name) if pool is not None else None
+        return cls(cfg.github_token, cfg.repo_owner, cfg.repo_name, auth=auth)
+
     @property
     def repo(self) -> Repository:
         if self._repo is None:
@@ -28,23 +49,65 @@ class GitHubClient:
         return self.repo.get_pull(pr_number)
 
     def get_pr_for_issue(self, issue_number: int) -> PullRequest | None:
-        pulls = self.repo.get_pulls(state="open", head=f"{self._owner}:agent-issue-{issue_number}")
+        pulls = self.repo.get_pulls(
+            state="open", head=f"{self._owner}:agent-issue-{issue_number}"
+        )
         for pr in pulls:
             return pr
         return None
 
     def get_pr_diff(self, pr_number: int) -> str:
-        pr = self.get_pr_by_number(pr_number)
-        files = pr.get_files()
+        return self._diff_of(self.get_pr_by_number(pr_number))
+
+    def _diff_of(self, pr: PullRequest) -> str:
         parts = []
-        for f in files:
+        for f in pr.get_files():
             if f.patch:
                 parts.append(f"--- a/{f.filename}\n+++ b/{f.filename}\n{f.patch}")
         return "\n".join(parts)
 
+    def iter_closed_issues(self, since: datetime | None = None) -> Iterator[dict]:
+        kwargs = {"state": "closed", "sort": "updated", "direction": "asc"}
+        if since is not None:
+            kwargs["since"] = since
+        for issue in self.repo.get_issues(**kwargs):
+            if issue.pull_request is not None:
+                continue
+            yield {
+                "number": issue.number,
+                "title": issue.title or "",
+                "body": issue.body or "",
+                "updated_at": issue.updated_at,
+            }
+
+    def iter_merged_agent_prs(
+        self, since: datetime | None = None, scan_limit: int = MERGED_PR_SCAN_LIMIT
+    ) -> Iterator[dict]:
+        newer = []
+        pulls = self.repo.get_pulls(state="closed", sort="updated", direction="desc")
+        for pr in islice(pulls, scan_limit):
+            if since is not None and pr.updated_at < since:
+                break
+            ref = pr.head.ref
+            if not pr.merged_at or not ref.startswith("agent-issue-"):
+                continue
+            suffix = ref.removeprefix("agent-issue-")
+            if suffix.isdigit():
+                newer.append((pr, int(suffix)))
+        for pr, issue in reversed(newer):
+            yield {
+                "number": pr.number,
+                "issue": issue,
+                "title": pr.title or "",
+                "diff": self._diff_of(pr),
+                "updated_at": pr.updated_at,
+            }
+
     def get_pr_files(self, pr_number: int) -> list[dict]:
         pr = self.get_pr_by_number(pr_number)
-        return [{"filename": f.filename, "patch": f.patch or ""} for f in pr.get_files()]
+        return [
+            {"filename": f.filename, "patch": f.patch or ""} for f in pr.get_files()
+        ]
 
     def get_pr_review_comments(self, pr_number: int) -> list[dict]:
         pr = self.get_pr_by_number(pr_number)
@@ -0,0 +1,196 @@
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from coding_agents.cache import cache_dir
+
+if TYPE_CHECKING:
+    from coding_agents.github_client import GitHubClient
+
+SYNC_LIMIT = 500
+SYNC_PR_LIMIT = 20
+MAX_QUERY_TERMS = 32
+EXAMPLE_BODY_CHARS = 800
+EXAMPLE_DIFF_CHARS = 2500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    issue INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    body TEXT NOT NULL,
+    diff TEXT NOT NULL,
+    UNIQUE (kind, number)
+);
+CREATE INDEX IF NOT EXISTS entries_issue ON entries (issue, kind);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    title, body, diff, content='entries', content_rowid='id', tokenize='unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, title, body, diff)
+    VALUES (new.id, new.title, new.body, new.diff);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, title, body, diff)
+    VALUES ('delete', old.id, old.title, old.body, old.diff);
+END;
+CREATE TABLE IF NOT EXISTS sync_state (kind TEXT PRIMARY KEY, updated_at TEXT NOT NULL);
+"""
+
+
+def match_query(text: str) -> str:
+    terms = dict.fromkeys(
+        t for t in re.findall(r"\w{3,}", text.lower()) if not t.isdigit()
+    )
+    return " OR ".join(f'"{t}"' for t in islice(terms, MAX_QUERY_TERMS))
+
+
+class HistoryIndex:
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def for_repo(
+        cls, owner: str, name: str, root: Path | None = None
+    ) -> "HistoryIndex":
+        return cls(cache_dir("history", root) / f"{owner}_{name}.sqlite3")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM entries").fetchone()[0]
+
+    def _upsert(
+        self, kind: str, number: int, issue: int, title: str, body: str, diff: str
+    ) -> None:
+        self._conn.execute(
+            "DELETE FROM entries WHERE kind = ? AND number = ?", (kind, number)
+        )
+        self._conn.execute(
+            "INSERT INTO entries (kind, number, issue, title, body, diff) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, number, issue, title, body, diff),
+        )
+
+    def add_issue(self, number: int, title: str, body: str) -> None:
+        with self._lock, self._conn:
+            self._upsert("issue", number, number, title, body, "")
+
+    def add_pr(self, number: int, issue: int, title: str, diff: str) -> None:
+        with self._lock, self._conn:
+            self._upsert("pr", number, issue, title, "", diff)
+
+    def _since(self, kind: str) -> datetime | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM sync_state WHERE kind = ?", (kind,)
+            ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def _mark_synced(self, kind: str, updated_at: datetime) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sync_state (kind, updated_at) VALUES (?, ?) "
+                "ON CONFLICT (kind) DO UPDATE SET updated_at = excluded.updated_at",
+                (kind, updated_at.isoformat()),
+            )
+
+    def sync(
+        self, gh: "GitHubClient", limit: int = SYNC_LIMIT, pr_limit: int = SYNC_PR_LIMIT
+    ) -> int:
+        added = 0
+        for kind, items, cap in (
+            ("issue", gh.iter_closed_issues(self._since("issue")), limit),
+            ("pr", gh.iter_merged_agent_prs(self._since("pr")), pr_limit),
+        ):
+            batch = list(islice(items, cap))
+            if not batch:
+                continue
+            with self._lock, self._conn:
+                for item in batch:
+                    if kind == "issue":
+                        self._upsert(
+                            "issue",
+                            item["number"],
+                            item["number"],
+                            item["title"],
+                            item["body"],
+                            "",
+                        )
+                    else:
+                        self._upsert(
+                            "pr",
+                            item["number"],
+                            item["issue"],
+                            item["title"],
+                            "",
+                            item["diff"],
+                        )
+            self._mark_synced(kind, max(item["updated_at"] for item in batch))
+            added += len(batch)
+        return added
+
+    def search(
+        self, text: str, k: int = 3, exclude_issue: int | None = None
+    ) -> list[dict]:
+        query = match_query(text)
+        if not query or k <= 0:
+            return []
+        with self._lock:
+            hits = self._conn.execute(
+                "SELECT e.issue FROM entries_fts "
+                "JOIN entries e ON e.id = entries_fts.rowid "
+                "WHERE entries_fts MATCH ? "
+                "ORDER BY bm25(entries_fts, 4.0, 1.0, 0.5) LIMIT ?",
+                (query, k * 8),
+            ).fetchall()
+            examples = []
+            for issue in dict.fromkeys(h[0] for h in hits):
+                if issue == exclude_issue:
+                    continue
+                rows = {
+                    kind: (title, body, diff)
+                    for kind, title, body, diff in self._conn.execute(
+                        "SELECT kind, title, body, diff FROM entries WHERE issue = ? "
+                        "ORDER BY number",
+                        (issue,),
+                    )
+                }
+                if "pr" not in rows:
+                    continue
+                title, body, _ = rows.get("issue", rows["pr"])
+                examples.append(
+                    {
+                        "issue": issue,
+                        "title": title,
+                        "body": body,
+                        "diff": rows["pr"][2],
+                    }
+                )
+                if len(examples) == k:
+                    break
+        return examples
+
+
+def format_examples(examples: list[dict]) -> str:
+    if not examples:
+        return ""
+    parts = ["Similar past issues and the merged fixes for them (for reference only):"]
+    for ex in examples:
+        body = ex["body"][:EXAMPLE_BODY_CHARS]
+        diff = ex["diff"][:EXAMPLE_DIFF_CHARS]
+        parts.append(
+            f"\n### Issue #{ex['issue']}: {ex['title']}\n{body}\n\nFix:\n{diff}"
+        )
+    return "\n".join(parts)
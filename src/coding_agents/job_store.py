@@ -0,0 +1,109 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from coding_agents.cache import cache_dir
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    inputs TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    job_id TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    value TEXT NOT NULL,
+    saved_at REAL NOT NULL,
+    PRIMARY KEY (job_id, stage)
+);
+"""
+
+
+def job_id(repo: str, issue: int, pr: int | None = None) -> str:
+    return f"{repo}#{issue}" + (f"/pr{pr}" if pr else "")
+
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class JobStore:
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def default(cls, root: Path | None = None) -> "JobStore":
+        return cls(cache_dir("jobs", root) / "ledger.sqlite3")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def begin(self, job: str, inputs: str, fresh: bool = False) -> dict[str, Any]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT inputs FROM jobs WHERE job_id = ?", (job,)
+            ).fetchone()
+            if fresh or row is None or row[0] != inputs:
+                self._conn.execute("DELETE FROM checkpoints WHERE job_id = ?", (job,))
+                self._conn.execute(
+                    "INSERT INTO jobs (job_id, inputs, status, attempts, updated_at) "
+                    "VALUES (?, ?, 'running', 1, ?) ON CONFLICT (job_id) DO UPDATE "
+                    "SET inputs = excluded.inputs, status = 'running', attempts = 1, "
+                    "updated_at = excluded.updated_at",
+                    (job, inputs, time.time()),
+                )
+                return {}
+            self._conn.execute(
+                "UPDATE jobs SET attempts = attempts + 1, updated_at = ? "
+                "WHERE job_id = ?",
+                (time.time(), job),
+            )
+            rows = self._conn.execute(
+                "SELECT stage, value FROM checkpoints WHERE job_id = ?", (job,)
+            ).fetchall()
+        return {stage: json.loads(value) for stage, value in rows}
+
+    def save(self, job: str, stage: str, value: Any) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO checkpoints (job_id, stage, value, saved_at) VALUES (?, "
+                "?, ?, ?) ON CONFLICT (job_id, stage) DO UPDATE SET "
+                "value = excluded.value, saved_at = excluded.saved_at",
+                (job, stage, json.dumps(value), time.time()),
+            )
+            self._conn.execute(
+                "UPDATE jobs SET updated_at = ? WHERE job_id = ?", (time.time(), job)
+            )
+
+    def set_status(self, job: str, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+                (status, time.time(), job),
+            )
+
+    def status(self, job: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status FROM jobs WHERE job_id = ?", (job,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def attempts(self, job: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT attempts FROM jobs WHERE job_id = ?", (job,)
+            ).fetchone()
+        return row[0] if row else 0
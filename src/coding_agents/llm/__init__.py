@@ -1,11 +1,35 @@
+from typing import TYPE_CHECKING, Any
+
 from coding_agents.llm.base import LLMClientProtocol
-from coding_agents.llm.factory import create_llm_client
-from coding_agents.llm.openrouter_client import OpenRouterClient
-from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+if TYPE_CHECKING:
+    from coding_agents.llm.factory import create_llm_client
+    from coding_agents.llm.openrouter_client import OpenRouterClient
+    from coding_agents.llm.router import Backend, RoutingLLMClient
+    from coding_agents.llm.yandexgpt_client import YandexGPTClient
 
 __all__ = [
     "LLMClientProtocol",
     "create_llm_client",
     "OpenRouterClient",
+    "Backend",
+    "RoutingLLMClient",
     "YandexGPTClient",
 ]
+
+_LAZY = {
+    "create_llm_client": "coding_agents.llm.factory",
+    "OpenRouterClient": "coding_agents.llm.openrouter_client",
+    "Backend": "coding_agents.llm.router",
+    "RoutingLLMClient": "coding_agents.llm.router",
+    "YandexGPTClient": "coding_agents.llm.yandexgpt_client",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    return getattr(importlib.import_module(module), name)
@@ -1,5 +1,27 @@
 from typing import Any, Protocol
 
+OPENROUTER_BASE = "https://openrouter.ai/api/v1"
+
+FINISH_STOP = "stop"
+FINISH_LENGTH = "length"
+
+
+class Completion(str):
+    finish_reason: str = ""
+
+    def __new__(cls, text: str, finish_reason: str = "") -> "Completion":
+        obj = super().__new__(cls, text)
+        obj.finish_reason = finish_reason
+        return obj
+
+    @property
+    def truncated(self) -> bool:
+        return self.finish_reason == FINISH_LENGTH
+
+
+def finish_reason(text: str) -> str:
+    return getattr(text, "finish_reason", "")
+
 
 class LLMClientProtocol(Protocol):
-    def chat(self, messages: list[dict[str, str]], **kwargs: Any) -> str: ...
+    def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> str: ...
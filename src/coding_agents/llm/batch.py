@@ -0,0 +1,344 @@
+import hashlib
+import json
+import sqlite3
+import sys
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Protocol
+
+from coding_agents.cache import cache_dir
+from coding_agents.llm.base import LLMClientProtocol
+
+if TYPE_CHECKING:
+    from coding_agents.config import Config
+    from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+OPENAI_BASE = "https://api.openai.com/v1"
+BATCH_TERMINAL = ("completed", "failed", "expired", "cancelled")
+HANDLE_TTL = 24 * 3600.0
+
+HANDLES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS handles (
+    custom_id TEXT PRIMARY KEY,
+    backend TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    handle TEXT NOT NULL,
+    submitted_at REAL NOT NULL
+);
+"""
+
+
+@dataclass
+class BatchRequest:
+    custom_id: str
+    messages: list[dict[str, Any]]
+    kwargs: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    custom_id: str
+    text: str = ""
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def request_digest(request: BatchRequest) -> str:
+    payload = json.dumps(
+        [request.messages, request.kwargs], sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class BatchBackend(Protocol):
+    name: str
+
+    def submit(self, requests: list[BatchRequest]) -> dict[str, Any]: ...
+
+    def poll(self, handles: dict[str, Any]) -> dict[str, BatchResult]: ...
+
+    def cancel(self, handles: dict[str, Any]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class BatchHandleStore:
+    def __init__(self, path: Path):
+        self._conn = sqlite3.connect(path, timeout=30)
+        with self._conn:
+            self._conn.executescript(HANDLES_SCHEMA)
+
+    @classmethod
+    def default(cls, root: Path | None = None) -> "BatchHandleStore":
+        return cls(cache_dir("batch", root) / "handles.sqlite3")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def resume(
+        self, backend: str, requests: list[BatchRequest], ttl: float = HANDLE_TTL
+    ) -> dict[str, str]:
+        digests = {r.custom_id: request_digest(r) for r in requests}
+        rows = self._conn.execute(
+            "SELECT custom_id, digest, handle FROM handles "
+            "WHERE backend = ? AND submitted_at > ?",
+            (backend, time.time() - ttl),
+        ).fetchall()
+        return {
+            cid: handle for cid, digest, handle in rows if digests.get(cid) == digest
+        }
+
+    def save(
+        self, backend: str, requests: list[BatchRequest], handles: dict[str, str]
+    ) -> None:
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO handles (custom_id, backend, digest, handle, "
+                "submitted_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (r.custom_id, backend, request_digest(r), handles[r.custom_id], now)
+                    for r in requests
+                ],
+            )
+
+    def forget(self, custom_ids: list[str]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "DELETE FROM handles WHERE custom_id = ?",
+                [(cid,) for cid in custom_ids],
+            )
+
+
+class YandexBatch:
+    name = "yandex"
+
+    def __init__(self, client: "YandexGPTClient"):
+        self._client = client
+
+    def submit(self, requests: list[BatchRequest]) -> dict[str, Any]:
+        return {
+            r.custom_id: self._client.submit_async(r.messages, **r.kwargs)
+            for r in requests
+        }
+
+    def poll(self, handles: dict[str, Any]) -> dict[str, BatchResult]:
+        finished = {}
+        for custom_id, operation_id in handles.items():
+            op = self._client.get_operation(operation_id)
+            if not op.get("done"):
+                continue
+            if "error" in op:
+                message = op["error"].get("message") or json.dumps(op["error"])
+                finished[custom_id] = BatchResult(custom_id, error=message)
+            else:
+                text = self._client.result_text(op.get("response", {}))
+                finished[custom_id] = BatchResult(custom_id, text=text)
+        return finished
+
+    def cancel(self, handles: dict[str, Any]) -> None:
+        for operation_id in handles.values():
+            try:
+                self._client.cancel_operation(operation_id)
+            except Exception as e:
+                print(
+                    f"Batch: failed to cancel operation {operation_id}: {e}",
+                    file=sys.stderr,
+                )
+
+    def close(self) -> None:
+        pass
+
+
+class OpenAIBatch:
+    def __init__(self, api_key: str, model: str, base_url: str = OPENAI_BASE):
+        from openai import OpenAI
+
+        self._client = OpenAI(api_key=api_key, base_url=base_url)
+        self._model = model
+        self.name = f"openai:{base_url}"
+
+    def submit(self, requests: list[BatchRequest]) -> dict[str, Any]:
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": r.custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {"model": self._model, "messages": r.messages, **r.kwargs},
+                }
+            )
+            for r in requests
+        ]
+        uploaded = self._client.files.create(
+            file=("batch.jsonl", "\n".join(lines).encode("utf-8")), purpose="batch"
+        )
+        batch = self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return {r.custom_id: batch.id for r in requests}
+
+    def _records(self, file_id: str | None) -> list[dict]:
+        if not file_id:
+            return []
+        text = self._client.files.content(file_id).text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    def poll(self, handles: dict[str, Any]) -> dict[str, BatchResult]:
+        finished = {}
+        for batch_id in set(handles.values()):
+            batch = self._client.batches.retrieve(batch_id)
+            if batch.status not in BATCH_TERMINAL:
+                continue
+            for record in self._records(batch.output_file_id) + self._records(
+                batch.error_file_id
+            ):
+                custom_id = record.get("custom_id", "")
+                response = record.get("response") or {}
+                if record.get("error") or response.get("status_code", 200) != 200:
+                    error = record.get("error") or response.get("body", {}).get("error")
+                    finished[custom_id] = BatchResult(
+                        custom_id, error=json.dumps(error)
+                    )
+                else:
+                    choices = response.get("body", {}).get("choices") or [{}]
+                    text = choices[0].get("message", {}).get("content") or ""
+                    finished[custom_id] = BatchResult(custom_id, text=text)
+            for custom_id, handle in handles.items():
+                if handle == batch_id and custom_id not in finished:
+                    finished[custom_id] = BatchResult(
+                        custom_id, error=f"batch {batch.status}"
+                    )
+        return finished
+
+    def cancel(self, handles: dict[str, Any]) -> None:
+        for batch_id in set(handles.values()):
+            try:
+                self._client.batches.cancel(batch_id)
+            except Exception as e:
+                print(f"Batch: failed to cancel batch {batch_id}: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class ThreadedBatch:
+    name = ""
+
+    def __init__(self, llm: LLMClientProtocol, max_workers: int = 4):
+        self._llm = llm
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="llm-batch"
+        )
+
+    def submit(self, requests: list[BatchRequest]) -> dict[str, Any]:
+        return {
+            r.custom_id: self._pool.submit(self._llm.chat, r.messages, **r.kwargs)
+            for r in requests
+        }
+
+    def poll(self, handles: dict[str, Future[str]]) -> dict[str, BatchResult]:
+        finished = {}
+        for custom_id, fut in handles.items():
+            if not fut.done():
+                continue
+            try:
+                finished[custom_id] = BatchResult(custom_id, text=fut.result())
+            except Exception as e:
+                finished[custom_id] = BatchResult(custom_id, error=str(e))
+        return finished
+
+    def cancel(self, handles: dict[str, Future[str]]) -> None:
+        for fut in handles.values():
+            fut.cancel()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def run_batch(
+    backend: BatchBackend,
+    requests: list[BatchRequest],
+    poll_interval: float = 2.0,
+    max_interval: float = 60.0,
+    timeout: float = 24 * 3600.0,
+    sleep: Callable[[float], None] = time.sleep,
+    clock: Callable[[], float] = time.monotonic,
+    store: BatchHandleStore | None = None,
+) -> dict[str, BatchResult]:
+    ids = [r.custom_id for r in requests]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Batch request custom_id values must be unique")
+    if not requests:
+        return {}
+    if store is None or not backend.name:
+        pending = backend.submit(requests)
+    else:
+        pending = store.resume(backend.name, requests)
+        if pending:
+            print(
+                f"Batch: resuming {len(pending)} request(s) submitted earlier",
+                file=sys.stderr,
+            )
+        fresh = [r for r in requests if r.custom_id not in pending]
+        if fresh:
+            submitted = backend.submit(fresh)
+            store.save(backend.name, fresh, submitted)
+            pending.update(submitted)
+    results: dict[str, BatchResult] = {}
+    deadline = clock() + timeout
+    interval = poll_interval
+    while pending:
+        finished = backend.poll(pending)
+        for custom_id, result in finished.items():
+            if pending.pop(custom_id, None) is not None:
+                results[custom_id] = result
+        if store is not None and finished:
+            store.forget(list(finished))
+        if not pending:
+            break
+        if clock() >= deadline:
+            backend.cancel(pending)
+            if store is not None:
+                store.forget(list(pending))
+            for custom_id in pending:
+                results[custom_id] = BatchResult(
+                    custom_id, error=f"timed out after {timeout:.0f}s"
+                )
+            break
+        if finished:
+            interval = poll_interval
+        print(
+            f"Batch: {len(results)}/{len(ids)} done, next poll in {interval:.0f}s",
+            file=sys.stderr,
+        )
+        sleep(min(interval, max(0.0, deadline - clock())))
+        interval = min(interval * 1.5, max_interval)
+    return results
+
+
+def create_batch_backend(
+    cfg: "Config", llm: LLMClientProtocol | None = None
+) -> BatchBackend:
+    if cfg.llm_provider == "yandexgpt":
+        from coding_agents.llm.factory import create_yandex_client
+
+        return YandexBatch(create_yandex_client(cfg))
+    if cfg.batch_base_url:
+        model = cfg.batch_model or cfg.llm_model.removeprefix("openai/")
+        return OpenAIBatch(
+            cfg.openai_api_key or cfg.llm_api_key, model, cfg.batch_base_url
+        )
+    if llm is None:
+        from coding_agents.llm.factory import create_llm_client
+
+        llm = create_llm_client(cfg)
+    return ThreadedBatch(llm)
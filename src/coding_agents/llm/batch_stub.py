@@ -0,0 +1,262 @@
+import argparse
+import itertools
+import json
+import re
+import sys
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+
+def echo_reply(messages: list[dict[str, Any]]) -> str:
+    last = messages[-1] if messages else {}
+    return f"echo: {last.get('text') or last.get('content') or ''}"
+
+
+class BatchStubServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        reply: Callable[[list[dict[str, Any]]], str] = echo_reply,
+        polls_until_done: int = 1,
+    ):
+        self._reply = reply
+        self._polls_until_done = polls_until_done
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.operations: dict[str, dict[str, Any]] = {}
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict[str, Any]] = {}
+        self.status_requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "BatchStubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "BatchStubServer":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+    def _new_id(self, prefix: str) -> str:
+        with self._lock:
+            return f"{prefix}-{next(self._ids)}"
+
+    def _yandex_submit(self, body: dict) -> dict:
+        op_id = self._new_id("op")
+        text = self._reply(body.get("messages", []))
+        self.operations[op_id] = {"polls": 0, "text": text}
+        return {"id": op_id, "done": False}
+
+    def _yandex_operation(self, op_id: str) -> dict | None:
+        op = self.operations.get(op_id)
+        if op is None:
+            return None
+        if op.get("cancelled"):
+            return {
+                "id": op_id,
+                "done": True,
+                "error": {"code": 1, "message": "cancelled"},
+            }
+        op["polls"] += 1
+        if op["polls"] < self._polls_until_done:
+            return {"id": op_id, "done": False}
+        return {
+            "id": op_id,
+            "done": True,
+            "response": {
+                "alternatives": [
+                    {
+                        "message": {"role": "assistant", "text": op["text"]},
+                        "status": "ALTERNATIVE_STATUS_FINAL",
+                    }
+                ]
+            },
+        }
+
+    def _openai_file(self, content: str) -> dict:
+        file_id = self._new_id("file")
+        self.files[file_id] = content
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": len(content),
+            "created_at": int(time.time()),
+            "filename": "batch.jsonl",
+            "purpose": "batch",
+            "status": "processed",
+        }
+
+    def _openai_batch(self, batch_id: str) -> dict:
+        batch = self.batches[batch_id]
+        if batch.get("cancelled"):
+            status = "cancelled"
+        else:
+            status = (
+                "completed"
+                if batch["polls"] >= self._polls_until_done
+                else "in_progress"
+            )
+        out = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": batch["endpoint"],
+            "status": status,
+            "input_file_id": batch["input_file_id"],
+            "completion_window": "24h",
+            "created_at": batch["created_at"],
+            "output_file_id": None,
+            "error_file_id": None,
+        }
+        if status == "completed":
+            if batch["output_file_id"] is None:
+                lines = []
+                for line in self.files[batch["input_file_id"]].splitlines():
+                    request = json.loads(line)
+                    text = self._reply(request["body"].get("messages", []))
+                    body = {
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": text},
+                            }
+                        ]
+                    }
+                    lines.append(
+                        json.dumps(
+                            {
+                                "custom_id": request["custom_id"],
+                                "response": {"status_code": 200, "body": body},
+                                "error": None,
+                            }
+                        )
+                    )
+                batch["output_file_id"] = self._openai_file("\n".join(lines))["id"]
+            out["output_file_id"] = batch["output_file_id"]
+        return out
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status: int, body: Any, raw: bool = False) -> None:
+                data = body.encode("utf-8") if raw else json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header(
+                    "Content-Type",
+                    "application/octet-stream" if raw else "application/json",
+                )
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+            def do_POST(self) -> None:  # noqa: N802
+                parts = self.path.rstrip("/").split("/")
+                if self.path.endswith(":cancel") and "operations" in parts:
+                    op_id = parts[-1].removesuffix(":cancel")
+                    op = stub.operations.get(op_id)
+                    if op is None:
+                        self._reply(404, {"error": "no such operation"})
+                    else:
+                        op["cancelled"] = True
+                        self._reply(
+                            200,
+                            {
+                                "id": op_id,
+                                "done": True,
+                                "error": {"code": 1, "message": "cancelled"},
+                            },
+                        )
+                elif parts[-1] == "cancel" and parts[-2] in stub.batches:
+                    stub.batches[parts[-2]]["cancelled"] = True
+                    self._reply(200, stub._openai_batch(parts[-2]))
+                elif self.path.endswith("/completionAsync"):
+                    self._reply(200, stub._yandex_submit(json.loads(self._body())))
+                elif self.path.endswith("/files"):
+                    m = re.search(
+                        rb"\r\n\r\n(.*?)\r\n--",
+                        self._body().split(b'name="file"', 1)[-1],
+                        re.DOTALL,
+                    )
+                    self._reply(
+                        200, stub._openai_file(m.group(1).decode("utf-8") if m else "")
+                    )
+                elif self.path.endswith("/batches"):
+                    payload = json.loads(self._body())
+                    batch_id = stub._new_id("batch")
+                    stub.batches[batch_id] = {
+                        "polls": 0,
+                        "endpoint": payload["endpoint"],
+                        "created_at": int(time.time()),
+                        "input_file_id": payload["input_file_id"],
+                        "output_file_id": None,
+                    }
+                    self._reply(200, stub._openai_batch(batch_id))
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_GET(self) -> None:  # noqa: N802
+                parts = self.path.rstrip("/").split("/")
+                if "operations" in parts:
+                    stub.status_requests += 1
+                    op = stub._yandex_operation(parts[-1])
+                    (
+                        self._reply(200, op)
+                        if op
+                        else self._reply(404, {"error": "no such operation"})
+                    )
+                elif "batches" in parts and parts[-1] in stub.batches:
+                    stub.status_requests += 1
+                    stub.batches[parts[-1]]["polls"] += 1
+                    self._reply(200, stub._openai_batch(parts[-1]))
+                elif parts[-1] == "content" and parts[-2] in stub.files:
+                    self._reply(200, stub.files[parts[-2]], raw=True)
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for LLM async/batch endpoints"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address")
+    parser.add_argument("--port", type=int, default=8090, help="Port")
+    parser.add_argument(
+        "--polls", type=int, default=1, help="Status polls before a job completes"
+    )
+    args = parser.parse_args()
+    server = BatchStubServer(args.host, args.port, polls_until_done=args.polls)
+    print(f"Batch stub listening on {server.url}", file=sys.stderr)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
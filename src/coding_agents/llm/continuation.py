@@ -0,0 +1,58 @@
+import sys
+from typing import Any
+
+from coding_agents.llm.base import (
+    FINISH_LENGTH,
+    Completion,
+    LLMClientProtocol,
+    finish_reason,
+)
+
+CONTINUE_PROMPT = (
+    "Your previous reply was cut off by the output length limit. Continue exactly "
+    "where it stopped, starting with the next character. Do not repeat what you "
+    "already wrote, do not restart the current file or frame, and add no preamble."
+)
+MIN_OVERLAP = 16
+MIN_MIDLINE_OVERLAP = 200
+MAX_OVERLAP = 2000
+
+
+def stitch(head: str, tail: str) -> str:
+    for size in range(min(len(head), len(tail), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if not head.endswith(tail[:size]):
+            continue
+        restarts_line = size == len(head) or head[-size - 1] == "\n"
+        if restarts_line or size >= MIN_MIDLINE_OVERLAP:
+            return head + tail[size:]
+    return head + tail
+
+
+def chat_continued(
+    llm: LLMClientProtocol,
+    messages: list[dict[str, Any]],
+    max_continuations: int,
+    **kwargs: Any,
+) -> Completion:
+    out = llm.chat(messages, **kwargs)
+    text, reason = str(out), finish_reason(out)
+    rounds = 0
+    while reason == FINISH_LENGTH and rounds < max_continuations and text:
+        rounds += 1
+        print(
+            f"LLM output truncated at {len(text)} chars; "
+            f"requesting continuation {rounds}/{max_continuations}",
+            file=sys.stderr,
+        )
+        follow_up = [
+            *messages,
+            {"role": "assistant", "content": text},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+        out = llm.chat(follow_up, **kwargs)
+        text, reason = stitch(text, str(out)), finish_reason(out)
+    if reason == FINISH_LENGTH:
+        print(
+            f"LLM output still truncated after {rounds} continuations", file=sys.stderr
+        )
+    return Completion(text, reason)
@@ -1,21 +1,85 @@
+from typing import TYPE_CHECKING
+
 from coding_agents.config import Config
 from coding_agents.llm.base import LLMClientProtocol
-from coding_agents.llm.openrouter_client import OpenRouterClient
-from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+if TYPE_CHECKING:
+    from coding_agents.llm.router import RoutingLLMClient
+    from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+YANDEX_MAX_PROMPT_CHARS = 100000
 
 
 def create_llm_client(cfg: Config) -> LLMClientProtocol:
     if cfg.llm_provider == "yandexgpt":
-        if not cfg.yc_folder_id:
-            raise ValueError("YC_FOLDER_ID is required for YandexGPT")
-        auth = cfg.yc_iam_token or cfg.llm_api_key
-        if not auth:
-            raise ValueError("YC_IAM_TOKEN or YC_API_KEY is required for YandexGPT")
-        return YandexGPTClient(
-            folder_id=cfg.yc_folder_id,
-            api_key=cfg.llm_api_key if not cfg.yc_iam_token else "",
-            iam_token=cfg.yc_iam_token,
-        )
+        return create_yandex_client(cfg)
+    if cfg.llm_provider == "router":
+        return _create_router(cfg)
     if not cfg.llm_api_key:
         raise ValueError("OPENROUTER_API_KEY is required for OpenRouter")
+    from coding_agents.llm.openrouter_client import OpenRouterClient
+
     return OpenRouterClient(api_key=cfg.llm_api_key, model=cfg.llm_model)
+
+
+def create_yandex_client(cfg: Config) -> "YandexGPTClient":
+    from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+    if not cfg.yc_folder_id:
+        raise ValueError("YC_FOLDER_ID is required for YandexGPT")
+    auth = cfg.yc_iam_token or cfg.llm_api_key
+    if not auth:
+        raise ValueError("YC_IAM_TOKEN or YC_API_KEY is required for YandexGPT")
+    return YandexGPTClient(
+        folder_id=cfg.yc_folder_id,
+        api_key=cfg.llm_api_key if not cfg.yc_iam_token else "",
+        iam_token=cfg.yc_iam_token,
+    )
+
+
+def _create_router(cfg: Config) -> "RoutingLLMClient":
+    from coding_agents.llm.openrouter_client import OpenRouterClient
+    from coding_agents.llm.router import Backend, RoutingLLMClient
+    from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+    backends: list[Backend] = []
+    if cfg.llm_api_key:
+        models = [cfg.llm_model, *cfg.llm_fallback_models]
+        for model in dict.fromkeys(models):
+            backends.append(
+                Backend(model, OpenRouterClient(api_key=cfg.llm_api_key, model=model))
+            )
+        if cfg.llm_cheap_model:
+            backends.append(
+                Backend(
+                    cfg.llm_cheap_model,
+                    OpenRouterClient(
+                        api_key=cfg.llm_api_key, model=cfg.llm_cheap_model
+                    ),
+                    max_prompt_chars=cfg.llm_small_prompt_chars,
+                    cheap=True,
+                )
+            )
+    if cfg.yc_folder_id and (cfg.yc_iam_token or cfg.yc_api_key):
+        backends.append(
+            Backend(
+                "yandexgpt",
+                YandexGPTClient(
+                    folder_id=cfg.yc_folder_id,
+                    api_key=cfg.yc_api_key if not cfg.yc_iam_token else "",
+                    iam_token=cfg.yc_iam_token,
+                ),
+                max_prompt_chars=YANDEX_MAX_PROMPT_CHARS,
+            )
+        )
+    if not backends:
+        raise ValueError(
+            "LLM router needs OPENROUTER_API_KEY and/or YC_FOLDER_ID "
+            "with YC credentials"
+        )
+    return RoutingLLMClient(
+        backends,
+        small_prompt_chars=cfg.llm_small_prompt_chars,
+        hedge=cfg.llm_hedge,
+        hedge_after=cfg.llm_hedge_after,
+    )
@@ -2,7 +2,7 @@ from typing import Any
 
 from openai import OpenAI
 
-OPENROUTER_BASE = "https://openrouter.ai/api/v1"
+from coding_agents.llm.base import OPENROUTER_BASE, Completion
 
 
 class OpenRouterClient:
@@ -10,10 +10,11 @@ class OpenRouterClient:
         self._client = OpenAI(api_key=api_key, base_url=OPENROUTER_BASE)
         self._model = model
 
-    def chat(self, messages: list[dict[str, str]], **kwargs: Any) -> str:
+    def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
         response = self._client.chat.completions.create(
             model=self._model,
             messages=messages,
             **kwargs,
         )
-        return response.choices[0].message.content or ""
+        choice = response.choices[0]
+        return Completion(choice.message.content or "", choice.finish_reason or "")
@@ -0,0 +1,160 @@
+import math
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+from coding_agents.llm.base import LLMClientProtocol
+from coding_agents.prompts import message_text
+
+UNHEALTHY_ERROR_RATE = 0.5
+ERROR_PENALTY = 4.0
+MIN_P95_SAMPLES = 5
+
+
+@dataclass
+class Backend:
+    name: str
+    client: LLMClientProtocol
+    max_prompt_chars: int | None = None
+    cheap: bool = False
+
+    def accepts(self, prompt_chars: int) -> bool:
+        return self.max_prompt_chars is None or prompt_chars <= self.max_prompt_chars
+
+
+class BackendStats:
+    def __init__(self, alpha: float = 0.3, window: int = 50):
+        self._alpha = alpha
+        self._samples: deque[float] = deque(maxlen=window)
+        self.latency: float | None = None
+        self.error_rate = 0.0
+
+    def record(self, elapsed: float, ok: bool) -> None:
+        a = self._alpha
+        if ok:
+            self._samples.append(elapsed)
+            self.latency = (
+                elapsed
+                if self.latency is None
+                else a * elapsed + (1 - a) * self.latency
+            )
+        self.error_rate = a * (0.0 if ok else 1.0) + (1 - a) * self.error_rate
+
+    def p95(self) -> float | None:
+        if len(self._samples) < MIN_P95_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[math.ceil(0.95 * len(ordered)) - 1]
+
+    def score(self, default_latency: float) -> float:
+        latency = self.latency if self.latency is not None else default_latency
+        return latency * (1 + ERROR_PENALTY * self.error_rate)
+
+
+def prompt_chars(messages: list[dict[str, Any]]) -> int:
+    return sum(len(message_text(m)) for m in messages)
+
+
+class RoutingLLMClient:
+    def __init__(
+        self,
+        backends: list[Backend],
+        small_prompt_chars: int = 12000,
+        hedge: bool = True,
+        hedge_after: float = 20.0,
+        alpha: float = 0.3,
+    ):
+        if not backends:
+            raise ValueError("RoutingLLMClient needs at least one backend")
+        self._backends = backends
+        self._small_prompt_chars = small_prompt_chars
+        self._hedge = hedge
+        self._hedge_after = hedge_after
+        self._stats = {b.name: BackendStats(alpha) for b in backends}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(2, 2 * len(backends)), thread_name_prefix="llm-router"
+        )
+
+    def stats(self, name: str) -> BackendStats:
+        return self._stats[name]
+
+    def rank(self, size: int) -> list[Backend]:
+        small = size <= self._small_prompt_chars
+        with self._lock:
+            keyed = [
+                (
+                    self._stats[b.name].error_rate > UNHEALTHY_ERROR_RATE,
+                    b.cheap != small,
+                    self._stats[b.name].score(self._hedge_after),
+                    i,
+                    b,
+                )
+                for i, b in enumerate(self._backends)
+                if b.accepts(size)
+            ]
+        return [k[-1] for k in sorted(keyed, key=lambda k: k[:-1])]
+
+    def _hedge_delay(self, backend: Backend) -> float:
+        with self._lock:
+            p95 = self._stats[backend.name].p95()
+        return p95 if p95 is not None else self._hedge_after
+
+    def _call(
+        self, backend: Backend, messages: list[dict[str, Any]], kwargs: dict[str, Any]
+    ) -> str:
+        start = time.monotonic()
+        ok = False
+        try:
+            result = backend.client.chat(messages, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self._stats[backend.name].record(time.monotonic() - start, ok)
+
+    def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
+        size = prompt_chars(messages)
+        queue = self.rank(size)
+        if not queue:
+            raise ValueError(f"No LLM backend accepts a prompt of {size} chars")
+        pending: dict[Future[str], Backend] = {}
+
+        def submit(backend: Backend) -> None:
+            pending[self._executor.submit(self._call, backend, messages, kwargs)] = (
+                backend
+            )
+
+        primary = queue.pop(0)
+        submit(primary)
+        hedged = not self._hedge
+        last_error: Exception | None = None
+        while pending:
+            timeout = None if hedged or not queue else self._hedge_delay(primary)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                backup = queue.pop(0)
+                print(
+                    f"LLM router: {primary.name} slower than {timeout:.1f}s, hedging "
+                    f"with {backup.name}",
+                    file=sys.stderr,
+                )
+                submit(backup)
+                hedged = True
+                continue
+            for fut in done:
+                backend = pending.pop(fut)
+                try:
+                    return fut.result()
+                except Exception as e:
+                    last_error = e
+                    print(f"LLM router: {backend.name} failed: {e}", file=sys.stderr)
+            if not pending and queue:
+                primary = queue.pop(0)
+                submit(primary)
+        assert last_error is not None
+        raise last_error
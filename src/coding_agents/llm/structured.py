@@ -0,0 +1,17 @@
+from functools import lru_cache
+from typing import Any
+
+from coding_agents.llm.base import OPENROUTER_BASE
+
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+
+@lru_cache(maxsize=8)
+def get_structured_client(api_key: str, base_url: str = OPENROUTER_BASE) -> Any:
+    import instructor
+    from openai import OpenAI
+
+    return instructor.from_openai(
+        OpenAI(api_key=api_key, base_url=base_url),
+        mode=instructor.Mode.JSON_SCHEMA,
+    )
@@ -2,34 +2,64 @@ from typing import Any
 
 import requests
 
-YANDEX_COMPLETION_URL = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+from coding_agents.llm.base import FINISH_LENGTH, FINISH_STOP, Completion
+from coding_agents.prompts import message_text
+
+YANDEX_COMPLETION_URL = (
+    "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+)
+YANDEX_ASYNC_URL = (
+    "https://llm.api.cloud.yandex.net/foundationModels/v1/completionAsync"
+)
+YANDEX_OPERATIONS_URL = "https://operation.api.cloud.yandex.net/operations"
+YANDEX_FINISH_REASONS = {
+    "ALTERNATIVE_STATUS_FINAL": FINISH_STOP,
+    "ALTERNATIVE_STATUS_TRUNCATED_FINAL": FINISH_LENGTH,
+    "ALTERNATIVE_STATUS_CONTENT_FILTER": "content_filter",
+}
 
 
 class YandexGPTClient:
-    def __init__(self, folder_id: str, api_key: str = "", iam_token: str = ""):
+    def __init__(
+        self,
+        folder_id: str,
+        api_key: str = "",
+        iam_token: str = "",
+        completion_url: str = YANDEX_COMPLETION_URL,
+        async_url: str = YANDEX_ASYNC_URL,
+        operations_url: str = YANDEX_OPERATIONS_URL,
+    ):
         self._folder_id = folder_id
         self._api_key = api_key
         self._iam_token = iam_token
         self._model_uri = f"gpt://{folder_id}/yandexgpt-lite/latest"
+        self._completion_url = completion_url
+        self._async_url = async_url
+        self._operations_url = operations_url.rstrip("/")
+        self._http = requests.Session()
 
     def _headers(self) -> dict[str, str]:
         if self._iam_token:
             return {"Authorization": f"Bearer {self._iam_token}"}
         return {"Authorization": f"Api-Key {self._api_key}"}
 
-    def _to_yandex_messages(self, messages: list[dict[str, str]]) -> list[dict[str, str]]:
+    def _to_yandex_messages(
+        self, messages: list[dict[str, Any]]
+    ) -> list[dict[str, str]]:
         out = []
         for m in messages:
             role = m.get("role", "user")
             if role == "system":
-                out.append({"role": "user", "text": m.get("content", "")})
+                out.append({"role": "user", "text": message_text(m)})
                 out.append({"role": "assistant", "text": "OK."})
             else:
-                out.append({"role": role, "text": m.get("content", "")})
+                out.append({"role": role, "text": message_text(m)})
         return out
 
-    def chat(self, messages: list[dict[str, str]], **kwargs: Any) -> str:
-        body = {
+    def _body(
+        self, messages: list[dict[str, Any]], kwargs: dict[str, Any]
+    ) -> dict[str, Any]:
+        body: dict[str, Any] = {
             "modelUri": self._model_uri,
             "completionOptions": {
                 "temperature": kwargs.get("temperature", 0.6),
@@ -37,16 +67,57 @@ class YandexGPTClient:
             },
             "messages": self._to_yandex_messages(messages),
         }
-        resp = requests.post(
-            YANDEX_COMPLETION_URL,
+        response_format = kwargs.get("response_format") or {}
+        if response_format.get("type") == "json_object":
+            body["jsonObject"] = True
+        return body
+
+    @staticmethod
+    def result_text(result: dict[str, Any]) -> Completion:
+        alternatives = result.get("alternatives", [])
+        if not alternatives:
+            return Completion("")
+        best = alternatives[0]
+        status = best.get("status", "")
+        return Completion(
+            best.get("message", {}).get("text", ""),
+            YANDEX_FINISH_REASONS.get(status, status),
+        )
+
+    def chat(self, messages: list[dict[str, Any]], **kwargs: Any) -> Completion:
+        resp = self._http.post(
+            self._completion_url,
             headers=self._headers(),
-            json=body,
+            json=self._body(messages, kwargs),
             timeout=60,
         )
         resp.raise_for_status()
-        data = resp.json()
-        result = data.get("result", {})
-        alternatives = result.get("alternatives", [])
-        if not alternatives:
-            return ""
-        return alternatives[0].get("message", {}).get("text", "")
+        return self.result_text(resp.json().get("result", {}))
+
+    def submit_async(self, messages: list[dict[str, Any]], **kwargs: Any) -> str:
+        resp = self._http.post(
+            self._async_url,
+            headers=self._headers(),
+            json=self._body(messages, kwargs),
+            timeout=60,
+        )
+        resp.raise_for_status()
+        return resp.json()["id"]
+
+    def get_operation(self, operation_id: str) -> dict[str, Any]:
+        resp = self._http.get(
+            f"{self._operations_url}/{operation_id}",
+            headers=self._headers(),
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return resp.json()
+
+    def cancel_operation(self, operation_id: str) -> dict[str, Any]:
+        resp = self._http.post(
+            f"{self._operations_url}/{operation_id}:cancel",
+            headers=self._headers(),
+            timeout=30,
+        )
+        resp.raise_for_status()
+        return resp.json()
@@ -0,0 +1,73 @@
+import time
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any
+
+
+class StageTimeoutError(Exception):
+    def __init__(
+        self, name: str, timeout: float, pending: list[Future[Any]] | None = None
+    ):
+        super().__init__(f"Stage {name!r} did not finish within {timeout:.0f}s")
+        self.name = name
+        self.timeout = timeout
+        self.pending = pending or []
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[dict[str, Any]], Any]
+    deps: tuple[str, ...] = ()
+    timeout: float | None = None
+
+
+def _check_graph(stages: list[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate stage names")
+    known = set(names)
+    for s in stages:
+        missing = set(s.deps) - known
+        if missing:
+            raise ValueError(
+                f"Stage {s.name!r} depends on unknown stages: {sorted(missing)}"
+            )
+    resolved: set[str] = set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if set(s.deps) <= resolved]
+        if not ready:
+            raise ValueError(f"Dependency cycle among {[s.name for s in remaining]}")
+        resolved.update(s.name for s in ready)
+        remaining = [s for s in remaining if s.name not in resolved]
+
+
+def run_stages(stages: list[Stage], max_workers: int = 4) -> dict[str, Any]:
+    _check_graph(stages)
+    results: dict[str, Any] = {}
+    waiting = list(stages)
+    running: dict[Future[Any], tuple[Stage, float | None]] = {}
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+    try:
+        while waiting or running:
+            for stage in [s for s in waiting if all(d in results for d in s.deps)]:
+                waiting.remove(stage)
+                deadline = time.monotonic() + stage.timeout if stage.timeout else None
+                running[pool.submit(stage.run, results)] = (stage, deadline)
+            deadlines = [d for _, d in running.values() if d is not None]
+            timeout = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                stage, _ = running.pop(fut)
+                results[stage.name] = fut.result()
+            now = time.monotonic()
+            for stage, deadline in running.values():
+                if deadline is not None and now >= deadline:
+                    raise StageTimeoutError(
+                        stage.name, stage.timeout or 0.0, list(running)
+                    )
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results
@@ -0,0 +1,163 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+TOP_FUNCTIONS = 15
+TOP_ALLOCATIONS = 10
+TRACE_FRAMES = 1
+
+
+@dataclass
+class StageProfile:
+    name: str
+    wall: float = 0.0
+    cpu: float = 0.0
+    alloc_bytes: int = 0
+    top_functions: list[str] = field(default_factory=list)
+    top_allocations: list[str] = field(default_factory=list)
+    note: str = ""
+
+
+def _top_functions(profile: cProfile.Profile, limit: int) -> list[str]:
+    stats = pstats.Stats(profile, stream=io.StringIO())
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)  # type: ignore[attr-defined]
+    lines = []
+    for (filename, lineno, func), (_, ncalls, tottime, cumtime, _) in rows[:limit]:
+        where = f"{Path(filename).name}:{lineno}" if lineno else filename
+        lines.append(
+            f"{cumtime:8.3f}s cum {tottime:8.3f}s self {ncalls:>7} calls  "
+            f"{func} ({where})"
+        )
+    return lines
+
+
+class Profiler:
+    def __init__(self, out_dir: Path | str | None, label: str = "run"):
+        self.enabled = out_dir is not None and str(out_dir) != ""
+        self.stages: list[StageProfile] = []
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._t0 = time.perf_counter()
+        self.out_dir: Path | None = None
+        if not self.enabled:
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        self.out_dir = Path(out_dir).expanduser() / f"{label}-{stamp}-{os.getpid()}"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACE_FRAMES)
+                self._started_tracing = True
+        result = StageProfile(name)
+        before = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            profile = None
+            result.note = (
+                "CPU profile skipped: another stage was being profiled concurrently"
+            )
+        start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            result.wall = time.perf_counter() - start
+            result.cpu = time.thread_time() - cpu_start
+            after = tracemalloc.take_snapshot()
+            diffs = [d for d in after.compare_to(before, "lineno") if d.size_diff > 0]
+            result.alloc_bytes = sum(d.size_diff for d in diffs)
+            result.top_allocations = [str(d) for d in diffs[:TOP_ALLOCATIONS]]
+            with self._lock:
+                self.stages.append(result)
+                index = len(self.stages)
+            if profile is not None:
+                result.top_functions = _top_functions(profile, TOP_FUNCTIONS)
+                profile.dump_stats(str(self.out_dir / f"{index:02d}-{name}.prof"))
+
+    def wrap(self, name: str, fn: Callable[..., T]) -> Callable[..., T]:
+        if not self.enabled:
+            return fn
+
+        def run(*args: Any, **kwargs: Any) -> T:
+            with self.stage(name):
+                return fn(*args, **kwargs)
+
+        return run
+
+    def summary(self) -> str:
+        current, peak = (
+            tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        )
+        lines = [
+            f"Total {time.perf_counter() - self._t0:.2f}s, traced memory peak "
+            f"{peak / 1e6:.1f} MB (current {current / 1e6:.1f} MB)",
+            "Stages run concurrently share the process heap, so allocation deltas of "
+            "overlapping stages include each other.",
+            "",
+        ]
+        for s in sorted(self.stages, key=lambda s: s.wall, reverse=True):
+            lines.append(
+                f"== {s.name}: wall {s.wall:.2f}s, cpu {s.cpu:.2f}s, "
+                f"+{s.alloc_bytes / 1e6:.1f} MB allocated"
+            )
+            if s.note:
+                lines.append(f"   {s.note}")
+            if s.top_functions:
+                lines.append("   Top functions (cumulative):")
+                lines.extend(f"   {line}" for line in s.top_functions)
+            if s.top_allocations:
+                lines.append("   Top allocations:")
+                lines.extend(f"   {line}" for line in s.top_allocations)
+            lines.append("")
+        return "\n".join(lines)
+
+    def finish(self) -> None:
+        if not self.enabled or self.out_dir is None:
+            return
+        (self.out_dir / "summary.txt").write_text(self.summary(), encoding="utf-8")
+        (self.out_dir / "summary.json").write_text(
+            json.dumps(
+                [
+                    {
+                        "stage": s.name,
+                        "wall": s.wall,
+                        "cpu": s.cpu,
+                        "alloc_bytes": s.alloc_bytes,
+                    }
+                    for s in self.stages
+                ],
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        slowest = max(self.stages, key=lambda s: s.wall, default=None)
+        hint = (
+            f"; slowest stage {slowest.name} ({slowest.wall:.2f}s)" if slowest else ""
+        )
+        print(f"Profile written to {self.out_dir}{hint}", file=sys.stderr)
+        self.enabled = False
@@ -0,0 +1,46 @@
+from typing import Any
+
+CACHE_CONTROL_MODEL_PREFIXES = ("anthropic/", "google/gemini")
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def supports_cache_control(model: str) -> bool:
+    return model.startswith(CACHE_CONTROL_MODEL_PREFIXES)
+
+
+def assemble_messages(
+    system: str,
+    stable: list[str],
+    variable: str,
+    cache_control: bool = False,
+) -> list[dict[str, Any]]:
+    stable_text = "\n\n".join(block for block in stable if block)
+    messages: list[dict[str, Any]] = [{"role": "system", "content": system}]
+    if not stable_text:
+        messages.append({"role": "user", "content": variable})
+    elif cache_control:
+        messages.append(
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": stable_text,
+                        "cache_control": CACHE_CONTROL,
+                    },
+                    {"type": "text", "text": variable},
+                ],
+            }
+        )
+    else:
+        messages.append(
+            {"role": "user", "content": f"{stable_text}\n\n---\n\n{variable}"}
+        )
+    return messages
+
+
+def message_text(message: dict[str, Any]) -> str:
+    content = message.get("content", "")
+    if isinstance(content, str):
+        return content
+    return "\n\n".join(part.get("text", "") for part in content)
@@ -1,9 +1,11 @@
+import hashlib
 import re
+from collections.abc import Iterable
 from pathlib import Path
 
+from coding_agents.compression import ContextCompressor
 from coding_agents.llm.base import LLMClientProtocol
 
-
 README_SYSTEM = """You generate a README.md for a software project based on its files and structure.
 
 Rules:
@@ -16,12 +18,13 @@ Rules:
    - Optional: requirements (Python/Node version, etc.), project structure, license if visible.
 4. Use only the information from the provided project context. Do not invent dependencies or commands that are not in the files. If something is unclear, write a short placeholder or "see source".
 5. For git clone: use ONLY the "Repository clone URL" given in the context. It must be an HTTPS URL (e.g. https://github.com/owner/repo.git). Never use local paths, absolute paths, or file:// URLs in README.
-6. Output only the README body, no surrounding explanation."""
+6. Output only the README body, no surrounding explanation."""  # noqa: E501
 
 
 def _origin_to_https(workspace: Path) -> str | None:
     try:
         from git import Repo
+
         repo = Repo(workspace)
         origin = repo.remotes.origin.url
     except Exception:
@@ -42,34 +45,60 @@ def _origin_to_https(workspace: Path) -> str | None:
 
 
 class ReadmeGenerator:
-    def __init__(self, llm: LLMClientProtocol, workspace: Path):
+    def __init__(
+        self,
+        llm: LLMClientProtocol | None,
+        workspace: Path,
+        exclude: Iterable[Path] = (),
+    ):
         self._llm = llm
         self._workspace = workspace
+        self._exclude = {Path(p).resolve() for p in exclude}
+        self._context: str | None = None
+        self.compression: ContextCompressor | None = None
+
+    def _is_excluded(self, path: Path) -> bool:
+        return bool(self._exclude) and path.resolve() in self._exclude
 
     def _collect_context(self, max_file_bytes: int = 15000) -> str:
         repo_url = _origin_to_https(self._workspace)
         lines = []
         if repo_url:
-            lines.append(f"Repository clone URL (use exactly this in README for git clone): {repo_url}")
+            lines.append(
+                "Repository clone URL (use exactly this in README for git clone): "
+                + repo_url
+            )
             lines.append("")
         lines.append("File tree:")
         key_files = [
-            "README.md", "pyproject.toml", "setup.py", "requirements.txt",
-            "package.json", "Dockerfile", "docker-compose.yml", ".env.example",
+            "README.md",
+            "pyproject.toml",
+            "setup.py",
+            "requirements.txt",
+            "package.json",
+            "Dockerfile",
+            "docker-compose.yml",
+            ".env.example",
         ]
         seen = set()
+        compressor = ContextCompressor()
         for path in sorted(self._workspace.rglob("*")):
-            if not path.is_file() or ".git" in path.parts:
+            if not path.is_file() or ".git" in path.parts or self._is_excluded(path):
                 continue
             try:
                 rel = path.relative_to(self._workspace)
             except ValueError:
                 continue
-            if rel.name in key_files or rel.suffix in (".toml", ".json", ".yaml", ".yml"):
+            if rel.name in key_files or rel.suffix in (
+                ".toml",
+                ".json",
+                ".yaml",
+                ".yml",
+            ):
                 seen.add(rel)
         file_tree = []
         for path in sorted(self._workspace.rglob("*")):
-            if not path.is_file() or ".git" in path.parts:
+            if not path.is_file() or ".git" in path.parts or self._is_excluded(path):
                 continue
             try:
                 rel = path.relative_to(self._workspace)
@@ -80,34 +109,65 @@ class ReadmeGenerator:
         lines.append("")
         for name in key_files:
             p = self._workspace / name
-            if p.is_file():
+            if p.is_file() and not self._is_excluded(p):
                 try:
-                    content = p.read_text(encoding="utf-8", errors="replace")
+                    content = compressor.compress(name, p.read_bytes()).decode(
+                        "utf-8", errors="replace"
+                    )
                 except Exception:
                     continue
                 if len(content.encode("utf-8")) > max_file_bytes:
                     content = content[:max_file_bytes] + "\n... (truncated)"
                 lines.append(f"--- {name} ---\n{content}\n")
-        for path in sorted(self._workspace.rglob("*.toml")) + sorted(self._workspace.rglob("*.json")):
+        for path in sorted(self._workspace.rglob("*.toml")) + sorted(
+            self._workspace.rglob("*.json")
+        ):
             try:
                 rel = path.relative_to(self._workspace)
             except ValueError:
                 continue
-            if str(rel) in seen or rel.name in key_files:
-                continue
-            if path.stat().st_size > max_file_bytes:
+            if str(rel) in seen or rel.name in key_files or self._is_excluded(path):
                 continue
             try:
-                content = path.read_text(encoding="utf-8", errors="replace")
+                if path.stat().st_size > max_file_bytes:
+                    elided = compressor.elide(rel.as_posix(), b"", path.stat().st_size)
+                    if elided is None:
+                        continue
+                    content = elided.decode("utf-8")
+                else:
+                    content = compressor.compress(
+                        rel.as_posix(), path.read_bytes()
+                    ).decode("utf-8", errors="replace")
             except Exception:
                 continue
             lines.append(f"--- {rel} ---\n{content}\n")
             seen.add(str(rel))
+        self.compression = compressor
         return "\n".join(lines)
 
+    def context(self) -> str:
+        if self._context is None:
+            self._context = self._collect_context()
+        return self._context
+
+    def fingerprint(self) -> str:
+        h = hashlib.sha256()
+        h.update(README_SYSTEM.encode("utf-8"))
+        h.update(b"\0")
+        h.update(self.context().encode("utf-8"))
+        return h.hexdigest()
+
+    def messages(self) -> list[dict[str, str]]:
+        user = f"Generate README.md for this project.\n\n{self.context()}"
+        return [
+            {"role": "system", "content": README_SYSTEM},
+            {"role": "user", "content": user},
+        ]
+
     def generate(self) -> str:
-        context = self._collect_context()
-        user = f"Generate README.md for this project.\n\n{context}"
-        return self._llm.chat(
-            [{"role": "system", "content": README_SYSTEM}, {"role": "user", "content": user}]
-        )
+        if self._llm is None:
+            raise ValueError(
+                "ReadmeGenerator needs an LLM client to generate; "
+                "use messages() for batch requests"
+            )
+        return self._llm.chat(self.messages())
@@ -0,0 +1,375 @@
+import ast
+import importlib.util
+import json
+import re
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import PurePosixPath
+
+DOC_SUFFIXES = (".md", ".rst", ".txt", ".adoc")
+DOC_DIRS = ("docs", "doc")
+LOCKFILES = (
+    "poetry.lock",
+    "uv.lock",
+    "Pipfile.lock",
+    "package-lock.json",
+    "yarn.lock",
+    "pnpm-lock.yaml",
+    "Cargo.lock",
+    "Gemfile.lock",
+    "composer.lock",
+    "go.sum",
+)
+TRIVIAL_KINDS = ("docs", "lockfile", "whitespace")
+ISSUE_KEYWORDS = {
+    "docs": (
+        "doc",
+        "readme",
+        "typo",
+        "changelog",
+        "comment",
+        "guide",
+        "документац",
+        "опечат",
+        "описани",
+        "инструкц",
+    ),
+    "lockfile": (
+        "dependenc",
+        "lock",
+        "bump",
+        "upgrade",
+        "version",
+        "package",
+        "зависимост",
+        "обнов",
+        "верси",
+        "пакет",
+    ),
+    "whitespace": (
+        "format",
+        "whitespace",
+        "indent",
+        "style",
+        "lint",
+        "формат",
+        "пробел",
+        "отступ",
+        "стил",
+    ),
+}
+COMPLEXITY_LIMIT = 10
+MAX_FACTS = 40
+CHECK_TIMEOUT = 60.0
+INDENT_SUFFIXES = (
+    ".py",
+    ".pyi",
+    ".yaml",
+    ".yml",
+    ".mk",
+    ".haml",
+    ".pug",
+    ".sass",
+    ".coffee",
+    ".nim",
+)
+INDENT_NAMES = ("Makefile", "GNUmakefile")
+QUOTES = ("'", '"', "`")
+QUOTED = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`)""")
+CONFLICT_MARKER = re.compile(r"^(<{7}|>{7}|={7})( |$)")
+CI_FAILURE = re.compile(r"fail|error|cancel", re.IGNORECASE)
+
+KIND_LABELS = {
+    "empty": "PR не меняет содержимое файлов",
+    "docs": "PR затрагивает только документацию",
+    "lockfile": "PR обновляет только lock-файлы зависимостей",
+    "whitespace": "PR меняет только пробелы и переносы строк",
+}
+
+
+@dataclass
+class Finding:
+    path: str
+    line: int | None
+    check: str
+    message: str
+    error: bool = False
+
+    def __str__(self) -> str:
+        where = f"{self.path}:{self.line}" if self.line else self.path
+        return f"{where} [{self.check}] {self.message}"
+
+
+@dataclass
+class Prepass:
+    kind: str
+    files: int = 0
+    added: int = 0
+    removed: int = 0
+    findings: list[Finding] = field(default_factory=list)
+
+    @property
+    def trivial(self) -> bool:
+        return self.kind in TRIVIAL_KINDS
+
+    def fits_issue(self, issue_text: str) -> bool:
+        text = issue_text.lower()
+        return any(word in text for word in ISSUE_KEYWORDS.get(self.kind, ()))
+
+    def errors(self) -> list[Finding]:
+        return [f for f in self.findings if f.error]
+
+    def facts(self) -> str:
+        lines = [
+            f"Static pre-pass (verified locally): PR kind {self.kind}, "
+            f"{self.files} files, +{self.added}/-{self.removed} lines."
+        ]
+        if not self.findings:
+            lines.append("No syntax, lint or complexity findings on changed lines.")
+        for f in sorted(self.findings, key=lambda f: not f.error)[:MAX_FACTS]:
+            lines.append(f"- {'ERROR' if f.error else 'warning'} {f}")
+        if len(self.findings) > MAX_FACTS:
+            lines.append(f"- ... and {len(self.findings) - MAX_FACTS} more")
+        return "\n".join(lines)
+
+    def fast_review(self, ci_summary: str) -> str:
+        return (
+            f"## Автоматическое ревью\n\n{KIND_LABELS[self.kind]} ({self.files} "
+            f"файл(ов), +{self.added}/−{self.removed} строк). Статические проверки "
+            "замечаний не выявили. CI: "
+            f"{ci_summary.strip() or 'нет данных'}.\n\nИзменение тривиальное, ревью "
+            "выполнено без LLM.\n\nVERDICT: APPROVED"
+        )
+
+
+def ci_failed(ci_summary: str) -> bool:
+    return bool(CI_FAILURE.search(ci_summary))
+
+
+def added_lines(patch: str) -> dict[int, str]:
+    result: dict[int, str] = {}
+    line = 0
+    for text in patch.splitlines():
+        if text.startswith("@@"):
+            m = re.match(r"@@ -\d+(?:,\d+)? \+(\d+)", text)
+            line = int(m.group(1)) if m else 0
+        elif text.startswith("+"):
+            result[line] = text[1:]
+            line += 1
+        elif not text.startswith("-") and not text.startswith("\\"):
+            line += 1
+    return result
+
+
+def removed_lines(patch: str) -> list[str]:
+    return [t[1:] for t in patch.splitlines() if t.startswith("-")]
+
+
+def _category(path: str) -> str:
+    p = PurePosixPath(path)
+    if p.name in LOCKFILES:
+        return "lockfile"
+    if (
+        p.suffix.lower() in DOC_SUFFIXES
+        or (p.parts and p.parts[0] in DOC_DIRS)
+        or p.name in ("LICENSE", "CHANGELOG")
+    ):
+        return "docs"
+    return "code"
+
+
+def _strip_unquoted(line: str) -> str:
+    return "".join(
+        part if part[:1] in QUOTES else "".join(part.split())
+        for part in QUOTED.split(line)
+        if part
+    )
+
+
+def _normalized(path: str, lines: list[str]) -> list[str]:
+    p = PurePosixPath(path)
+    if p.suffix.lower() in INDENT_SUFFIXES or p.name in INDENT_NAMES:
+        return [t.rstrip() for t in lines if t.strip()]
+    return [_strip_unquoted(t) for t in lines if t.strip()]
+
+
+def reverse_patch(content: str, patch: str) -> str:
+    new = content.splitlines(keepends=True)
+    out: list[str] = []
+    pos = 0
+    for text in patch.splitlines():
+        if text.startswith("@@"):
+            m = re.match(r"@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))?", text)
+            start = int(m.group(1)) - (m.group(2) != "0") if m else pos
+            out.extend(new[pos:start])
+            pos = start
+        elif text.startswith("+"):
+            pos += 1
+        elif text.startswith("-"):
+            out.append(text[1:] + "\n")
+        elif not text.startswith("\\"):
+            out.extend(new[pos : pos + 1])
+            pos += 1
+    out.extend(new[pos:])
+    return "".join(out)
+
+
+def _same_ast(f: dict) -> bool:
+    content = f.get("content")
+    if content is None:
+        return False
+    try:
+        before = ast.parse(reverse_patch(content, f.get("patch", "")))
+        after = ast.parse(content)
+    except (SyntaxError, ValueError):
+        return False
+    return ast.dump(before) == ast.dump(after)
+
+
+def _whitespace_only(f: dict) -> bool:
+    path, patch = f.get("filename", ""), f.get("patch", "")
+    if not patch:
+        return False
+    if _normalized(path, list(added_lines(patch).values())) != _normalized(
+        path, removed_lines(patch)
+    ):
+        return False
+    return not path.endswith((".py", ".pyi")) or _same_ast(f)
+
+
+def classify(pr_files: list[dict]) -> str:
+    if not pr_files:
+        return "empty"
+    categories = {_category(f.get("filename", "")) for f in pr_files}
+    if categories <= {"docs", "lockfile"}:
+        return "docs" if "docs" in categories else "lockfile"
+    if all(_whitespace_only(f) for f in pr_files):
+        return "whitespace"
+    return "code"
+
+
+def complexity(node: ast.AST) -> int:
+    score = 1
+    for child in ast.walk(node):
+        if isinstance(
+            child,
+            (ast.If, ast.For, ast.AsyncFor, ast.While, ast.IfExp, ast.ExceptHandler),
+        ):
+            score += 1
+        elif isinstance(child, ast.BoolOp):
+            score += len(child.values) - 1
+        elif isinstance(child, ast.comprehension):
+            score += 1 + len(child.ifs)
+        elif isinstance(child, ast.match_case):
+            score += 1
+    return score
+
+
+def _check_python(path: str, content: str, changed: set[int]) -> list[Finding]:
+    try:
+        tree = ast.parse(content, filename=path)
+    except SyntaxError as e:
+        return [Finding(path, e.lineno, "syntax", e.msg, error=True)]
+    findings = []
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        span = range(node.lineno, (node.end_lineno or node.lineno) + 1)
+        if not changed.intersection(span):
+            continue
+        score = complexity(node)
+        if score > COMPLEXITY_LIMIT:
+            findings.append(
+                Finding(
+                    path,
+                    node.lineno,
+                    "complexity",
+                    f"{node.name}() has cyclomatic complexity {score}",
+                )
+            )
+    return findings + _ruff(path, content, changed)
+
+
+def _ruff(path: str, content: str, changed: set[int]) -> list[Finding]:
+    if importlib.util.find_spec("ruff") is None:
+        return []
+    cmd = [
+        sys.executable,
+        "-m",
+        "ruff",
+        "check",
+        "--quiet",
+        "--output-format=json",
+        "--stdin-filename",
+        path,
+        "-",
+    ]
+    try:
+        proc = subprocess.run(
+            cmd, input=content, capture_output=True, text=True, timeout=CHECK_TIMEOUT
+        )
+        issues = json.loads(proc.stdout or "[]")
+    except (subprocess.TimeoutExpired, ValueError):
+        return []
+    return [
+        Finding(
+            path, i["location"]["row"], "ruff", f"{i.get('code')}: {i.get('message')}"
+        )
+        for i in issues
+        if i.get("location", {}).get("row") in changed
+    ]
+
+
+def _check_data(path: str, content: str) -> list[Finding]:
+    suffix = PurePosixPath(path).suffix.lower()
+    try:
+        if suffix == ".json":
+            json.loads(content)
+        elif suffix == ".toml":
+            try:
+                import tomllib
+            except ImportError:
+                return []
+            tomllib.loads(content)
+        elif suffix in (".yml", ".yaml"):
+            try:
+                import yaml
+            except ImportError:
+                return []
+            yaml.safe_load(content)
+    except Exception as e:
+        return [Finding(path, None, "data", str(e).splitlines()[0], error=True)]
+    return []
+
+
+def _check_file(f: dict) -> list[Finding]:
+    path = f.get("filename", "")
+    added = added_lines(f.get("patch", ""))
+    findings = [
+        Finding(path, line, "conflict", "merge conflict marker", error=True)
+        for line, text in added.items()
+        if CONFLICT_MARKER.match(text)
+    ]
+    content = f.get("content")
+    if content is None:
+        return findings
+    if path.endswith(".py"):
+        findings += _check_python(path, content, set(added))
+    else:
+        findings += _check_data(path, content)
+    return findings
+
+
+def run_prepass(pr_files: list[dict], max_workers: int = 4) -> Prepass:
+    result = Prepass(classify(pr_files), files=len(pr_files))
+    for f in pr_files:
+        patch = f.get("patch", "")
+        result.added += len(added_lines(patch))
+        result.removed += len(removed_lines(patch))
+    if pr_files:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for findings in pool.map(_check_file, pr_files):
+                result.findings.extend(findings)
+    return result
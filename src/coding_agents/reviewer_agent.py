@@ -1,5 +1,12 @@
-from coding_agents.github_client import GitHubClient
+from typing import TYPE_CHECKING, Optional
+
 from coding_agents.llm.base import LLMClientProtocol
+from coding_agents.prompts import assemble_messages, supports_cache_control
+from coding_agents.review_prepass import Prepass, ci_failed, run_prepass
+
+if TYPE_CHECKING:
+    from coding_agents.config import Config
+    from coding_agents.github_client import GitHubClient
 
 
 REVIEW_SYSTEM = """You are an AI code reviewer. Given:
@@ -15,13 +22,21 @@ Produce a structured review:
 
 If CHANGES_REQUESTED, list specific file/line or file and what to fix. Be concise.
 Output in markdown. End with a line: VERDICT: APPROVED or VERDICT: CHANGES_REQUESTED
-Always answer in Russian."""
+Always answer in Russian."""  # noqa: E501
 
 
 class ReviewerAgent:
-    def __init__(self, llm: LLMClientProtocol, github: GitHubClient):
+    def __init__(
+        self,
+        llm: LLMClientProtocol,
+        github: "GitHubClient",
+        config: Optional["Config"] = None,
+    ):
         self._llm = llm
         self._github = github
+        self._config = config
+        self.prepass: Prepass | None = None
+        self.skipped_llm = False
 
     def review(
         self,
@@ -31,16 +46,35 @@ class ReviewerAgent:
         pr_files: list[dict],
         ci_summary: str,
     ) -> str:
+        self.prepass = run_prepass(pr_files)
+        fast_path = self._config.review_fast_path if self._config else True
+        self.skipped_llm = (
+            fast_path
+            and self.prepass.trivial
+            and self.prepass.fits_issue(f"{issue_title}\n{issue_body}")
+            and not self.prepass.errors()
+            and not ci_failed(ci_summary)
+        )
+        if self.skipped_llm:
+            return self.prepass.fast_review(ci_summary)
         files_text = "\n".join(
             f"### {f.get('filename', '')}\n```\n{f.get('patch', '')}\n```"
             for f in pr_files
         )
-        user = f"""Issue: {issue_title}\n{issue_body}\n\n---\nPR diff:\n{pr_diff}\n\n---\nFiles:\n{files_text}\n\n---\nCI summary:\n{ci_summary}"""
+        changes = f"PR diff:\n{pr_diff}\n\n---\nFiles:\n{files_text}"
+        task = f"Issue: {issue_title}\n{issue_body}\n\n---\nCI summary:\n{ci_summary}"
+        cache_control = bool(
+            self._config
+            and self._config.llm_provider in ("openrouter", "router")
+            and supports_cache_control(self._config.llm_model)
+        )
         return self._llm.chat(
-            [
-                {"role": "system", "content": REVIEW_SYSTEM},
-                {"role": "user", "content": user},
-            ]
+            assemble_messages(
+                REVIEW_SYSTEM,
+                [changes, self.prepass.facts()],
+                task,
+                cache_control=cache_control,
+            )
         )
 
     def post_review_to_pr(self, pr_number: int, review_body: str) -> None:
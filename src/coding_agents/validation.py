@@ -0,0 +1,295 @@
+import ast
+import importlib.util
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from coding_agents.depgraph import DepGraph, module_name, raw_imports, resolve_imports
+
+COPY_IGNORE = (
+    ".git",
+    ".agent_cache",
+    ".venv",
+    "venv",
+    "node_modules",
+    "__pycache__",
+    ".pytest_cache",
+)
+RUN_ALL_TESTS_TRIGGERS = (
+    "conftest.py",
+    "pyproject.toml",
+    "setup.cfg",
+    "pytest.ini",
+    "tox.ini",
+)
+OUTPUT_LIMIT = 4000
+CHECK_PENALTIES = {
+    "syntax": 60.0,
+    "data": 60.0,
+    "pytest": 30.0,
+    "ruff": 10.0,
+    "black": 5.0,
+}
+
+
+@dataclass
+class CheckResult:
+    name: str
+    ok: bool
+    output: str = ""
+
+
+@dataclass
+class ValidationReport:
+    checks: list[CheckResult] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return all(c.ok for c in self.checks)
+
+    def failures(self) -> list[CheckResult]:
+        return [c for c in self.checks if not c.ok]
+
+    def feedback(self) -> str:
+        return "\n\n".join(
+            f"{c.name} failed:\n{c.output[-OUTPUT_LIMIT:]}" for c in self.failures()
+        )
+
+
+def _imports(tree: ast.AST, module: str, is_package: bool) -> set[str]:
+    return resolve_imports(raw_imports(tree), module, is_package)
+
+
+def build_import_map(
+    root: Path, files: Iterable[str] | None = None
+) -> dict[str, set[str]]:
+    paths = (
+        [root / f for f in files]
+        if files is not None
+        else [
+            p
+            for p in root.rglob("*.py")
+            if not set(p.relative_to(root).parts) & set(COPY_IGNORE)
+        ]
+    )
+    result: dict[str, set[str]] = {}
+    for path in paths:
+        rel = path.relative_to(root)
+        module = module_name(rel)
+        if module is None or not path.is_file():
+            continue
+        try:
+            tree = ast.parse(path.read_text(encoding="utf-8", errors="replace"))
+        except SyntaxError:
+            continue
+        result[str(rel)] = _imports(tree, module, rel.name == "__init__.py")
+    return result
+
+
+def _is_test_file(rel: str) -> bool:
+    name = Path(rel).name
+    return name.startswith("test_") or name.endswith("_test.py")
+
+
+def affected_tests(
+    import_map: dict[str, set[str]], changed: Iterable[str]
+) -> list[str] | None:
+    changed_files = list(changed)
+    if any(Path(c).name in RUN_ALL_TESTS_TRIGGERS for c in changed_files):
+        return None
+    modules = {module_name(Path(f)): f for f in import_map}
+    dependents: dict[str, set[str]] = {}
+    for f, imported in import_map.items():
+        for name in imported:
+            target = modules.get(name)
+            if target and target != f:
+                dependents.setdefault(target, set()).add(f)
+    seen = {c for c in changed_files if c in import_map}
+    queue = list(seen)
+    while queue:
+        for dep in dependents.get(queue.pop(), ()):
+            if dep not in seen:
+                seen.add(dep)
+                queue.append(dep)
+    return sorted(f for f in seen if _is_test_file(f))
+
+
+def isolated_copy(workspace: Path) -> Path:
+    target = Path(tempfile.mkdtemp(prefix="coding_agent_validate_")) / "ws"
+    shutil.copytree(
+        workspace, target, ignore=shutil.ignore_patterns(*COPY_IGNORE), symlinks=True
+    )
+    return target
+
+
+def _has_module(name: str) -> bool:
+    return importlib.util.find_spec(name) is not None
+
+
+def _run(
+    name: str,
+    cmd: list[str],
+    cwd: Path,
+    timeout: float,
+    ok_codes: tuple[int, ...] = (0,),
+) -> CheckResult:
+    try:
+        proc = subprocess.run(
+            cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        return CheckResult(name, False, f"timed out after {timeout:.0f}s")
+    return CheckResult(
+        name, proc.returncode in ok_codes, (proc.stdout + proc.stderr).strip()
+    )
+
+
+def check_syntax(root: Path, files: Iterable[str]) -> CheckResult:
+    errors = []
+    for f in files:
+        try:
+            compile((root / f).read_bytes(), f, "exec")
+        except SyntaxError as e:
+            errors.append(f"{f}:{e.lineno}: {e.msg}")
+    return CheckResult("syntax", not errors, "\n".join(errors))
+
+
+def check_data_files(root: Path, files: Iterable[str]) -> CheckResult:
+    errors = []
+    for f in files:
+        suffix = Path(f).suffix
+        try:
+            if suffix == ".json":
+                json.loads((root / f).read_text(encoding="utf-8"))
+            elif suffix == ".toml":
+                try:
+                    import tomllib
+                except ImportError:
+                    continue
+                tomllib.loads((root / f).read_text(encoding="utf-8"))
+        except (ValueError, UnicodeDecodeError) as e:
+            errors.append(f"{f}: {e}")
+    return CheckResult("data", not errors, "\n".join(errors))
+
+
+def run_tests(
+    root: Path, tests: list[str] | None, jobs: int, timeout: float
+) -> list[CheckResult]:
+    base = [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider"]
+    if tests is None:
+        return [_run("pytest", base, root, timeout, ok_codes=(0, 5))]
+    if not tests:
+        return []
+    jobs = max(1, min(jobs, len(tests)))
+    chunks = [tests[i::jobs] for i in range(jobs)]
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(
+            pool.map(
+                lambda chunk: _run(
+                    f"pytest {' '.join(chunk)}",
+                    base + chunk,
+                    root,
+                    timeout,
+                    ok_codes=(0, 5),
+                ),
+                chunks,
+            )
+        )
+
+
+def _check_tree(
+    root: Path,
+    changed: list[str],
+    jobs: int,
+    timeout: float,
+    tests: bool = True,
+    graph: DepGraph | None = None,
+) -> ValidationReport:
+    existing = [c for c in changed if (root / c).is_file()]
+    py_files = [c for c in existing if c.endswith(".py")]
+    data_files = [c for c in existing if Path(c).suffix in (".json", ".toml")]
+    report = ValidationReport()
+    if py_files:
+        report.checks.append(check_syntax(root, py_files))
+    if data_files:
+        report.checks.append(check_data_files(root, data_files))
+    if not report.ok:
+        return report
+    if py_files and _has_module("ruff"):
+        report.checks.append(
+            _run(
+                "ruff",
+                [sys.executable, "-m", "ruff", "check", *py_files],
+                root,
+                timeout,
+            )
+        )
+    if py_files and _has_module("black"):
+        report.checks.append(
+            _run(
+                "black",
+                [sys.executable, "-m", "black", "--check", "--quiet", *py_files],
+                root,
+                timeout,
+            )
+        )
+    if tests and _has_module("pytest"):
+        import_map = (
+            graph.scan(root).import_map()
+            if graph is not None
+            else build_import_map(root)
+        )
+        selected = affected_tests(import_map, existing)
+        report.checks.extend(run_tests(root, selected, jobs, timeout))
+    return report
+
+
+def run_validation(
+    workspace: Path,
+    changed: list[str],
+    jobs: int | None = None,
+    timeout: float = 600.0,
+    graph: DepGraph | None = None,
+) -> ValidationReport:
+    root = isolated_copy(workspace)
+    try:
+        return _check_tree(
+            root, changed, jobs or os.cpu_count() or 1, timeout, graph=graph
+        )
+    finally:
+        shutil.rmtree(root.parent, ignore_errors=True)
+
+
+def score_plan(
+    workspace: Path,
+    plan: list[dict],
+    timeout: float = 600.0,
+    tests: bool = True,
+    graph: DepGraph | None = None,
+) -> tuple[float, ValidationReport]:
+    if not plan:
+        return float("-inf"), ValidationReport()
+    root = isolated_copy(workspace)
+    try:
+        changed = []
+        for item in plan:
+            fp = (root / item["path"]).resolve()
+            if not fp.is_relative_to(root.resolve()):
+                continue
+            fp.parent.mkdir(parents=True, exist_ok=True)
+            fp.write_text(item["content"], encoding="utf-8")
+            changed.append(item["path"])
+        report = _check_tree(root, changed, 1, timeout, tests=tests, graph=graph)
+    finally:
+        shutil.rmtree(root.parent, ignore_errors=True)
+    score = 100.0 - sum(
+        CHECK_PENALTIES.get(c.name.split()[0], 10.0) for c in report.failures()
+    )
+    return score, report
@@ -0,0 +1,357 @@
+import argparse
+import hmac
+import importlib
+import json
+import queue
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from coding_agents.config import Config
+
+DEDUPE_TTL = 3600.0
+
+
+LEASE_POLL = 2.0
+
+
+class CodeAgentWorker:
+    def __init__(
+        self, cfg: Config, leases: Any = None, poll_interval: float = LEASE_POLL
+    ):
+        self._cfg = cfg
+        self._llm: Any = None
+        self._github: dict[str, Any] = {}
+        self._store: Any = None
+        self._leases = leases
+        self._poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._jobs: queue.Queue[tuple[dict, Callable[[], None] | None]] = queue.Queue()
+        loop = self._lease_loop if leases is not None else self._loop
+        self._thread = threading.Thread(
+            target=loop, name="code-agent-worker", daemon=True
+        )
+
+    def warm_up(self) -> None:
+        from coding_agents.job_store import JobStore
+        from coding_agents.llm.factory import create_llm_client
+
+        importlib.import_module("coding_agents.cli_code_agent")
+        self._llm = create_llm_client(self._cfg)
+        self._store = JobStore.default()
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def submit(self, job: dict, on_done: Callable[[bool], None] | None = None) -> None:
+        if self._leases is None:
+            self._jobs.put((job, on_done))
+            return
+        status = self._leases.enqueue(job)
+        print(
+            f"Job {job.get('repo') or '-'}#{job['issue']}: {status} in shared queue",
+            file=sys.stderr,
+        )
+        self._wake.set()
+        if on_done is not None:
+            on_done(False)
+
+    def pending(self) -> int:
+        if self._leases is not None:
+            return self._leases.pending()
+        return self._jobs.qsize()
+
+    def _loop(self) -> None:
+        while True:
+            job, on_done = self._jobs.get()
+            ok = False
+            try:
+                ok = self.run_job(job)
+            finally:
+                self._jobs.task_done()
+                if on_done is not None:
+                    on_done(ok)
+
+    def run_next_lease(self) -> bool:
+        lease = self._leases.claim()
+        if lease is None:
+            return False
+        with self._leases.holding(lease) as lost:
+
+            def still_owner() -> bool:
+                return not lost.is_set() and self._leases.heartbeat(lease)
+
+            ok = self.run_job(lease.job, still_owner)
+        if lost.is_set() or not self._leases.complete(lease, ok):
+            print(
+                f"Lease {lease.key}: taken over before completion, result not recorded",
+                file=sys.stderr,
+            )
+        return True
+
+    def _lease_loop(self) -> None:
+        while True:
+            try:
+                claimed = self.run_next_lease()
+            except Exception:
+                print("Shared queue unavailable", file=sys.stderr)
+                traceback.print_exc()
+                claimed = False
+            if not claimed:
+                self._wake.wait(self._poll_interval)
+                self._wake.clear()
+
+    def _github_client(self, cfg: Config) -> Any:
+        from coding_agents.github_client import GitHubClient
+
+        slug = f"{cfg.repo_owner}/{cfg.repo_name}"
+        if slug not in self._github:
+            self._github[slug] = GitHubClient.from_config(cfg)
+        return self._github[slug]
+
+    def run_job(self, job: dict, still_owner: Callable[[], bool] | None = None) -> bool:
+        from coding_agents.cli_code_agent import run_code_agent
+
+        cfg = self._cfg.for_repo(job.get("repo") or "")
+        label = f"{cfg.repo_owner}/{cfg.repo_name}#{job['issue']}"
+        if job.get("pr"):
+            label += f" (PR #{job['pr']})"
+        args = argparse.Namespace(
+            issue=job["issue"],
+            pr=job.get("pr"),
+            repo_path=None,
+            verbose=False,
+            no_cache=False,
+            head_sha=job.get("sha", ""),
+            trigger=job.get("trigger", ""),
+        )
+        print(f"Job {label}: started", file=sys.stderr)
+        try:
+            run_code_agent(
+                args,
+                cfg=cfg,
+                llm=self._llm,
+                gh=self._github_client(cfg),
+                store=self._store,
+                still_owner=still_owner,
+            )
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                print(f"Job {label}: exited with {e.code}", file=sys.stderr)
+                return False
+        except Exception:
+            print(f"Job {label}: failed", file=sys.stderr)
+            traceback.print_exc()
+            return False
+        print(f"Job {label}: done", file=sys.stderr)
+        return True
+
+
+def parse_job(payload: Any) -> dict | None:
+    if not isinstance(payload, dict):
+        return None
+    try:
+        issue = int(payload["issue"])
+        pr = int(payload["pr"]) if payload.get("pr") else None
+    except (KeyError, TypeError, ValueError):
+        return None
+    return {
+        "issue": issue,
+        "pr": pr,
+        "repo": str(payload.get("repo") or ""),
+        "sha": str(payload.get("sha") or ""),
+        "trigger": str(payload.get("trigger") or ""),
+    }
+
+
+def job_token(job: dict) -> str:
+    return job.get("sha") or job.get("trigger") or ""
+
+
+@dataclass
+class _Slot:
+    pending: dict | None = None
+    due: float = 0.0
+    running: bool = False
+    running_token: str = ""
+
+
+class EventIntake:
+    def __init__(
+        self,
+        worker: CodeAgentWorker,
+        window: float = 5.0,
+        dedupe_ttl: float = DEDUPE_TTL,
+        clock: Callable[[], float] = time.monotonic,
+        default_repo: str = "",
+    ):
+        self._worker = worker
+        self._default_repo = default_repo
+        self._window = window
+        self._dedupe_ttl = dedupe_ttl
+        self._clock = clock
+        self._slots: dict[tuple[str, int, int | None], _Slot] = {}
+        self._done: dict[tuple[str, int, int | None, str], float] = {}
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._loop, name="event-intake", daemon=True
+        )
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def pending(self) -> int:
+        with self._cond:
+            waiting = sum(
+                1 for slot in self._slots.values() if slot.pending is not None
+            )
+        return waiting + self._worker.pending()
+
+    def offer(self, job: dict) -> str:
+        job = {**job, "repo": job["repo"] or self._default_repo}
+        key = (job["repo"].lower(), job["issue"], job["pr"])
+        token = job_token(job)
+        with self._cond:
+            now = self._clock()
+            self._done = {
+                k: t for k, t in self._done.items() if now - t < self._dedupe_ttl
+            }
+            if token and (*key, token) in self._done:
+                return "duplicate"
+            slot = self._slots.setdefault(key, _Slot())
+            if slot.running and token == slot.running_token:
+                return "duplicate"
+            status = (
+                "debounced"
+                if slot.pending is not None
+                else "deferred" if slot.running else "queued"
+            )
+            slot.pending = job
+            slot.due = now + self._window
+            self._cond.notify()
+        return status
+
+    def _ready(self, now: float) -> tuple[float | None, list[tuple]]:
+        ready, next_due = [], None
+        for key, slot in self._slots.items():
+            if slot.pending is None or slot.running:
+                continue
+            if slot.due <= now:
+                ready.append(key)
+            elif next_due is None or slot.due < next_due:
+                next_due = slot.due
+        return next_due, ready
+
+    def dispatch_due(self) -> float | None:
+        with self._cond:
+            next_due, ready = self._ready(self._clock())
+            for key in ready:
+                slot = self._slots[key]
+                job, slot.pending = slot.pending, None
+                slot.running, slot.running_token = True, job_token(job)
+                self._worker.submit(
+                    job, on_done=partial(self._finished, key, slot.running_token)
+                )
+        return next_due
+
+    def _finished(self, key: tuple, token: str, ok: bool) -> None:
+        with self._cond:
+            if token and ok:
+                self._done[(*key, token)] = self._clock()
+            slot = self._slots.get(key)
+            if slot is None:
+                return
+            slot.running, slot.running_token = False, ""
+            if slot.pending is None:
+                del self._slots[key]
+            self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            next_due = self.dispatch_due()
+            with self._cond:
+                timeout = (
+                    None if next_due is None else max(0.0, next_due - self._clock())
+                )
+                self._cond.wait(timeout)
+
+
+def make_handler(intake: EventIntake, secret: str) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: dict) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path == "/healthz":
+                self._reply(200, {"status": "ok", "pending": intake.pending()})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self) -> None:  # noqa: N802
+            if self.path != "/run-code":
+                self._reply(404, {"error": "not found"})
+                return
+            given = self.headers.get("X-Webhook-Secret", "")
+            if secret and not hmac.compare_digest(given.encode(), secret.encode()):
+                self._reply(401, {"error": "bad secret"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"null")
+            except json.JSONDecodeError:
+                payload = None
+            job = parse_job(payload)
+            if job is None:
+                error = "expected JSON with issue, optional pr, repo, sha and trigger"
+                self._reply(400, {"error": error})
+                return
+            status = intake.offer(job)
+            self._reply(
+                200 if status == "duplicate" else 202, {"status": status, "job": job}
+            )
+
+        def log_message(self, format: str, *args: Any) -> None:
+            print(f"{self.address_string()} - {format % args}", file=sys.stderr)
+
+    return Handler
+
+
+def serve(cfg: Config, host: str, port: int) -> None:
+    leases = None
+    if cfg.worker_queue_db:
+        from coding_agents.coordination import LeaseQueue
+
+        leases = LeaseQueue(
+            cfg.worker_queue_db, owner=cfg.worker_id or None, ttl=cfg.worker_lease_ttl
+        )
+        print(
+            f"Claiming jobs from shared queue {cfg.worker_queue_db} as {leases.owner}",
+            file=sys.stderr,
+        )
+    worker = CodeAgentWorker(cfg, leases=leases)
+    worker.warm_up()
+    worker.start()
+    default_repo = (
+        f"{cfg.repo_owner}/{cfg.repo_name}" if cfg.repo_owner and cfg.repo_name else ""
+    )
+    intake = EventIntake(worker, window=cfg.webhook_debounce, default_repo=default_repo)
+    intake.start()
+    server = ThreadingHTTPServer((host, port), make_handler(intake, cfg.webhook_secret))
+    print(f"Code Agent worker listening on {host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
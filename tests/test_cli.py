@@ -0,0 +1,51 @@
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = {
+    "github",
+    "git",
+    "openai",
+    "pydantic",
+    "instructor",
+    "requests",
+    "dotenv",
+}
+IMPORT_BUDGET_US = 150_000
+
+
+def _import_times(*args: str) -> dict[str, int]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            times[name.strip()] = int(cumulative.strip())
+        except ValueError:
+            continue
+    return times
+
+
+def test_cli_import_skips_heavy_dependencies():
+    times = _import_times("-c", "import coding_agents.cli")
+    assert "coding_agents.cli" in times
+    assert not HEAVY_MODULES & times.keys()
+
+
+def test_cli_import_within_budget():
+    times = _import_times("-c", "import coding_agents.cli")
+    assert times["coding_agents.cli"] < IMPORT_BUDGET_US
+
+
+@pytest.mark.parametrize("cmd", [[], ["code"], ["reviewer"], ["readme"]])
+def test_help_does_not_import_heavy_dependencies(cmd):
+    times = _import_times("-m", "coding_agents.cli", *cmd, "--help")
+    assert not HEAVY_MODULES & times.keys()
@@ -0,0 +1,99 @@
+import argparse
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from coding_agents import cli_code_agent
+from coding_agents.job_store import JobStore, fingerprint
+
+
+def _args(**kwargs):
+    return argparse.Namespace(
+        issue=1, pr=None, repo_path=None, verbose=False, profile=None, **kwargs
+    )
+
+
+def _done_store(tmp_path):
+    store = JobStore.default(root=tmp_path)
+    store.begin("o/r#1", fingerprint("title", "body", []))
+    store.save("o/r#1", "pushed", "bbb")
+    store.save("o/r#1", "done", {"pr": 7, "sha": "aaa"})
+    store.set_status("o/r#1", "done")
+    return store
+
+
+@pytest.fixture
+def deps(monkeypatch):
+    cfg = MagicMock(
+        repo_owner="o",
+        repo_name="r",
+        github_token="t",
+        profile_dir=None,
+        history_examples=0,
+    )
+    gh = MagicMock()
+    gh.get_issue_title.return_value = "title"
+    gh.get_issue_body.return_value = "body"
+    workspace = MagicMock(side_effect=RuntimeError("workspace resolved"))
+    monkeypatch.setattr(cli_code_agent, "_resolve_workspace", workspace)
+    return cfg, gh, workspace
+
+
+@pytest.mark.parametrize("sha", ["", "aaa", "bbb"])
+def test_done_job_skips_workspace(tmp_path, deps, capsys, sha):
+    cfg, gh, workspace = deps
+    cli_code_agent.run_code_agent(
+        _args(head_sha=sha),
+        cfg=cfg,
+        llm=MagicMock(),
+        gh=gh,
+        store=_done_store(tmp_path),
+    )
+    assert "already completed" in capsys.readouterr().err
+    assert not workspace.called
+
+
+def test_new_head_sha_restarts_done_job(tmp_path, deps):
+    cfg, gh, workspace = deps
+    store = _done_store(tmp_path)
+    with pytest.raises(RuntimeError, match="workspace resolved"):
+        cli_code_agent.run_code_agent(
+            _args(head_sha="ccc"), cfg=cfg, llm=MagicMock(), gh=gh, store=store
+        )
+    assert store.status("o/r#1") == "running"
+
+
+def test_same_trigger_keeps_done_issue_job(tmp_path, deps, capsys):
+    cfg, gh, workspace = deps
+    store = _done_store(tmp_path)
+    store.save("o/r#1", "done", {"pr": 7, "sha": "", "trigger": "run-2"})
+    cli_code_agent.run_code_agent(
+        _args(trigger="run-2"), cfg=cfg, llm=MagicMock(), gh=gh, store=store
+    )
+    assert "already completed" in capsys.readouterr().err
+    assert not workspace.called
+
+
+def test_new_trigger_restarts_done_issue_job(tmp_path, deps):
+    cfg, gh, workspace = deps
+    store = _done_store(tmp_path)
+    with pytest.raises(RuntimeError, match="workspace resolved"):
+        cli_code_agent.run_code_agent(
+            _args(trigger="run-3"), cfg=cfg, llm=MagicMock(), gh=gh, store=store
+        )
+    assert store.status("o/r#1") == "running"
+
+
+def test_slow_history_sync_does_not_block(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cli_code_agent, "HISTORY_SYNC_TIMEOUT", 0.05)
+    release = threading.Event()
+    gh = MagicMock()
+    gh.iter_closed_issues.side_effect = lambda since: iter(release.wait(5) and [])
+    cfg = MagicMock(repo_owner="o", repo_name="r")
+    start = time.monotonic()
+    assert cli_code_agent._sync_history(cfg, gh) == 0
+    assert time.monotonic() - start < 1
+    release.set()
@@ -1,5 +1,3 @@
-import json
-from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
@@ -42,9 +40,130 @@ def test_parse_plan_strips_markdown(agent):
     assert plan[0]["path"] == "b.py"
 
 
+def test_parse_plan_reads_framed_files(agent):
+    raw = (
+        "Here you go:\n"
+        "<<<FILE 9f3a c.py\n"
+        'x = "<<<END other"\n'
+        "<<<END 9f3a lines=1\n"
+        "<<<FILE 9f3a d/e.txt\n"
+        "plain\n\ntext\n"
+        "<<<END 9f3a lines=3\n"
+    )
+    assert agent._parse_plan(raw) == [
+        {"path": "c.py", "content": 'x = "<<<END other"\n'},
+        {"path": "d/e.txt", "content": "plain\n\ntext\n"},
+    ]
+
+
 def test_apply_plan_creates_file(agent):
     plan = [{"path": "subdir/foo.py", "content": "print(1)"}]
     agent.apply_plan(plan)
     p = agent._workspace / "subdir" / "foo.py"
     assert p.exists()
     assert p.read_text() == "print(1)"
+
+
+def _openrouter_config(monkeypatch, **env):
+    from coding_agents.config import Config
+
+    monkeypatch.setenv("OPENROUTER_API_KEY", "key")
+    monkeypatch.setenv("LLM_PROVIDER", "openrouter")
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return Config.from_env()
+
+
+def test_structured_failure_falls_back_once(
+    monkeypatch, llm_mock, github_mock, workspace
+):
+    cfg = _openrouter_config(monkeypatch)
+    client = MagicMock()
+    client.create.side_effect = ValueError("schema mismatch")
+    monkeypatch.setattr(
+        "coding_agents.code_agent.get_structured_client", lambda key: client
+    )
+    llm_mock.chat.return_value = '{"files": [{"path": "a.py", "content": "x=1"}]}'
+    agent = CodeAgent(llm_mock, github_mock, workspace, config=cfg)
+    plan = agent.plan_changes("body", "title")
+    assert plan == [{"path": "a.py", "content": "x=1"}]
+    assert agent.plan_source == "fallback"
+    assert "schema mismatch" in agent.structured_error
+    assert llm_mock.chat.call_count == 1
+    assert "response_format" not in llm_mock.chat.call_args.kwargs
+
+
+def test_structured_failure_without_fallback(
+    monkeypatch, llm_mock, github_mock, workspace
+):
+    cfg = _openrouter_config(monkeypatch, STRUCTURED_FALLBACK="0")
+    client = MagicMock()
+    client.create.side_effect = ValueError("boom")
+    monkeypatch.setattr(
+        "coding_agents.code_agent.get_structured_client", lambda key: client
+    )
+    agent = CodeAgent(llm_mock, github_mock, workspace, config=cfg)
+    assert agent.plan_changes("body", "title") == []
+    assert agent.plan_source == "failed"
+    assert not llm_mock.chat.called
+
+
+def test_apply_plan_skips_unchanged_files(agent):
+    (agent._workspace / "same.py").write_text("x = 1\n")
+    changed = agent.apply_plan(
+        [
+            {"path": "same.py", "content": "x = 1\n"},
+            {"path": "new.py", "content": "y = 2\n"},
+        ]
+    )
+    assert changed == ["new.py"]
+
+
+def test_best_of_n_picks_valid_candidate(llm_mock, github_mock, workspace):
+    replies = {
+        0.2: '{"files": [{"path": "a.py", "content": "def f(:\\n"}]}',
+        0.6: '{"files": [{"path": "a.py", "content": "def f():\\n    return 1\\n"}]}',
+        0.9: "not json",
+    }
+    llm_mock.chat.side_effect = lambda messages, **kw: replies[kw["temperature"]]
+    agent = CodeAgent(llm_mock, github_mock, workspace)
+    plan = agent.plan_changes("body", "title", repo_context="", candidates=3)
+    assert plan == [{"path": "a.py", "content": "def f():\n    return 1\n"}]
+    assert agent.plan_source == "best-of-3"
+    assert llm_mock.chat.call_count == 3
+
+
+def test_fix_output_budget_sized_from_diff_files(
+    llm_mock, github_mock, workspace, monkeypatch
+):
+    (workspace / "big.py").write_text("x = 1\n" * 4000)
+    monkeypatch.setattr("coding_agents.code_agent.new_boundary", lambda: "b")
+    llm_mock.chat.return_value = "<<<FILE b big.py\nx = 2\n<<<END b lines=1\n"
+    agent = CodeAgent(llm_mock, github_mock, workspace)
+    diff = (
+        "diff --git a/big.py b/big.py\n--- a/big.py\n+++ b/big.py\n"
+        "@@ -1 +1 @@\n-x = 1\n+x = 2\n"
+    )
+    plan = agent.plan_fixes("body", "title", diff, [{"body": "fix"}])
+    assert plan == [{"path": "big.py", "content": "x = 2\n"}]
+    assert llm_mock.chat.call_args.kwargs["max_tokens"] == 1000 + 300 + 6000
+    assert agent._output_budget([]) == 8000
+    assert agent._output_budget(["missing.py"]) == 4000
+
+
+def test_frames_with_foreign_boundary_are_ignored(
+    llm_mock, github_mock, workspace, monkeypatch
+):
+    monkeypatch.setattr("coding_agents.code_agent.new_boundary", lambda: "b")
+    llm_mock.chat.return_value = (
+        "<<<FILE x a.py\nx = 1\n<<<END x lines=1\n"
+        "<<<FILE b c.py\ny = 2\n<<<END b lines=1\n"
+    )
+    agent = CodeAgent(llm_mock, github_mock, workspace)
+    assert agent.plan_changes("body", "title", repo_context="") == [
+        {"path": "c.py", "content": "y = 2\n"}
+    ]
+    assert (
+        "Boundary token for this response: b"
+        in llm_mock.chat.call_args.args[0][-1]["content"]
+    )
@@ -0,0 +1,148 @@
+import json
+from unittest.mock import MagicMock
+
+from coding_agents import compression
+from coding_agents.code_agent import CodeAgent
+from coding_agents.compression import GENERATED_TAG, ContextCompressor
+from coding_agents.context_builder import ContextBuilder
+
+LICENSE = (
+    "# Copyright (c) 2024 Example Corp.\n"
+    "# Licensed under the Apache License, Version 2.0 (the License).\n"
+)
+
+
+def test_repeated_license_header_is_elided_and_restored():
+    c = ContextCompressor()
+    first = c.compress("a.py", (LICENSE + "x = 1\n").encode())
+    second = c.compress("b.py", (LICENSE + "y = 2\n").encode()).decode()
+    assert first.decode() == LICENSE + "x = 1\n"
+    assert second == "# [license header elided: same as a.py]\ny = 2\n"
+    assert c.restore("b.py", second.replace("y = 2", "y = 3")) == LICENSE + "y = 3\n"
+    assert c.rules["license"] == 1
+
+
+def test_json_minified_and_reformatted_on_write():
+    original = json.dumps({"name": "pkg", "deps": ["a", "b"]}, indent=2) + "\n"
+    c = ContextCompressor()
+    assert (
+        c.compress("package.json", original.encode())
+        == b'{"name":"pkg","deps":["a","b"]}\n'
+    )
+    restored = c.restore("package.json", '{"name":"pkg","deps":["a","b","c"]}')
+    assert (
+        restored
+        == json.dumps({"name": "pkg", "deps": ["a", "b", "c"]}, indent=2) + "\n"
+    )
+
+
+def test_irregular_json_is_left_as_is():
+    original = '{\n  "a": [1, 2],   "b": 3\n}\n'
+    assert (
+        ContextCompressor().compress("x.json", original.encode()).decode() == original
+    )
+
+
+def test_whitespace_collapsed_outside_markdown():
+    c = ContextCompressor()
+    assert c.compress("m.py", b"a = 1   \n\n\n\n\nb = 2\n") == b"a = 1\n\n\nb = 2\n"
+    assert c.compress("n.md", b"line  \nnext\n") == b"line  \nnext\n"
+    assert c.saved == 5
+
+
+def test_generated_files_become_placeholders(tmp_path):
+    (tmp_path / "package-lock.json").write_text('{"lockfileVersion": 3}\n' * 50)
+    (tmp_path / "api_pb2.py").write_text(
+        "# Generated by the protocol buffer compiler.  DO NOT EDIT!\nx = 1\n"
+    )
+    (tmp_path / "main.py").write_text("print(1)\n")
+    c = ContextCompressor()
+    with ContextBuilder(compressor=c) as ctx:
+        for rel in ("api_pb2.py", "main.py", "package-lock.json"):
+            ctx.add_file(tmp_path, rel, None, 500)
+        text = ctx.getvalue()
+    assert text.count(GENERATED_TAG) == 2
+    assert "print(1)" in text
+    assert c.restore("api_pb2.py", f"{GENERATED_TAG} 2 lines]\n") is None
+
+
+def test_apply_plan_expands_placeholders(tmp_path):
+    (tmp_path / "a.py").write_text(LICENSE + "x = 1\n")
+    (tmp_path / "b.py").write_text(LICENSE + "y = 2\n")
+    (tmp_path / "gen.py").write_text("# @generated\nz = 1\n")
+    cfg = MagicMock(
+        context_compression=True,
+        context_graph=False,
+        context_max_bytes=10**6,
+        context_max_tokens=10**6,
+    )
+    agent = CodeAgent(MagicMock(), MagicMock(), tmp_path, config=cfg)
+    context = agent.repo_context()
+    assert "same as a.py" in context
+    changed = agent.apply_plan(
+        [
+            {
+                "path": "b.py",
+                "content": "# [license header elided: same as a.py]\ny = 3\n",
+            },
+            {"path": "gen.py", "content": f"{GENERATED_TAG} 2 lines]\n"},
+        ]
+    )
+    assert changed == ["b.py"]
+    assert (tmp_path / "b.py").read_text() == LICENSE + "y = 3\n"
+    assert (tmp_path / "gen.py").read_text() == "# @generated\nz = 1\n"
+
+
+def test_compressed_blobs_cached_by_sha(monkeypatch):
+    calls = []
+    real = compression._compress_blob
+
+    def counting(*args):
+        calls.append(args)
+        return real(*args)
+
+    monkeypatch.setattr(compression, "_compress_blob", counting)
+    for _ in range(2):
+        ContextCompressor().compress("cached.py", b"v = 1  \n", sha="deadbeef" * 5)
+    assert len(calls) == 1
+
+
+def test_tidy_edits_are_undone_on_restore():
+    original = 'MSG = """a  \nend"""\n\n\n\n\nX = 1\n'
+    c = ContextCompressor()
+    sent = c.compress("m.py", original.encode()).decode()
+    assert sent == 'MSG = """a\nend"""\n\n\nX = 1\n'
+    assert c.restore("m.py", sent) == original
+    assert c.restore("m.py", sent.replace("X = 1", "X = 2")) == original.replace(
+        "X = 1", "X = 2"
+    )
+
+
+def test_best_of_scores_restored_candidates(tmp_path, monkeypatch):
+    (tmp_path / "a.py").write_text(LICENSE + "x = 1\n")
+    (tmp_path / "b.py").write_text(LICENSE + "y = 2\n")
+    cfg = MagicMock(
+        context_compression=True,
+        context_graph=False,
+        context_max_bytes=10**6,
+        context_max_tokens=10**6,
+    )
+    llm = MagicMock()
+    llm.chat.return_value = (
+        "<<<FILE k b.py\n# [license header elided: same as a.py]\ny = 3\n"
+        "<<<END k lines=2\n"
+    )
+    agent = CodeAgent(llm, MagicMock(), tmp_path, config=cfg)
+    agent.repo_context()
+    monkeypatch.setattr("coding_agents.code_agent.new_boundary", lambda: "k")
+    scored = []
+
+    def fake_score(workspace, plan, **kwargs):
+        scored.append(plan)
+        return 0.0, MagicMock(failures=lambda: [])
+
+    monkeypatch.setattr("coding_agents.code_agent.score_plan", fake_score)
+    agent.plan_changes("body", "title", repo_context="", candidates=2)
+    assert scored and all(
+        p == [{"path": "b.py", "content": LICENSE + "y = 3\n"}] for p in scored
+    )
@@ -1,8 +1,5 @@
-import os
 from pathlib import Path
 
-import pytest
-
 from coding_agents.config import Config
 
 
@@ -37,3 +34,19 @@ def test_config_from_env_yandexgpt_uses_yc_keys(monkeypatch):
     assert cfg.llm_provider == "yandexgpt"
     assert cfg.yc_folder_id == "folder1"
     assert cfg.llm_api_key == "yc-key"
+
+
+def test_config_from_env_router_settings(monkeypatch):
+    monkeypatch.setenv("GITHUB_TOKEN", "tk")
+    monkeypatch.setenv("GITHUB_REPOSITORY", "a/b")
+    monkeypatch.setenv("LLM_PROVIDER", "router")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "k")
+    monkeypatch.setenv("LLM_FALLBACK_MODELS", "m1, m2,")
+    monkeypatch.setenv("LLM_CHEAP_MODEL", "cheap")
+    monkeypatch.setenv("LLM_HEDGE", "off")
+    cfg = Config.from_env()
+    assert cfg.llm_provider == "router"
+    assert cfg.llm_api_key == "k"
+    assert cfg.llm_fallback_models == ("m1", "m2")
+    assert cfg.llm_cheap_model == "cheap"
+    assert cfg.llm_hedge is False
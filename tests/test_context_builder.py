@@ -0,0 +1,59 @@
+from coding_agents import context_builder
+from coding_agents.context_builder import ContextBuilder, estimate_tokens
+
+
+def test_builder_streams_files_in_order(tmp_path):
+    (tmp_path / "a.py").write_text("print('a')\n")
+    (tmp_path / "big.txt").write_bytes(b"x" * (context_builder.MMAP_THRESHOLD + 10))
+    with ContextBuilder(max_bytes=10**6, max_tokens=10**6, spool_bytes=1024) as ctx:
+        assert ctx.add_file(tmp_path, "a.py", None, 50000)
+        assert ctx.add_file(tmp_path, "big.txt", None, 10**6)
+        assert not ctx.add_file(tmp_path, "missing.py", None, 50000)
+        text = ctx.getvalue()
+    assert text.startswith(
+        "Current repo files (path -> content):\n--- a.py ---\nprint('a')\n"
+    )
+    assert "\n--- big.txt ---\n" + "x" * 100 in text
+    assert len(text.encode()) == ctx.bytes
+
+
+def test_builder_truncates_large_files(tmp_path):
+    (tmp_path / "huge.py").write_text("y = 1\n" * 5000)
+    with ContextBuilder() as ctx:
+        ctx.add_file(tmp_path, "huge.py", None, max_file_bytes=1000)
+        text = ctx.getvalue()
+    assert text.endswith("... (truncated)")
+    assert len(text) < 2200
+
+
+def test_builder_enforces_byte_and_token_ceilings(tmp_path):
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_text(name * 400)
+    with ContextBuilder(max_bytes=1000, max_tokens=10**6) as ctx:
+        added = [ctx.add_file(tmp_path, name, None, 50000) for name in ("a", "b", "c")]
+        assert added == [True, True, False]
+        assert ctx.bytes <= 1000
+        assert ctx.getvalue().endswith("(1 more files omitted: context limit reached)")
+    with ContextBuilder(max_bytes=10**6, max_tokens=estimate_tokens(600)) as ctx:
+        assert [ctx.add_file(tmp_path, n, None, 50000) for n in ("a", "b")] == [
+            True,
+            False,
+        ]
+
+
+def test_builder_empty_without_files():
+    with ContextBuilder() as ctx:
+        assert ctx.getvalue() == ""
+
+
+def test_block_cache_keyed_by_blob_sha(tmp_path):
+    (tmp_path / "a.py").write_text("old\n")
+    with ContextBuilder() as ctx:
+        ctx.add_file(tmp_path, "a.py", "sha-test-1", 50000)
+    (tmp_path / "a.py").write_text("new\n")
+    with ContextBuilder() as ctx:
+        ctx.add_file(tmp_path, "a.py", "sha-test-1", 50000)
+        assert "old" in ctx.getvalue()
+    with ContextBuilder() as ctx:
+        ctx.add_file(tmp_path, "a.py", None, 50000)
+        assert "new" in ctx.getvalue()
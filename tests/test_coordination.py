@@ -0,0 +1,102 @@
+import threading
+
+import pytest
+
+from coding_agents.coordination import LeaseQueue
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def hosts(tmp_path):
+    clock = Clock()
+    db = tmp_path / "queue.sqlite3"
+    a = LeaseQueue(db, owner="a", ttl=60, affinity_wait=30, clock=clock)
+    b = LeaseQueue(db, owner="b", ttl=60, affinity_wait=30, clock=clock)
+    yield a, b, clock
+    a.close()
+    b.close()
+
+
+def _job(issue=1, repo="o/r", sha="", pr=None):
+    return {"issue": issue, "pr": pr, "repo": repo, "sha": sha}
+
+
+def test_only_one_host_claims_a_job(hosts):
+    a, b, _ = hosts
+    assert a.enqueue(_job()) == "queued"
+    claims = []
+    threads = [
+        threading.Thread(target=lambda q=q: claims.append(q.claim()))
+        for q in (a, b) * 4
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len([c for c in claims if c is not None]) == 1
+
+
+def test_same_branch_is_exclusive_across_pr_runs(hosts):
+    a, b, _ = hosts
+    a.enqueue(_job(pr=None, sha="x"))
+    lease = a.claim()
+    assert b.enqueue(_job(pr=7, sha="y")) == "deferred"
+    assert b.claim() is None
+    assert a.complete(lease)
+    follow_up = a.claim()
+    assert follow_up is not None and follow_up.job["pr"] == 7
+
+
+def test_duplicate_sha_is_dropped(hosts):
+    a, b, _ = hosts
+    a.enqueue(_job(sha="x"))
+    lease = a.claim()
+    assert b.enqueue(_job(sha="x")) == "duplicate"
+    a.complete(lease)
+    assert b.enqueue(_job(sha="x")) == "duplicate"
+    assert b.enqueue(_job(sha="z")) == "queued"
+
+
+def test_stale_lease_taken_over_and_old_owner_fenced(hosts):
+    a, b, clock = hosts
+    a.enqueue(_job())
+    lease = a.claim()
+    clock.now += 30
+    assert a.heartbeat(lease)
+    clock.now += 61
+    taken = b.claim()
+    assert taken is not None and taken.token == lease.token + 1
+    assert not a.heartbeat(lease)
+    assert not a.complete(lease)
+    assert b.complete(taken)
+    assert b.state(_job())["state"] == "done"
+
+
+def test_affinity_prefers_warm_host(hosts):
+    a, b, clock = hosts
+    a.enqueue(_job(issue=1, repo="o/warm"))
+    a.complete(a.claim())
+    a.enqueue(_job(issue=2, repo="o/warm"))
+    b.enqueue(_job(issue=3, repo="o/cold"))
+    claimed = b.claim()
+    assert claimed.job["repo"] == "o/cold"
+    assert b.claim() is None
+    clock.now += 31
+    assert b.claim().job["issue"] == 2
+
+
+def test_holding_reports_lost_lease(hosts):
+    a, b, clock = hosts
+    a.enqueue(_job())
+    lease = a.claim()
+    clock.now += 120
+    b.claim()
+    with a.holding(lease, interval=0.01) as lost:
+        assert lost.wait(2)
@@ -0,0 +1,101 @@
+from unittest.mock import MagicMock
+
+from coding_agents.code_agent import CodeAgent
+from coding_agents.depgraph import DepGraph, GraphSnapshot, parse_blob
+
+
+def _tree(tmp_path):
+    ws = tmp_path / "ws"
+    (ws / "src" / "pkg").mkdir(parents=True)
+    (ws / "tests").mkdir()
+    (ws / "web").mkdir()
+    (ws / "src" / "pkg" / "__init__.py").write_text("")
+    (ws / "src" / "pkg" / "parser.py").write_text(
+        "from .tokens import Token\n\ndef parse_config(text):\n    pass\n"
+    )
+    (ws / "src" / "pkg" / "tokens.py").write_text("class Token:\n    pass\n")
+    (ws / "src" / "pkg" / "cli.py").write_text("from pkg.parser import parse_config\n")
+    (ws / "src" / "pkg" / "unrelated.py").write_text("import os\n")
+    (ws / "tests" / "test_parser.py").write_text("from pkg import parser\n")
+    (ws / "web" / "app.ts").write_text(
+        "import { h } from './util';\nexport function render() {}\n"
+    )
+    (ws / "web" / "util.ts").write_text("export const h = 1;\n")
+    (ws / "README.md").write_text("# readme\n")
+    return ws
+
+
+def _graph(tmp_path):
+    return DepGraph(tmp_path / "graph.sqlite3")
+
+
+def test_neighbors_cover_imports_and_callers(tmp_path):
+    graph = _graph(tmp_path)
+    snapshot = graph.scan(_tree(tmp_path))
+    assert snapshot.neighbors(["src/pkg/parser.py"]) == {
+        "src/pkg/tokens.py",
+        "src/pkg/cli.py",
+        "tests/test_parser.py",
+    }
+    assert snapshot.neighbors(["web/app.ts"]) == {"web/util.ts"}
+    assert "src/pkg/unrelated.py" not in snapshot.neighbors(["src/pkg/parser.py"])
+
+
+def test_unchanged_blobs_are_not_reparsed(tmp_path):
+    ws = _tree(tmp_path)
+    graph = _graph(tmp_path)
+    assert graph.scan(ws).parsed == 8
+    assert graph.scan(ws).parsed == 0
+    (ws / "src" / "pkg" / "unrelated.py").write_text("from pkg.tokens import Token\n")
+    snapshot = graph.scan(ws)
+    assert snapshot.parsed == 1
+    assert "src/pkg/unrelated.py" in snapshot.callers["src/pkg/tokens.py"]
+    graph.close()
+    assert _graph(tmp_path).scan(ws).parsed == 0
+
+
+def test_relevant_ranks_mentioned_paths_and_symbols(tmp_path):
+    snapshot = _graph(tmp_path).scan(_tree(tmp_path))
+    ranked = snapshot.relevant("parse_config fails, see src/pkg/parser.py", limit=2)
+    assert ranked[0] == "src/pkg/parser.py"
+    assert snapshot.relevant("nothing matches here", limit=3) == []
+
+
+def test_import_map_matches_python_files_only(tmp_path):
+    snapshot = _graph(tmp_path).scan(_tree(tmp_path))
+    imports = snapshot.import_map()
+    assert "web/app.ts" not in imports
+    assert imports["src/pkg/parser.py"] == {"pkg.tokens", "pkg.tokens.Token"}
+
+
+def test_parse_blob_tolerates_bad_source():
+    assert parse_blob("py", b"def broken(:\n") == ([], [])
+    assert parse_blob("none", b"anything") == ([], [])
+    assert GraphSnapshot().relevant("x") == []
+
+
+def test_focused_files_missing_from_stable_context_go_to_tail(tmp_path, monkeypatch):
+    monkeypatch.setenv("AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    ws = _tree(tmp_path)
+    (ws / "README.md").write_text("# readme\n" * 200)
+    cfg = MagicMock(
+        context_graph=True,
+        context_seed_files=1,
+        context_compression=False,
+        context_max_bytes=10**6,
+        context_max_tokens=10**6,
+    )
+    issue = "parse_config in src/pkg/parser.py"
+    agent = CodeAgent(MagicMock(), MagicMock(), ws, config=cfg)
+    context = agent.repo_context(issue)
+    assert context == CodeAgent(MagicMock(), MagicMock(), ws, config=cfg).repo_context()
+    assert "class Token" in context and agent.focus_context == ""
+    stable = len(context.split("--- src/pkg/cli.py")[0])
+    cfg.context_max_bytes = int(stable / 0.75) + 1
+    tight = agent.repo_context(issue)
+    assert "class Token" not in tight and "# readme" in tight
+    assert (
+        "def parse_config" in agent.focus_context
+        and "class Token" in agent.focus_context
+    )
+    assert "import os" not in agent.focus_context
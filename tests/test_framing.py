@@ -0,0 +1,60 @@
+from coding_agents.framing import FrameParser, frame_files, has_frames, parse_frames
+
+FILES = [
+    {"path": "a.py", "content": "import os\n\nprint(os.sep)\n"},
+    {"path": "docs/b.md", "content": "# Title\n<<<FILE nested x.py\n"},
+]
+
+
+def test_roundtrip():
+    text = frame_files(FILES, "b0undary")
+    assert has_frames(text)
+    assert parse_frames(text) == FILES
+
+
+def test_streaming_chunks_emit_files_as_they_complete():
+    text = frame_files(FILES, "abc")
+    parser = FrameParser()
+    seen = []
+    for i in range(0, len(text), 7):
+        seen.append(len(parser.feed(text[i : i + 7])))
+    assert sum(seen) == 2
+    assert seen.index(1) < len(seen) - 1
+    assert parser.close() == []
+
+
+def test_truncated_frame_is_dropped():
+    text = frame_files(FILES, "abc")
+    parser = FrameParser()
+    files = parser.feed(text[: text.rindex("<<<END")]) + parser.close()
+    assert [f["path"] for f in files] == ["a.py"]
+    assert parser.truncated == ["docs/b.md"]
+
+
+def test_line_count_mismatch_is_dropped():
+    parser = FrameParser()
+    files = parser.feed(
+        "<<<FILE k a.txt\none\ntwo\n<<<END k lines=5\n"
+        "<<<FILE k b.txt\nok\n<<<END k lines=1\n"
+    )
+    assert files + parser.close() == [{"path": "b.txt", "content": "ok\n"}]
+    assert parser.mismatched == ["a.txt"]
+
+
+def test_line_count_ignores_unicode_line_breaks():
+    files = [{"path": "c.txt", "content": "page\x0cbreak\u2028sep\r\nend\n"}]
+    text = frame_files(files, "abc")
+    parser = FrameParser()
+    assert parser.feed(text) + parser.close() == files
+    assert parser.mismatched == []
+
+
+def test_expected_boundary_required():
+    text = frame_files(FILES, "abc")
+    assert parse_frames(text, "abc") == FILES
+    assert parse_frames(text, "other") == []
+
+
+def test_other_boundary_ignored():
+    text = "<<<FILE k a.txt\nx\n<<<END zz\ny\n<<<END k\n<<<FILE q b.txt\nz\n<<<END q\n"
+    assert parse_frames(text) == [{"path": "a.txt", "content": "x\n<<<END zz\ny\n"}]
@@ -1,10 +1,14 @@
-import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from coding_agents.git_ops import clone_to_temp, commit_and_push, ensure_branch
+from coding_agents.git_ops import (
+    clone_to_temp,
+    commit_and_push,
+    ensure_branch,
+    working_diff,
+)
 
 
 def test_clone_to_temp_creates_dir_and_clones():
@@ -36,3 +40,182 @@ def test_commit_and_push(tmp_path):
         commit_and_push(tmp_path, "main", "msg", "https://x@github.com/o/r.git")
         repo.index.commit.assert_called_once_with("msg")
         repo.remotes.origin.push.assert_called_once()
+
+
+def _repo_with_remote(tmp_path):
+    from git import Repo
+
+    remote = Repo.init(tmp_path / "remote.git", bare=True)
+    work = Repo.init(tmp_path / "work", initial_branch="main")
+    with work.config_writer() as cw:
+        cw.set_value("user", "name", "t")
+        cw.set_value("user", "email", "t@example.com")
+    (tmp_path / "work" / "a.txt").write_text("a\n")
+    work.git.add("a.txt")
+    work.index.commit("init")
+    work.create_remote("origin", str(remote.working_dir))
+    work.git.push("origin", "main")
+    return work
+
+
+def test_git_blob_sha_matches_git():
+    from coding_agents.git_ops import git_blob_sha
+
+    assert git_blob_sha(b"") == "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391"
+
+
+def test_commit_and_push_paths_skips_unchanged(tmp_path):
+    work = _repo_with_remote(tmp_path)
+    head = work.head.commit.hexsha
+    pushed = commit_and_push(Path(work.working_dir), "main", "msg", paths=["a.txt"])
+    assert pushed is False
+    assert work.head.commit.hexsha == head
+
+
+def test_commit_and_push_paths_stages_only_given(tmp_path):
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    (root / "a.txt").write_text("changed\n")
+    (root / "stray.txt").write_text("untracked\n")
+    assert commit_and_push(root, "main", "msg", paths=["a.txt"]) is True
+    assert set(work.head.commit.stats.files) == {"a.txt"}
+    assert "stray.txt" in work.untracked_files
+    assert work.git.rev_parse("origin/main") == work.head.commit.hexsha
+
+
+def test_working_diff_leaves_index_untouched(tmp_path):
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    (root / "a.txt").write_text("changed\n")
+    (root / "new.txt").write_text("fresh\n")
+    index = (Path(work.git_dir) / "index").read_bytes()
+    diff = working_diff(root, ["a.txt", "new.txt"])
+    assert "+changed" in diff and "+fresh" in diff
+    assert (Path(work.git_dir) / "index").read_bytes() == index
+    assert "new.txt" in work.untracked_files
+    assert work.git.diff("--cached") == ""
+
+
+def test_git_session_fetches_each_branch_once(tmp_path):
+    from coding_agents.git_ops import GitSession
+
+    work = _repo_with_remote(tmp_path)
+    work.git.push("origin", "main:agent-issue-1")
+    session = GitSession()
+    root = Path(work.working_dir)
+    session.fetch(root, "main", "agent-issue-1", "agent-issue-2")
+    assert work.git.rev_parse("origin/agent-issue-1") == work.head.commit.hexsha
+    with patch.object(type(work.remotes.origin), "fetch") as fetch:
+        session.fetch(root, "agent-issue-1", "main")
+        ensure_branch(root, "agent-issue-1", session=session)
+        assert not fetch.called
+    assert work.active_branch.name == "agent-issue-1"
+
+
+def test_ensure_branch_resets_diverged_local_branch(tmp_path):
+    from coding_agents.git_ops import GitSession
+
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    work.git.checkout("-b", "agent-issue-1")
+    (root / "a.txt").write_text("remote\n")
+    work.git.commit("-am", "remote")
+    work.git.push("origin", "agent-issue-1")
+    remote_head = work.head.commit.hexsha
+    work.git.reset("--hard", "HEAD~1")
+    (root / "a.txt").write_text("stale\n")
+    work.git.commit("-am", "stale")
+    work.git.checkout("main")
+    ensure_branch(root, "agent-issue-1", session=GitSession())
+    assert work.active_branch.name == "agent-issue-1"
+    assert work.head.commit.hexsha == remote_head
+
+
+def test_local_pr_diff_fetches_pull_head_with_renames(tmp_path):
+    from coding_agents.git_ops import local_pr_diff, split_diff
+
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    (root / "big.txt").write_text("".join(f"line {i}\n" for i in range(50)))
+    work.git.add("big.txt")
+    work.index.commit("big")
+    work.git.push("origin", "main")
+    work.git.checkout("-b", "feature")
+    work.git.mv("big.txt", "moved.txt")
+    (root / "a.txt").write_text("a\nb\n")
+    work.git.add("a.txt")
+    work.index.commit("feature")
+    work.git.push("origin", "feature:refs/pull/7/head")
+    work.git.checkout("main")
+
+    diff = local_pr_diff(root, 7, "main", context_lines=0)
+    assert "rename from big.txt" in diff
+    files = {f["filename"]: f["patch"] for f in split_diff(diff)}
+    assert set(files) == {"a.txt", "moved.txt"}
+    assert files["a.txt"].startswith("@@ -1,0 +2 @@") and files["a.txt"].endswith(
+        "\n+b"
+    )
+    assert files["moved.txt"] == ""
+
+
+def test_commit_and_push_fails_when_remote_rejects(tmp_path):
+    from git import Repo
+    from git.exc import GitCommandError
+
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    other = Repo.clone_from(
+        str(tmp_path / "remote.git"), tmp_path / "other", branch="main"
+    )
+    with other.config_writer() as cw:
+        cw.set_value("user", "name", "t")
+        cw.set_value("user", "email", "t@example.com")
+    (tmp_path / "other" / "a.txt").write_text("theirs\n")
+    other.git.commit("-am", "theirs")
+    other.git.push("origin", "main")
+    (root / "a.txt").write_text("ours\n")
+    with pytest.raises(GitCommandError):
+        commit_and_push(root, "main", "msg", paths=["a.txt"])
+    assert (
+        Repo(tmp_path / "remote.git").commit("main").hexsha == other.head.commit.hexsha
+    )
+
+
+def test_quarantined_clone_waits_for_abandoned_stages(tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    from coding_agents.git_ops import quarantine, settle
+
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(release.wait)
+        quarantine([tmp_path], [future])
+        assert not settle(tmp_path, timeout=0.05)
+        release.set()
+        assert settle(tmp_path, timeout=5)
+    assert settle(tmp_path, timeout=0)
+
+
+def test_git_session_fetch_uses_one_listing_and_one_fetch(tmp_path):
+    from coding_agents.git_ops import GitSession
+
+    work = _repo_with_remote(tmp_path)
+    root = Path(work.working_dir)
+    session = GitSession()
+    git_cls, remote_cls = type(work.git), type(work.remotes.origin)
+    with (
+        patch.object(
+            git_cls, "ls_remote", autospec=True, side_effect=git_cls.ls_remote
+        ) as ls_remote,
+        patch.object(
+            remote_cls, "fetch", autospec=True, side_effect=remote_cls.fetch
+        ) as fetch,
+    ):
+        session.fetch(root, "main", "agent-issue-7")
+        session.fetch(root, "agent-issue-8")
+    assert ls_remote.call_count == 1
+    assert fetch.call_count == 2
+    assert fetch.call_args_list[0].args[1] == [
+        "+refs/heads/main:refs/remotes/origin/main"
+    ]
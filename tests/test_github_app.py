@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from coding_agents.github_app import InstallationTokenPool, app_jwt
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+
+
+class _Response:
+    def __init__(self, data):
+        self._data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self._data
+
+
+class _FakeGitHub:
+    def __init__(self, now):
+        self.now = now
+        self.calls = []
+
+    def request(self, method, url, headers, timeout):
+        self.calls.append((method, url))
+        if url.endswith("/installation"):
+            owner = url.split("/repos/", 1)[1].split("/")[0]
+            return _Response({"id": {"org-a": 1, "org-b": 2}[owner]})
+        installation = url.split("/installations/", 1)[1].split("/")[0]
+        expires = datetime.fromtimestamp(self.now[0] + 3600, tz=timezone.utc)
+        issued = sum(1 for m, _ in self.calls if m == "POST")
+        return _Response(
+            {
+                "token": f"ghs_{installation}_{issued}",
+                "expires_at": expires.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            }
+        )
+
+
+@pytest.fixture
+def pool(private_key):
+    now = [1_700_000_000.0]
+    p = InstallationTokenPool("42", private_key, clock=lambda: now[0])
+    p._http = _FakeGitHub(now)
+    return p, now
+
+
+def test_app_jwt_is_signed_for_app(private_key):
+    token = app_jwt("42", private_key, now=1_700_000_000)
+    public = serialization.load_pem_private_key(private_key.encode(), None).public_key()
+    claims = jwt.decode(
+        token, public, algorithms=["RS256"], options={"verify_exp": False}
+    )
+    assert claims["iss"] == "42"
+    assert claims["exp"] - claims["iat"] <= 600
+
+
+def test_tokens_cached_per_installation(pool):
+    p, _ = pool
+    assert p.token("org-a", "one") == p.token("org-a", "two") == "ghs_1_1"
+    assert p.token("org-b", "three") == "ghs_2_2"
+    assert p.issued == 2
+    assert sum(1 for _, url in p._http.calls if url.endswith("/installation")) == 2
+
+
+def test_token_refreshed_ahead_of_expiry(pool):
+    p, now = pool
+    first = p.token("org-a", "one")
+    now[0] += 3600 - 600
+    assert p.token("org-a", "one") == first
+    now[0] += 400
+    assert p.token("org-a", "one") != first
+    assert p.issued == 2
+
+
+def test_installation_auth_reads_current_token(pool):
+    p, _ = pool
+    auth = p.auth("org-b", "repo")
+    assert auth.token_type == "token"
+    assert auth.token == "ghs_2_1"
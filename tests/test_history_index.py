@@ -0,0 +1,146 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+from coding_agents.github_client import GitHubClient
+from coding_agents.history_index import HistoryIndex, format_examples, match_query
+
+T0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _index(tmp_path):
+    return HistoryIndex.for_repo("o", "r", root=tmp_path)
+
+
+def test_match_query_quotes_unique_terms():
+    assert (
+        match_query('Fix "parser" crash, parser 42 ok')
+        == '"fix" OR "parser" OR "crash"'
+    )
+
+
+def test_search_returns_issue_with_fix_diff(tmp_path):
+    index = _index(tmp_path)
+    index.add_issue(1, "Parser crashes on empty config", "Traceback in load_config")
+    index.add_pr(
+        10,
+        1,
+        "[Agent] Parser crashes",
+        "--- a/config.py\n+++ b/config.py\n+if not data: return {}",
+    )
+    index.add_issue(2, "Add dark theme", "UI colors")
+    index.add_pr(11, 2, "[Agent] Add dark theme", "--- a/theme.css")
+    index.add_issue(3, "Config crashes without PR", "load_config")
+    examples = index.search("load_config crashes on empty file", k=3)
+    assert [ex["issue"] for ex in examples] == [1]
+    assert examples[0]["title"] == "Parser crashes on empty config"
+    assert "if not data" in examples[0]["diff"]
+    assert index.search("load_config crashes", k=3, exclude_issue=1) == []
+    text = format_examples(examples)
+    assert "Issue #1" in text and "if not data" in text
+
+
+def test_add_is_upsert(tmp_path):
+    index = _index(tmp_path)
+    index.add_issue(1, "old title", "")
+    index.add_issue(1, "new title", "")
+    assert len(index) == 1
+    index.add_pr(5, 1, "x", "diff")
+    assert index.search("old", k=1) == []
+    assert index.search("new title", k=1)[0]["title"] == "new title"
+
+
+def test_sync_is_incremental(tmp_path):
+    gh = MagicMock()
+    gh.iter_closed_issues.return_value = iter(
+        [{"number": 1, "title": "Slow import", "body": "cli start", "updated_at": T0}]
+    )
+    gh.iter_merged_agent_prs.return_value = iter(
+        [
+            {
+                "number": 9,
+                "issue": 1,
+                "title": "fix",
+                "diff": "lazy",
+                "updated_at": T0 + timedelta(hours=1),
+            }
+        ]
+    )
+    index = _index(tmp_path)
+    assert index.sync(gh) == 2
+    gh.iter_closed_issues.return_value = iter([])
+    gh.iter_merged_agent_prs.return_value = iter([])
+    index.close()
+    index = _index(tmp_path)
+    assert index.sync(gh) == 0
+    gh.iter_closed_issues.assert_called_with(T0)
+    gh.iter_merged_agent_prs.assert_called_with(T0 + timedelta(hours=1))
+    assert index.search("slow import", k=1)[0]["diff"] == "lazy"
+
+
+def test_sync_with_small_limit_reaches_older_entries(tmp_path):
+    issues = [
+        MagicMock(
+            number=n,
+            title=f"issue {n}",
+            body="",
+            pull_request=None,
+            updated_at=T0 + timedelta(hours=n),
+        )
+        for n in range(1, 6)
+    ]
+    prs = [
+        MagicMock(
+            number=100 + n,
+            title="fix",
+            merged_at=T0,
+            head=MagicMock(ref=f"agent-issue-{n}"),
+            updated_at=T0 + timedelta(hours=n),
+            get_files=lambda: [],
+        )
+        for n in range(1, 6)
+    ]
+
+    def get_issues(since=None, **kwargs):
+        assert kwargs["direction"] == "asc"
+        return [i for i in issues if since is None or i.updated_at >= since]
+
+    gh = GitHubClient("t", "o", "r")
+    gh._repo = MagicMock(get_issues=get_issues, get_pulls=lambda **kwargs: prs[::-1])
+    index = _index(tmp_path)
+    index.sync(gh, limit=2, pr_limit=2)
+    assert len(index) == 4
+    index.sync(gh, limit=2, pr_limit=2)
+    assert len(index) == 6
+    index.sync(gh, limit=10, pr_limit=10)
+    assert len(index) == 10
+    assert [p["number"] for p in gh.iter_merged_agent_prs(scan_limit=2)] == [104, 105]
+
+
+def test_search_is_fast_with_thousands_of_entries(tmp_path):
+    gh = MagicMock()
+    gh.iter_closed_issues.return_value = iter(
+        {
+            "number": n,
+            "title": f"feature {n} widget handler",
+            "body": f"about module{n % 50}",
+            "updated_at": T0,
+        }
+        for n in range(3000)
+    )
+    gh.iter_merged_agent_prs.return_value = iter(
+        {
+            "number": 100000 + n,
+            "issue": n,
+            "title": "fix",
+            "diff": f"--- a/module{n % 50}.py",
+            "updated_at": T0,
+        }
+        for n in range(3000)
+    )
+    index = _index(tmp_path)
+    assert index.sync(gh, limit=5000, pr_limit=5000) == 6000
+    start = time.perf_counter()
+    for _ in range(20):
+        assert len(index.search("widget handler module7", k=3)) == 3
+    assert (time.perf_counter() - start) / 20 < 0.1
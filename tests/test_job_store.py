@@ -0,0 +1,41 @@
+from coding_agents.job_store import JobStore, fingerprint, job_id
+
+
+def test_job_id_and_fingerprint():
+    assert job_id("o/r", 5) == "o/r#5"
+    assert job_id("o/r", 5, 9) == "o/r#5/pr9"
+    assert fingerprint("t", "b") == fingerprint("t", "b")
+    assert fingerprint("t", "b") != fingerprint("t", "b2")
+
+
+def test_checkpoints_survive_reopen(tmp_path):
+    store = JobStore.default(root=tmp_path)
+    assert store.begin("o/r#1", "in1") == {}
+    store.save("o/r#1", "plan", [{"path": "a.py", "content": "x = 1\n"}])
+    store.close()
+    store = JobStore.default(root=tmp_path)
+    assert store.begin("o/r#1", "in1") == {
+        "plan": [{"path": "a.py", "content": "x = 1\n"}]
+    }
+    assert store.attempts("o/r#1") == 2
+    assert store.status("o/r#1") == "running"
+
+
+def test_changed_inputs_or_fresh_drop_checkpoints(tmp_path):
+    store = JobStore.default(root=tmp_path)
+    store.begin("o/r#1", "in1")
+    store.save("o/r#1", "plan", [])
+    assert store.begin("o/r#1", "in2") == {}
+    store.save("o/r#1", "plan", [])
+    assert store.begin("o/r#1", "in2", fresh=True) == {}
+    assert store.attempts("o/r#1") == 1
+
+
+def test_done_status(tmp_path):
+    store = JobStore.default(root=tmp_path)
+    store.begin("o/r#1", "in1")
+    store.save("o/r#1", "done", {"pr": 7})
+    store.set_status("o/r#1", "done")
+    assert store.status("o/r#1") == "done"
+    assert store.begin("o/r#1", "in1")["done"] == {"pr": 7}
+    assert store.status("missing") is None
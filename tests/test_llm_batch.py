@@ -0,0 +1,178 @@
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from coding_agents.llm.batch import (
+    BatchHandleStore,
+    BatchRequest,
+    BatchResult,
+    OpenAIBatch,
+    ThreadedBatch,
+    YandexBatch,
+    run_batch,
+)
+from coding_agents.llm.batch_stub import BatchStubServer
+from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+REQUESTS = [
+    BatchRequest("a", [{"role": "user", "content": "first"}]),
+    BatchRequest(
+        "b",
+        [{"role": "system", "content": "sys"}, {"role": "user", "content": "second"}],
+    ),
+]
+
+
+@pytest.fixture
+def stub():
+    with BatchStubServer(polls_until_done=2) as server:
+        yield server
+
+
+def test_yandex_async_operations(stub):
+    client = YandexGPTClient(
+        "folder",
+        api_key="key",
+        async_url=f"{stub.url}/completionAsync",
+        operations_url=f"{stub.url}/operations",
+    )
+    results = run_batch(YandexBatch(client), REQUESTS, poll_interval=0.01)
+    assert {k: r.text for k, r in results.items()} == {
+        "a": "echo: first",
+        "b": "echo: second",
+    }
+    assert len(stub.operations) == 2
+
+
+def test_openai_batch_file(stub):
+    backend = OpenAIBatch("key", "gpt-4o-mini", base_url=stub.url)
+    results = run_batch(backend, REQUESTS, poll_interval=0.01)
+    assert all(r.ok for r in results.values())
+    assert results["b"].text == "echo: second"
+    assert len(stub.batches) == 1
+    assert stub.status_requests == 2
+
+
+def test_threaded_fallback_maps_errors():
+    def chat(messages, **kwargs):
+        if messages[-1]["content"] == "second":
+            raise RuntimeError("boom")
+        return "ok"
+
+    llm = MagicMock()
+    llm.chat.side_effect = chat
+    results = run_batch(ThreadedBatch(llm), REQUESTS, poll_interval=0.01)
+    assert results["a"] == BatchResult("a", text="ok")
+    assert results["b"].error == "boom"
+
+
+class _NeverDone:
+    name = "never"
+
+    def __init__(self):
+        self.cancelled = {}
+
+    def submit(self, requests):
+        return {r.custom_id: r.custom_id for r in requests}
+
+    def poll(self, handles):
+        return {}
+
+    def cancel(self, handles):
+        self.cancelled.update(handles)
+
+
+def test_backoff_and_timeout():
+    now = [0.0]
+    sleeps = []
+
+    def sleep(s):
+        sleeps.append(s)
+        now[0] += s
+
+    results = run_batch(
+        _NeverDone(),
+        REQUESTS,
+        poll_interval=1,
+        max_interval=3,
+        timeout=10,
+        sleep=sleep,
+        clock=lambda: now[0],
+    )
+    assert sleeps[:4] == [1, 1.5, 2.25, 3]
+    assert now[0] == 10
+    assert not results["a"].ok and "timed out" in results["a"].error
+
+
+def _yandex(stub):
+    client = YandexGPTClient(
+        "folder",
+        api_key="key",
+        async_url=f"{stub.url}/completionAsync",
+        operations_url=f"{stub.url}/operations",
+    )
+    return YandexBatch(client)
+
+
+def test_interrupted_batch_resumes_saved_handles(stub, tmp_path):
+    store = BatchHandleStore.default(tmp_path)
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        run_batch(
+            _yandex(stub), REQUESTS, poll_interval=0.01, sleep=interrupt, store=store
+        )
+    changed = [REQUESTS[0], BatchRequest("b", [{"role": "user", "content": "changed"}])]
+    results = run_batch(_yandex(stub), changed, poll_interval=0.01, store=store)
+    assert {k: r.text for k, r in results.items()} == {
+        "a": "echo: first",
+        "b": "echo: changed",
+    }
+    assert len(stub.operations) == 3
+    assert store.resume("yandex", changed) == {}
+
+
+def test_timeout_cancels_provider_jobs(tmp_path):
+    store = BatchHandleStore.default(tmp_path)
+    now = [0.0]
+
+    def sleep(s):
+        now[0] += s
+
+    with BatchStubServer(polls_until_done=100) as slow:
+        backend = OpenAIBatch("key", "gpt-4o-mini", base_url=slow.url)
+        results = run_batch(
+            backend, REQUESTS, timeout=5, sleep=sleep, clock=lambda: now[0], store=store
+        )
+        backend.close()
+    assert all("timed out" in r.error for r in results.values())
+    assert [b.get("cancelled") for b in slow.batches.values()] == [True]
+    assert store.resume(backend.name, REQUESTS) == {}
+
+
+def test_threaded_close_stops_queued_calls():
+    started = threading.Event()
+    release = threading.Event()
+
+    def chat(messages, **kwargs):
+        started.set()
+        release.wait(5)
+        return "ok"
+
+    llm = MagicMock()
+    llm.chat.side_effect = chat
+    backend = ThreadedBatch(llm, max_workers=1)
+    handles = backend.submit(REQUESTS)
+    started.wait(5)
+    backend.close()
+    release.set()
+    assert handles["b"].cancelled()
+    assert llm.chat.call_count == 1
+
+
+def test_duplicate_ids_rejected():
+    with pytest.raises(ValueError):
+        run_batch(_NeverDone(), [REQUESTS[0], REQUESTS[0]])
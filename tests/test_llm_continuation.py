@@ -0,0 +1,59 @@
+from unittest.mock import MagicMock
+
+from coding_agents.llm.base import FINISH_LENGTH, FINISH_STOP, Completion
+from coding_agents.llm.continuation import CONTINUE_PROMPT, chat_continued, stitch
+from coding_agents.llm.yandexgpt_client import YandexGPTClient
+
+
+def test_stitch_drops_repeated_overlap():
+    head = "<<<FILE b a.py\ndef long_function_name():\n    return"
+    assert stitch(head, "def long_function_name():\n    return 1\n") == head + " 1\n"
+    assert stitch("abc", "def") == "abcdef"
+
+
+def test_stitch_keeps_midline_repetition():
+    head = "total = compute(alpha_value, beta_value"
+    tail = "(alpha_value, beta_value)\n"
+    assert stitch(head, tail) == head + tail
+    long_line = "x" * 300
+    assert stitch("y = " + long_line, long_line + "\n") == "y = " + long_line + "\n"
+
+
+def test_chat_continued_resumes_truncated_output():
+    llm = MagicMock()
+    llm.chat.side_effect = [
+        Completion("<<<FILE b a.py\nx = ", FINISH_LENGTH),
+        Completion("1\n<<<END b lines=1\n", FINISH_STOP),
+    ]
+    out = chat_continued(llm, [{"role": "user", "content": "go"}], 3, max_tokens=100)
+    assert out == "<<<FILE b a.py\nx = 1\n<<<END b lines=1\n"
+    assert not out.truncated
+    follow_up = llm.chat.call_args_list[1].args[0]
+    assert follow_up[-2] == {"role": "assistant", "content": "<<<FILE b a.py\nx = "}
+    assert follow_up[-1]["content"] == CONTINUE_PROMPT
+    assert llm.chat.call_args_list[1].kwargs == {"max_tokens": 100}
+
+
+def test_chat_continued_stops_at_limit():
+    llm = MagicMock()
+    llm.chat.return_value = Completion("more", FINISH_LENGTH)
+    out = chat_continued(llm, [], 2)
+    assert out.truncated
+    assert llm.chat.call_count == 3
+
+
+def test_plain_strings_are_not_continued():
+    llm = MagicMock()
+    llm.chat.return_value = "done"
+    assert chat_continued(llm, [], 3) == "done"
+    assert llm.chat.call_count == 1
+
+
+def test_yandex_status_maps_to_finish_reason():
+    result = {
+        "alternatives": [
+            {"message": {"text": "x"}, "status": "ALTERNATIVE_STATUS_TRUNCATED_FINAL"}
+        ]
+    }
+    out = YandexGPTClient.result_text(result)
+    assert out == "x" and out.finish_reason == FINISH_LENGTH
@@ -0,0 +1,80 @@
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from coding_agents.llm.router import Backend, BackendStats, RoutingLLMClient
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+
+def _client(reply="ok", delay=0.0, error=None):
+    client = MagicMock()
+
+    def chat(messages, **kwargs):
+        time.sleep(delay)
+        if error:
+            raise error
+        return reply
+
+    client.chat.side_effect = chat
+    return client
+
+
+def test_fails_over_to_next_backend():
+    router = RoutingLLMClient(
+        [
+            Backend("a", _client(error=RuntimeError("down"))),
+            Backend("b", _client("from b")),
+        ],
+        hedge=False,
+    )
+    assert router.chat(MESSAGES) == "from b"
+    assert router.stats("a").error_rate > 0
+
+
+def test_hedges_slow_primary():
+    release = threading.Event()
+    slow = MagicMock()
+    slow.chat.side_effect = lambda messages, **kw: release.wait(5) and "slow"
+    router = RoutingLLMClient(
+        [Backend("slow", slow), Backend("fast", _client("fast"))],
+        hedge_after=0.05,
+    )
+    try:
+        assert router.chat(MESSAGES) == "fast"
+    finally:
+        release.set()
+
+
+def test_routes_small_prompts_to_cheap_backend():
+    router = RoutingLLMClient(
+        [
+            Backend("big", _client("big")),
+            Backend("cheap", _client("cheap"), max_prompt_chars=100, cheap=True),
+        ],
+        small_prompt_chars=100,
+        hedge=False,
+    )
+    assert router.chat(MESSAGES) == "cheap"
+    large = [{"role": "user", "content": "x" * 500}]
+    assert router.chat(large) == "big"
+
+
+def test_no_backend_accepts_prompt():
+    router = RoutingLLMClient(
+        [Backend("tiny", _client(), max_prompt_chars=1)], hedge=False
+    )
+    with pytest.raises(ValueError):
+        router.chat(MESSAGES)
+
+
+def test_backend_stats_ewma_and_p95():
+    stats = BackendStats(alpha=0.5)
+    for elapsed in (1.0, 1.0, 1.0, 1.0, 3.0):
+        stats.record(elapsed, ok=True)
+    assert stats.latency == pytest.approx(2.0)
+    assert stats.p95() == 3.0
+    stats.record(0.1, ok=False)
+    assert stats.error_rate == pytest.approx(0.5)
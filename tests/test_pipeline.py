@@ -0,0 +1,72 @@
+import threading
+import time
+
+import pytest
+
+from coding_agents.pipeline import Stage, StageTimeoutError, run_stages
+
+
+def test_runs_stages_in_dependency_order():
+    order = []
+
+    def step(name):
+        def run(results):
+            order.append(name)
+            return name.upper()
+
+        return run
+
+    results = run_stages(
+        [
+            Stage("c", step("c"), deps=("a", "b")),
+            Stage("a", step("a")),
+            Stage("b", step("b"), deps=("a",)),
+        ]
+    )
+    assert results == {"a": "A", "b": "B", "c": "C"}
+    assert order.index("a") < order.index("b") < order.index("c")
+
+
+def test_independent_stages_overlap():
+    barrier = threading.Barrier(2, timeout=2)
+
+    def meet(results):
+        barrier.wait()
+        return True
+
+    results = run_stages([Stage("x", meet), Stage("y", meet)])
+    assert results == {"x": True, "y": True}
+
+
+def test_stage_receives_dependency_results():
+    results = run_stages(
+        [
+            Stage("n", lambda r: 2),
+            Stage("double", lambda r: r["n"] * 2, deps=("n",)),
+        ]
+    )
+    assert results["double"] == 4
+
+
+def test_stage_timeout():
+    with pytest.raises(StageTimeoutError) as exc:
+        run_stages([Stage("slow", lambda r: time.sleep(1), timeout=0.05)])
+    assert exc.value.name == "slow"
+    assert len(exc.value.pending) == 1
+
+
+def test_stage_error_propagates():
+    def boom(results):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        run_stages([Stage("boom", boom)])
+
+
+def test_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError):
+        run_stages(
+            [Stage("a", lambda r: 1, deps=("b",)), Stage("b", lambda r: 1, deps=("a",))]
+        )
+    with pytest.raises(ValueError):
+        run_stages([Stage("a", lambda r: 1, deps=("missing",))])
@@ -0,0 +1,39 @@
+import json
+import tracemalloc
+
+from coding_agents.profiling import Profiler
+
+
+def _busy():
+    data = [str(i) * 10 for i in range(20000)]
+    return sum(len(s) for s in data)
+
+
+def test_disabled_profiler_is_inert(tmp_path):
+    profiler = Profiler(None)
+    with profiler.stage("plan"):
+        _busy()
+    assert profiler.wrap("x", _busy) is _busy
+    profiler.finish()
+    assert profiler.stages == []
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stage_profiles_written(tmp_path):
+    profiler = Profiler(tmp_path, "code-1")
+    with profiler.stage("context"):
+        _busy()
+    assert profiler.wrap("plan", lambda r: r + 1)(1) == 2
+    profiler.finish()
+    (run_dir,) = tmp_path.iterdir()
+    assert run_dir.name.startswith("code-1-")
+    assert sorted(p.name for p in run_dir.glob("*.prof")) == [
+        "01-context.prof",
+        "02-plan.prof",
+    ]
+    summary = (run_dir / "summary.txt").read_text()
+    assert "== context" in summary and "_busy" in summary
+    stages = json.loads((run_dir / "summary.json").read_text())
+    assert [s["stage"] for s in stages] == ["context", "plan"]
+    assert stages[0]["alloc_bytes"] >= 0
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,62 @@
+import subprocess
+
+from coding_agents.git_ops import list_repo_files
+from coding_agents.prompts import (
+    assemble_messages,
+    message_text,
+    supports_cache_control,
+)
+
+
+def test_assemble_messages_puts_stable_blocks_first():
+    messages = assemble_messages("sys", ["repo ctx", "", "diff"], "issue text")
+    assert messages[0] == {"role": "system", "content": "sys"}
+    content = messages[1]["content"]
+    assert content.startswith("repo ctx\n\ndiff")
+    assert content.endswith("issue text")
+
+
+def test_assemble_messages_same_prefix_for_different_tasks():
+    a = message_text(assemble_messages("sys", ["ctx"], "task A")[1])
+    b = message_text(assemble_messages("sys", ["ctx"], "task B")[1])
+    assert a[: a.index("task")] == b[: b.index("task")]
+
+
+def test_assemble_messages_cache_control_parts():
+    messages = assemble_messages("sys", ["ctx"], "task", cache_control=True)
+    parts = messages[1]["content"]
+    assert parts[0] == {
+        "type": "text",
+        "text": "ctx",
+        "cache_control": {"type": "ephemeral"},
+    }
+    assert parts[1] == {"type": "text", "text": "task"}
+    assert message_text(messages[1]) == "ctx\n\ntask"
+
+
+def test_assemble_messages_without_stable_is_plain():
+    messages = assemble_messages("sys", [""], "task", cache_control=True)
+    assert messages[1]["content"] == "task"
+
+
+def test_supports_cache_control():
+    assert supports_cache_control("anthropic/claude-sonnet-4")
+    assert supports_cache_control("google/gemini-2.5-pro")
+    assert not supports_cache_control("openai/gpt-4o-mini")
+
+
+def test_list_repo_files_sorted_with_blob_shas(tmp_path):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    git("init", "-q")
+    (tmp_path / "b.py").write_text("b\n")
+    (tmp_path / "a.py").write_text("a\n")
+    git("add", "a.py", "b.py")
+    (tmp_path / "b.py").write_text("changed\n")
+    (tmp_path / "c.py").write_text("new\n")
+    files = dict(list_repo_files(tmp_path))
+    assert list(files) == ["a.py", "b.py", "c.py"]
+    assert files["a.py"] is not None and len(files["a.py"]) == 40
+    assert files["b.py"] is None
+    assert files["c.py"] is None
@@ -0,0 +1,72 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from coding_agents.readme_generator import ReadmeGenerator
+
+
+@pytest.fixture
+def llm_mock():
+    return MagicMock()
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "demo"\n')
+    (tmp_path / "main.py").write_text("print(1)\n")
+    return tmp_path
+
+
+def test_fingerprint_stable_for_unchanged_project(llm_mock, workspace):
+    first = ReadmeGenerator(llm_mock, workspace).fingerprint()
+    second = ReadmeGenerator(llm_mock, workspace).fingerprint()
+    assert first == second
+    assert not llm_mock.chat.called
+
+
+def test_fingerprint_changes_with_key_file(llm_mock, workspace):
+    before = ReadmeGenerator(llm_mock, workspace).fingerprint()
+    (workspace / "pyproject.toml").write_text('[project]\nname = "other"\n')
+    after = ReadmeGenerator(llm_mock, workspace).fingerprint()
+    assert before != after
+
+
+def test_fingerprint_ignores_excluded_output(llm_mock, workspace):
+    output = workspace / "README.md"
+    before = ReadmeGenerator(llm_mock, workspace, exclude=(output,)).fingerprint()
+    output.write_text("# Generated\n")
+    after = ReadmeGenerator(llm_mock, workspace, exclude=(output,)).fingerprint()
+    assert before == after
+
+
+def test_batch_reports_colliding_output_paths(tmp_path, monkeypatch, capsys):
+    from coding_agents import cli_readme
+    from coding_agents.llm.batch import BatchResult
+
+    forks = {}
+    for owner in ("alice", "bob"):
+        forks[owner] = tmp_path / owner / "demo"
+        forks[owner].mkdir(parents=True)
+        (forks[owner] / "main.py").write_text(f"print('{owner}')\n")
+    output = tmp_path / "out" / "README.md"
+    monkeypatch.setenv("AGENT_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(cli_readme, "create_batch_backend", lambda cfg: MagicMock())
+    monkeypatch.setattr(
+        cli_readme, "resolve_workspace", lambda cfg, repo, session: forks[repo]
+    )
+    monkeypatch.setattr(
+        cli_readme, "default_output_path", lambda workspace, session: output
+    )
+    submitted = []
+
+    def fake_run_batch(backend, requests, **kwargs):
+        submitted.extend(requests)
+        return {r.custom_id: BatchResult(r.custom_id, "# Demo") for r in requests}
+
+    monkeypatch.setattr(cli_readme, "run_batch", fake_run_batch)
+    output.parent.mkdir()
+    cli_readme.run_readme_batch(MagicMock(), ["alice", "bob", "alice"])
+    assert len(submitted) == 1
+    assert capsys.readouterr().err.count("Skipped bob") == 1
+    with pytest.raises(ValueError):
+        ReadmeGenerator(None, forks["alice"]).generate()
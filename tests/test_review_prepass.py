@@ -0,0 +1,127 @@
+from coding_agents.review_prepass import (
+    added_lines,
+    ci_failed,
+    classify,
+    reverse_patch,
+    run_prepass,
+)
+
+
+def test_added_lines_tracks_new_line_numbers():
+    patch = "@@ -1,3 +1,4 @@\n a\n-b\n+B\n+C\n c\n@@ -10 +11,2 @@\n x\n+y"
+    assert added_lines(patch) == {2: "B", 3: "C", 12: "y"}
+
+
+def test_classify():
+    assert classify([]) == "empty"
+    assert (
+        classify(
+            [
+                {"filename": "docs/guide.rst", "patch": "+x"},
+                {"filename": "README.md", "patch": "+y"},
+            ]
+        )
+        == "docs"
+    )
+    assert classify([{"filename": "poetry.lock", "patch": "+z"}]) == "lockfile"
+    trailing = "@@ -1,2 +1,2 @@\n-x = 1   \n-\n+x = 1\n+\n"
+    assert (
+        classify([{"filename": "a.py", "patch": trailing, "content": "x = 1\n\n"}])
+        == "whitespace"
+    )
+    assert classify([{"filename": "a.py", "patch": trailing}]) == "code"
+    assert (
+        classify(
+            [
+                {
+                    "filename": "a.py",
+                    "patch": "@@ -1 +1 @@\n-x=1\n+x = 1",
+                    "content": "x = 1\n",
+                }
+            ]
+        )
+        == "code"
+    )
+    assert (
+        classify([{"filename": "a.py", "patch": "@@ -1 +1 @@\n-x = 1\n+x = 2"}])
+        == "code"
+    )
+    assert classify([{"filename": "a.py", "patch": ""}]) == "code"
+
+
+def test_prepass_findings_limited_to_changed_lines():
+    branches = "\n".join(f"    if x == {i}:\n        return {i}" for i in range(12))
+    content = (
+        f"def busy(x):\n{branches}\n    return -1\n\n\ndef quiet():\n    return 0\n"
+    )
+    lines = content.count("\n")
+    busy = run_prepass(
+        [
+            {
+                "filename": "m.py",
+                "patch": "@@ -1 +1 @@\n-def b(x):\n+def busy(x):",
+                "content": content,
+            }
+        ]
+    )
+    assert [f.check for f in busy.findings] == ["complexity"]
+    assert not busy.errors()
+    quiet = run_prepass(
+        [
+            {
+                "filename": "m.py",
+                "patch": (
+                    f"@@ -{lines - 1} +{lines - 1} @@\n-    return 1\n+    return 0"
+                ),
+                "content": content,
+            }
+        ]
+    )
+    assert quiet.findings == []
+
+
+def test_prepass_errors_for_broken_data_and_conflicts():
+    result = run_prepass(
+        [
+            {"filename": "cfg.json", "patch": "@@ -0,0 +1 @@\n+{", "content": "{"},
+            {"filename": "notes.md", "patch": "@@ -0,0 +1 @@\n+<<<<<<< HEAD"},
+        ]
+    )
+    assert {f.check for f in result.errors()} == {"data", "conflict"}
+    assert result.kind == "code"
+    assert "ERROR cfg.json [data]" in result.facts()
+
+
+def test_ci_failed():
+    assert ci_failed("ruff=failure, pytest=success")
+    assert not ci_failed("ruff=success, black=success, pytest=success")
+    assert not ci_failed("No CI data provided.")
+
+
+def test_reorders_reindents_and_string_edits_are_code():
+    reorder = "@@ -1,2 +1,2 @@\n-check();\n-delete();\n+delete();\n+check();"
+    assert classify([{"filename": "a.js", "patch": reorder}]) == "code"
+    reindent = "@@ -1,2 +1,2 @@\n if x:\n-    y()\n+y()"
+    assert (
+        classify([{"filename": "a.py", "patch": reindent, "content": "if x:\ny()\n"}])
+        == "code"
+    )
+    assert (
+        classify(
+            [{"filename": "a.yml", "patch": "@@ -1,2 +1,2 @@\n a:\n-  b: 1\n+b: 1"}]
+        )
+        == "code"
+    )
+    string = '@@ -1 +1 @@\n-msg = "a  b"\n+msg = "a b"'
+    assert classify([{"filename": "a.js", "patch": string}]) == "code"
+    assert (
+        classify([{"filename": "a.py", "patch": string, "content": 'msg = "a b"\n'}])
+        == "code"
+    )
+    spacing = "@@ -1 +1 @@\n-f(a,b);\n+f(a, b);"
+    assert classify([{"filename": "a.js", "patch": spacing}]) == "whitespace"
+
+
+def test_reverse_patch_rebuilds_old_content():
+    patch = "@@ -1,3 +1,3 @@\n a\n-b\n+B\n c\n@@ -6,0 +7 @@\n+g"
+    assert reverse_patch("a\nB\nc\nd\ne\nf\ng\n", patch) == "a\nb\nc\nd\ne\nf\n"
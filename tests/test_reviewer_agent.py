@@ -42,3 +42,57 @@ def test_post_review_to_pr_adds_label_on_changes_requested(reviewer):
     reviewer.post_review_to_pr(1, "VERDICT: CHANGES_REQUESTED\nFix X")
     reviewer._github.add_pr_comment.assert_called_once()
     reviewer._github.add_pr_label.assert_called_once_with(1, "agent-fix-requested")
+
+
+def test_review_fast_path_skips_llm_for_docs_only(reviewer):
+    out = reviewer.review(
+        issue_body="Typo",
+        issue_title="Docs",
+        pr_diff="",
+        pr_files=[{"filename": "README.md", "patch": "@@ -1 +1 @@\n-teh\n+the"}],
+        ci_summary="ruff=success, pytest=success",
+    )
+    assert out.rstrip().endswith("VERDICT: APPROVED")
+    assert reviewer.skipped_llm
+    assert not reviewer._llm.chat.called
+
+
+def test_review_sends_prepass_findings_to_llm(reviewer):
+    reviewer._llm.chat.return_value = "VERDICT: CHANGES_REQUESTED"
+    reviewer.review(
+        issue_body="",
+        issue_title="Config",
+        pr_diff="",
+        pr_files=[
+            {
+                "filename": "app.py",
+                "patch": "@@ -0,0 +1 @@\n+def f(:",
+                "content": "def f(:\n",
+            }
+        ],
+        ci_summary="OK",
+    )
+    prompt = reviewer._llm.chat.call_args[0][0][1]["content"]
+    assert "ERROR app.py:1 [syntax]" in prompt
+
+
+@pytest.mark.parametrize(
+    "pr_files",
+    [
+        [{"filename": "README.md", "patch": "@@ -1 +1 @@\n-teh\n+the"}],
+        [],
+    ],
+)
+def test_review_fast_path_needs_matching_issue(reviewer, pr_files):
+    reviewer._llm.chat.return_value = "VERDICT: CHANGES_REQUESTED"
+    out = reviewer.review(
+        issue_body="Parsing crashes on empty input",
+        issue_title="Fix parser crash",
+        pr_diff="",
+        pr_files=pr_files,
+        ci_summary="ruff=success, pytest=success",
+    )
+    assert out == "VERDICT: CHANGES_REQUESTED"
+    assert not reviewer.skipped_llm
+    prompt = reviewer._llm.chat.call_args[0][0][1]["content"]
+    assert "Static pre-pass" in prompt
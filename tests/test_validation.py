@@ -0,0 +1,60 @@
+from pathlib import Path
+
+from coding_agents.validation import (
+    affected_tests,
+    build_import_map,
+    module_name,
+    run_validation,
+)
+
+
+def _project(root: Path) -> Path:
+    (root / "src" / "pkg").mkdir(parents=True)
+    (root / "tests").mkdir()
+    (root / "src" / "pkg" / "__init__.py").write_text("")
+    (root / "src" / "pkg" / "core.py").write_text("def add(a, b):\n    return a + b\n")
+    (root / "src" / "pkg" / "api.py").write_text(
+        "from .core import add\n\n\ndef total(xs):\n    return sum(xs)\n"
+    )
+    (root / "src" / "pkg" / "other.py").write_text("X = 1\n")
+    (root / "tests" / "test_api.py").write_text(
+        "import sys\nsys.path.insert(0, 'src')\nfrom pkg.api import total\n\n\n"
+        "def test_total():\n    assert total([1, 2]) == 3\n"
+    )
+    (root / "tests" / "test_other.py").write_text(
+        "import sys\nsys.path.insert(0, 'src')\nfrom pkg import other\n\n\n"
+        "def test_other():\n    assert other.X == 1\n"
+    )
+    return root
+
+
+def test_module_name_strips_src_and_init():
+    assert module_name(Path("src/pkg/core.py")) == "pkg.core"
+    assert module_name(Path("src/pkg/__init__.py")) == "pkg"
+    assert module_name(Path("README.md")) is None
+
+
+def test_affected_tests_follow_transitive_imports(tmp_path):
+    root = _project(tmp_path)
+    import_map = build_import_map(root)
+    assert affected_tests(import_map, ["src/pkg/core.py"]) == ["tests/test_api.py"]
+    assert affected_tests(import_map, ["src/pkg/other.py"]) == ["tests/test_other.py"]
+    assert affected_tests(import_map, ["pyproject.toml"]) is None
+
+
+def test_run_validation_reports_syntax_error(tmp_path):
+    root = _project(tmp_path)
+    (root / "src" / "pkg" / "core.py").write_text("def add(a, b)\n    return a + b\n")
+    report = run_validation(root, ["src/pkg/core.py"])
+    assert not report.ok
+    assert "src/pkg/core.py" in report.feedback()
+
+
+def test_run_validation_runs_affected_tests(tmp_path):
+    root = _project(tmp_path)
+    (root / "src" / "pkg" / "api.py").write_text("def total(xs):\n    return 0\n")
+    report = run_validation(root, ["src/pkg/api.py"], jobs=2)
+    pytest_checks = [c for c in report.checks if c.name.startswith("pytest")]
+    assert len(pytest_checks) == 1
+    assert not pytest_checks[0].ok
+    assert not (root / ".pytest_cache").exists()
@@ -0,0 +1,208 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import pytest
+
+from coding_agents.worker import EventIntake, make_handler, parse_job
+
+
+def test_parse_job_normalizes_payload():
+    assert parse_job({"issue": "3", "pr": 7, "repo": "o/r", "sha": "abc"}) == {
+        "issue": 3,
+        "pr": 7,
+        "repo": "o/r",
+        "sha": "abc",
+        "trigger": "",
+    }
+    assert parse_job({"issue": 3, "trigger": 42}) == {
+        "issue": 3,
+        "pr": None,
+        "repo": "",
+        "sha": "",
+        "trigger": "42",
+    }
+    assert parse_job({"pr": 1}) is None
+    assert parse_job([1]) is None
+
+
+@pytest.fixture
+def server():
+    intake = MagicMock()
+    intake.pending.return_value = 0
+    intake.offer.return_value = "queued"
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(intake, "s3cret"))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield intake, f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(url, payload, secret):
+    req = urllib.request.Request(
+        url + "/run-code",
+        data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json", "X-Webhook-Secret": secret},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def test_run_code_queues_job(server):
+    intake, url = server
+    assert _post(url, {"issue": 5, "repo": "o/r"}, "s3cret") == 202
+    intake.offer.assert_called_once_with(
+        {"issue": 5, "pr": None, "repo": "o/r", "sha": "", "trigger": ""}
+    )
+
+
+def test_run_code_rejects_bad_secret(server):
+    intake, url = server
+    assert _post(url, {"issue": 5}, "wrong") == 401
+    assert not intake.offer.called
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def intake():
+    worker = MagicMock()
+    worker.pending.return_value = 0
+    clock = FakeClock()
+    intake = EventIntake(
+        worker, window=5.0, dedupe_ttl=60.0, clock=clock, default_repo="o/r"
+    )
+    return intake, worker, clock
+
+
+def _job(sha="", pr=3):
+    return {"issue": 1, "pr": pr, "repo": "o/r", "sha": sha}
+
+
+def test_intake_debounces_burst_into_one_job(intake):
+    intake, worker, clock = intake
+    assert intake.offer(_job(pr=None)) == "queued"
+    clock.now = 2.0
+    assert intake.offer(_job(pr=None)) == "debounced"
+    clock.now = 6.0
+    assert intake.dispatch_due() == 7.0
+    assert not worker.submit.called
+    clock.now = 7.0
+    intake.dispatch_due()
+    worker.submit.assert_called_once()
+    assert worker.submit.call_args[0][0] == _job(pr=None)
+
+
+def test_intake_drops_duplicate_of_running_and_completed_sha(intake):
+    intake, worker, clock = intake
+    intake.offer(_job("aaa"))
+    clock.now = 5.0
+    intake.dispatch_due()
+    assert intake.offer(_job("aaa")) == "duplicate"
+    on_done = worker.submit.call_args[1]["on_done"]
+    on_done(True)
+    assert intake.offer(_job("aaa")) == "duplicate"
+    clock.now = 100.0
+    assert intake.offer(_job("aaa")) == "queued"
+
+
+def test_intake_retries_sha_after_failed_job(intake):
+    intake, worker, clock = intake
+    intake.offer(_job("aaa"))
+    clock.now = 5.0
+    intake.dispatch_due()
+    worker.submit.call_args[1]["on_done"](False)
+    assert intake.offer(_job("aaa")) == "queued"
+
+
+def test_intake_reruns_issue_job_on_new_trigger(intake):
+    intake, worker, clock = intake
+    job = {**_job(pr=None), "trigger": "run-1"}
+    intake.offer(job)
+    clock.now = 5.0
+    intake.dispatch_due()
+    worker.submit.call_args[1]["on_done"](True)
+    assert intake.offer(job) == "duplicate"
+    assert intake.offer({**job, "trigger": "run-2"}) == "queued"
+
+
+def test_intake_treats_missing_repo_as_default(intake):
+    intake, worker, clock = intake
+    assert intake.offer({**_job("aaa"), "repo": ""}) == "queued"
+    assert intake.offer({**_job("aaa"), "repo": "O/R"}) == "debounced"
+    clock.now = 10.0
+    intake.dispatch_due()
+    worker.submit.assert_called_once()
+
+
+def test_intake_defers_newer_sha_until_running_job_finishes(intake):
+    intake, worker, clock = intake
+    intake.offer(_job("aaa"))
+    clock.now = 5.0
+    intake.dispatch_due()
+    assert intake.offer(_job("bbb")) == "deferred"
+    assert intake.offer(_job("ccc")) == "debounced"
+    clock.now = 20.0
+    intake.dispatch_due()
+    assert worker.submit.call_count == 1
+    assert intake.pending() == 1
+    worker.submit.call_args[1]["on_done"](True)
+    intake.dispatch_due()
+    assert worker.submit.call_count == 2
+    assert worker.submit.call_args[0][0]["sha"] == "ccc"
+
+
+def test_worker_runs_claimed_lease_and_completes(tmp_path):
+    from coding_agents.coordination import LeaseQueue
+    from coding_agents.worker import CodeAgentWorker
+
+    leases = LeaseQueue(tmp_path / "queue.sqlite3", owner="h1")
+    worker = CodeAgentWorker(MagicMock(), leases=leases)
+    worker.run_job = MagicMock(return_value=True)
+    done = MagicMock()
+    worker.submit(_job("aaa"), on_done=done)
+    done.assert_called_once_with(False)
+    assert worker.pending() == 1
+    assert worker.run_next_lease()
+    assert worker.run_job.call_args.args[0] == _job("aaa")
+    assert leases.state(_job())["state"] == "done"
+    assert not worker.run_next_lease()
+
+
+def test_worker_refuses_to_push_after_lease_taken_over(tmp_path):
+    from coding_agents.coordination import LeaseQueue
+    from coding_agents.worker import CodeAgentWorker
+
+    now = [1000.0]
+    db = tmp_path / "queue.sqlite3"
+    leases = LeaseQueue(db, owner="h1", ttl=60, clock=lambda: now[0])
+    other = LeaseQueue(db, owner="h2", ttl=60, clock=lambda: now[0])
+    worker = CodeAgentWorker(MagicMock(), leases=leases)
+    checks = []
+
+    def slow_job(job, still_owner):
+        checks.append(still_owner())
+        now[0] += 120
+        other.claim()
+        checks.append(still_owner())
+        return True
+
+    worker.run_job = slow_job
+    worker.submit(_job("aaa"))
+    assert worker.run_next_lease()
+    assert checks == [True, False]
+    assert leases.state(_job())["owner"] == "h2"